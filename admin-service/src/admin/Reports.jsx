@@ -153,7 +153,7 @@ const CommissionReport = ({ data, isDark }) => (
         </div>
 
         <Panel isDark={isDark}>
-            <PanelTitle icon={Store} isDark={isDark}>Top Vendor Commission Ledger</PanelTitle>
+            <PanelTitle icon={Store} isDark={isDark}>Top Vendor Commission Ledger (Last {data.report_days ?? 30} Days)</PanelTitle>
             <div className="overflow-x-auto">
                 <table className="w-full text-left">
                     <thead className={`border-b ${isDark ? 'bg-slate-800/50 border-slate-700/50' : 'bg-slate-50/70 border-slate-100'}`}>
@@ -164,10 +164,10 @@ const CommissionReport = ({ data, isDark }) => (
                         </tr>
                     </thead>
                     <tbody className={`divide-y ${isDark ? 'divide-slate-700/50' : 'divide-slate-50'}`}>
-                        {(data.top_vendors ?? []).length === 0 ? (
+                        {(data.top_vendors_month ?? []).length === 0 ? (
                             <tr><td colSpan={6} className={`py-10 text-center text-sm ${isDark ? 'text-slate-600' : 'text-slate-300'}`}>No vendor earnings recorded yet</td></tr>
                         ) : (
-                            (data.top_vendors ?? []).map((v, i) => (
+                            (data.top_vendors_month ?? []).map((v, i) => (
                                 <tr key={i} className={`transition-colors ${isDark ? 'hover:bg-slate-700/30' : 'hover:bg-slate-50/50'}`}>
                                     <td className="px-4 py-3.5">
                                         <span className={`inline-flex items-center justify-center w-7 h-7 rounded-full text-[10px] font-semibold
@@ -203,7 +203,7 @@ const VendorReport = ({ data, isDark }) => (
         </div>
 
         <Panel isDark={isDark}>
-            <PanelTitle icon={Users} isDark={isDark}>Top 10 Vendors by Net Earnings</PanelTitle>
+            <PanelTitle icon={Users} isDark={isDark}>Top 10 Vendors by Net Earnings (Last {data.report_days ?? 30} Days)</PanelTitle>
             <div className="overflow-x-auto">
                 <table className="w-full text-left">
                     <thead className={`border-b ${isDark ? 'bg-slate-800/50 border-slate-700/50' : 'bg-slate-50/70 border-slate-100'}`}>
@@ -214,10 +214,10 @@ const VendorReport = ({ data, isDark }) => (
                         </tr>
                     </thead>
                     <tbody className={`divide-y ${isDark ? 'divide-slate-700/50' : 'divide-slate-50'}`}>
-                        {(data.top_vendors ?? []).length === 0 ? (
+                        {(data.top_vendors_month ?? []).length === 0 ? (
                             <tr><td colSpan={4} className={`py-10 text-center text-sm ${isDark ? 'text-slate-600' : 'text-slate-300'}`}>No vendors with earnings yet</td></tr>
                         ) : (
-                            (data.top_vendors ?? []).map((v, i) => (
+                            (data.top_vendors_month ?? []).map((v, i) => (
                                 <tr key={i} className={`transition-colors ${isDark ? 'hover:bg-slate-700/30' : 'hover:bg-slate-50/50'}`}>
                                     <td className="px-4 py-3.5">
                                         <span className={`inline-flex items-center justify-center w-7 h-7 rounded-full text-[10px] font-semibold
@@ -284,7 +284,7 @@ const OrderStatusReport = ({ data, isDark }) => {
             </div>
 
             <Panel isDark={isDark}>
-                <PanelTitle icon={Package} iconClass="text-amber-500" isDark={isDark}>Top 10 Products by Qty Sold</PanelTitle>
+                <PanelTitle icon={Package} iconClass="text-amber-500" isDark={isDark}>Top 10 Products by Qty Sold (Last {data.report_days ?? 30} Days)</PanelTitle>
                 <div className="overflow-x-auto">
                     <table className="w-full text-left">
                         <thead className={`border-b ${isDark ? 'bg-slate-800/50 border-slate-700/50' : 'bg-slate-50/70 border-slate-100'}`}>
@@ -295,10 +295,10 @@ const OrderStatusReport = ({ data, isDark }) => {
                             </tr>
                         </thead>
                         <tbody className={`divide-y ${isDark ? 'divide-slate-700/50' : 'divide-slate-50'}`}>
-                            {(data.top_products ?? []).length === 0 ? (
+                            {(data.top_products_month ?? []).length === 0 ? (
                                 <tr><td colSpan={4} className={`py-10 text-center text-sm ${isDark ? 'text-slate-600' : 'text-slate-300'}`}>No product order data yet</td></tr>
                             ) : (
-                                (data.top_products ?? []).map((p, i) => (
+                                (data.top_products_month ?? []).map((p, i) => (
                                     <tr key={i} className={`transition-colors ${isDark ? 'hover:bg-slate-700/30' : 'hover:bg-slate-50/50'}`}>
                                         <td className="px-4 py-3">
                                             <span className={`inline-flex items-center justify-center w-7 h-7 rounded-full text-[10px] font-semibold
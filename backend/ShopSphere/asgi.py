@@ -2,6 +2,8 @@
 ASGI config for ShopSphere project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the app through it (e.g. uvicorn) to use the live order tracking
+stream (user.views.order_tracking_stream), which holds its connection open.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
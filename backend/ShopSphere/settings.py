@@ -57,8 +57,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'superAdmin.instrumentation.QueryInstrumentationMiddleware',
 ]
 
+# Per-endpoint query counts, DB time and response sizes (superAdmin/instrumentation.py),
+# served to admins at /superAdmin/api/instrumentation/
+QUERY_INSTRUMENTATION = os.environ.get('QUERY_INSTRUMENTATION', 'True').lower() == 'true'
+# Server-Timing response header with each request's query count and DB time (browser dev tools)
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', str(DEBUG)).lower() == 'true'
+
 ROOT_URLCONF = 'ShopSphere.urls'
 
 TEMPLATES = [
@@ -129,6 +136,59 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product image storage (content-addressed files, see vendor/image_storage.py)
+PRODUCT_IMAGE_STORAGE = {
+    'BACKEND': os.environ.get('PRODUCT_IMAGE_STORAGE_BACKEND', 'vendor.image_storage.LocalImageStorage'),
+    'OPTIONS': {
+        'location': os.environ.get('PRODUCT_IMAGE_ROOT', str(MEDIA_ROOT / 'product_images')),
+        # Only set when PRODUCT_IMAGE_ROOT is on a persistent disk: rows then drop their DB copy
+        'durable': os.environ.get('PRODUCT_IMAGE_STORAGE_DURABLE', 'False') == 'True',
+    },
+}
+
+# Cache: shared Redis when REDIS_URL is set (needs the `redis` package), per-process memory otherwise
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'shopsphere',
+        }
+    }
+
+# Live order tracking (user/live.py) keeps its state in the default cache. Only Redis is seen by
+# every process (web workers and the outbox worker); otherwise streams poll the database.
+LIVE_SHARED_CACHE = bool(os.environ.get('REDIS_URL'))
+
+# Public catalog response cache (vendor/catalog_cache.py). Every worker must see the same
+# catalog version: Redis when available, else a directory shared by the workers of one host
+# (CATALOG_CACHE_DIR), else per-process memory (development and tests), where one worker's
+# bump would not reach the others, so caching is then off unless CATALOG_CACHE_ENABLED says otherwise.
+if os.environ.get('REDIS_URL'):
+    CACHES['catalog'] = {**CACHES['default'], 'KEY_PREFIX': 'catalog'}
+elif os.environ.get('CATALOG_CACHE_DIR'):
+    CACHES['catalog'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['CATALOG_CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+else:
+    CACHES['catalog'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shopsphere-catalog',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    }
+_SHARED_CATALOG_CACHE = bool(os.environ.get('REDIS_URL') or os.environ.get('CATALOG_CACHE_DIR'))
+CATALOG_CACHE_ENABLED = os.environ.get('CATALOG_CACHE_ENABLED', str(_SHARED_CATALOG_CACHE)).lower() == 'true'
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 600))  # seconds
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 60))  # Cache-Control max-age for browsers / CDNs
+
 # Authentication
 AUTH_USER_MODEL = 'user.AuthUser'
 
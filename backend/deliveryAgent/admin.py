@@ -28,6 +28,14 @@ class DeliveryAssignmentAdmin(admin.ModelAdmin):
     list_filter = ['status', 'assigned_at', 'estimated_delivery_date']
     search_fields = ['agent__user__username', 'order__id']
     readonly_fields = ['assigned_at', 'accepted_at', 'started_at', 'completed_at']
+    actions = ['mark_delivered']
+
+    @admin.action(description='Mark selected deliveries as delivered')
+    def mark_delivered(self, request, queryset):
+        from .finalization import finalize_deliveries
+
+        finalized = finalize_deliveries(list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f"{len(finalized)} deliveries finalized ({queryset.count() - len(finalized)} already final).")
 
 @admin.register(DeliveryTracking)
 class DeliveryTrackingAdmin(admin.ModelAdmin):
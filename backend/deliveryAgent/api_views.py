@@ -25,6 +25,8 @@ from .serializers import (
     DeliveryDailyStatsSerializer, DeliveryFeedbackSerializer
 )
 from user.models import Order
+from superAdmin import metrics
+from . import tracking
 
 User = get_user_model()
 
@@ -368,7 +370,7 @@ class DeliveryAssignmentViewSet(viewsets.ViewSet):
                 return Response({'error': 'Condition notes are required'}, status=400)
 
             # Update Return Request
-            with transaction.atomic():
+            with transaction.atomic(), metrics.batched_changes():
                 return_request = assignment.return_request
                 if return_request:
                     return_request.condition_notes = condition_notes
@@ -422,31 +424,51 @@ class DeliveryTrackingViewSet(viewsets.ViewSet):
         """Update current delivery location (real-time tracking)"""
         try:
             agent = DeliveryAgentProfile.objects.get(user=request.user)
-            assignment = DeliveryAssignment.objects.get(id=pk, agent=agent)
-            
-            # Create tracking record
-            tracking = DeliveryTracking.objects.create(
-                delivery_assignment=assignment,
-                latitude=request.data.get('latitude'),
-                longitude=request.data.get('longitude'),
-                address=request.data.get('address', ''),
-                status=request.data.get('status', 'In Transit'),
-                speed=request.data.get('speed', None),
-                notes=request.data.get('notes', '')
-            )
-            
-            # Update assignment current location
-            assignment.current_location = {
-                'latitude': float(request.data.get('latitude', 0)),
-                'longitude': float(request.data.get('longitude', 0)),
-                'address': request.data.get('address', '')
-            }
-            assignment.save()
-            
-            serializer = DeliveryTrackingSerializer(tracking)
+            assignment = DeliveryAssignment.objects.only('id', 'order_id').get(id=pk, agent=agent)
+            point = tracking.clean_point(request.data)
+        except (DeliveryAgentProfile.DoesNotExist, DeliveryAssignment.DoesNotExist):
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # The current location is stored now; the history row is buffered and
+            # written in bulk, so its `id` is still null in the (unchanged) 201 payload
+            tracking.record_ping(assignment, point)
+            serializer = DeliveryTrackingSerializer(DeliveryTracking(delivery_assignment_id=assignment.id, **point))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['post'])
+    def update_locations(self, request, pk=None):
+        """Upload a batch of location points: {"points": [{latitude, longitude, tracked_at, ...}, ...]}"""
+        try:
+            agent = DeliveryAgentProfile.objects.get(user=request.user)
+            assignment = DeliveryAssignment.objects.only('id', 'order_id').get(id=pk, agent=agent)
         except (DeliveryAgentProfile.DoesNotExist, DeliveryAssignment.DoesNotExist):
             return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        points = request.data.get('points')
+        if not isinstance(points, list) or not points:
+            return Response({'error': 'points must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(points) > tracking.MAX_BATCH_POINTS:
+            return Response(
+                {'error': f'At most {tracking.MAX_BATCH_POINTS} points per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        received_at = timezone.now()
+        try:
+            points = [tracking.clean_point(point, received_at) for point in points]
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows = tracking.ingest(assignment, points)
+            return Response({
+                'received': len(rows),
+                'current_location': tracking.location_of(max(points, key=lambda p: p['tracked_at'])),
+            }, status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -456,12 +478,13 @@ class DeliveryTrackingViewSet(viewsets.ViewSet):
         try:
             agent = DeliveryAgentProfile.objects.get(user=request.user)
             assignment = DeliveryAssignment.objects.get(id=pk, agent=agent)
+            tracking.tracking_buffer.flush()
             
-            tracking = DeliveryTracking.objects.filter(
+            history = DeliveryTracking.objects.filter(
                 delivery_assignment=assignment
             ).order_by('-tracked_at')
             
-            serializer = DeliveryTrackingSerializer(tracking, many=True)
+            serializer = DeliveryTrackingSerializer(history, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except (DeliveryAgentProfile.DoesNotExist, DeliveryAssignment.DoesNotExist):
             return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -834,7 +857,7 @@ class UpdateOrderStatusView(APIView):
         import random
         from django.db import transaction
 
-        with transaction.atomic():
+        with transaction.atomic(), metrics.batched_changes():
             # Update assignment status
             assignment.status = new_status
             if new_status == 'picked_up':
@@ -0,0 +1,223 @@
+"""
+deliveryAgent/finalization.py
+Delivery finalization: everything that happens when a delivery (or a return
+pickup) is completed, as one atomic unit.
+
+`finalize_deliveries()` locks the assignments (in id order, so concurrent
+callers cannot deadlock), skips those already finalized (a double-submitted
+completion pays the agent once), then:
+
+- saves the assignment and order status with `update_fields`, so the
+  metrics, risk and live-tracking receivers still see the transition (they
+  are handed the rows as read under lock instead of re-selecting them);
+- writes tracking rows, commissions and wallet transactions with one
+  bulk_create each, and finalizes return requests and vendor ledger entries
+  set-based;
+- bumps agent, wallet and daily-stats counters with F() expressions,
+  aggregated per agent, so concurrent completions never lose an increment.
+
+`finalize_delivery()` is the single-assignment form behind
+DeliveryAssignment.mark_delivered(); the bulk form is for admins and
+simulations closing many deliveries at once.
+"""
+import copy
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DeliveryAgentProfile, DeliveryAssignment, DeliveryCommission, DeliveryDailyStats
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ('delivered', 'failed', 'cancelled', 'rejected')
+OUT_OF_CITY_BONUS = Decimal('0.20')
+
+
+def commission_for(assignment):
+    """(base fee, distance bonus, total) for a completed assignment: out-of-city deliveries earn 20% more."""
+    is_local = assignment.delivery_city.lower() == assignment.agent.city.lower()
+    bonus = Decimal('0.00') if is_local else assignment.delivery_fee * OUT_OF_CITY_BONUS
+    return assignment.delivery_fee, bonus, assignment.delivery_fee + bonus
+
+
+def bump_daily_stats(agent_id, day, **increments):
+    """Add `increments` to the agent's DeliveryDailyStats row for `day`, creating it if needed."""
+    updates = {field: F(field) + value for field, value in increments.items()}
+    if DeliveryDailyStats.objects.filter(agent_id=agent_id, date=day).update(updated_at=timezone.now(), **updates):
+        return
+    try:
+        with transaction.atomic():
+            DeliveryDailyStats.objects.create(agent_id=agent_id, date=day, **increments)
+    except IntegrityError:  # created concurrently since the update above
+        DeliveryDailyStats.objects.filter(agent_id=agent_id, date=day).update(updated_at=timezone.now(), **updates)
+
+
+def _save_locked(instance, **changes):
+    """
+    Apply `changes` to an instance read under lock in this transaction and
+    save just those fields. The row as read is passed to the pre_save
+    receivers as `_stored_state`, sparing their per-row SELECT.
+    """
+    instance._stored_state = copy.copy(instance)
+    for field, value in changes.items():
+        setattr(instance, field, value)
+    try:
+        instance.save(update_fields=list(changes))
+    finally:
+        del instance._stored_state
+
+
+def _tracking_row(assignment):
+    from user.models import OrderTracking
+
+    if assignment.assignment_type == 'return':
+        return OrderTracking(
+            order_id=assignment.order_id,
+            status='Return Received at Warehouse',
+            location=assignment.delivery_city,
+            notes="Return package(s) received and verified at the hub/warehouse."
+        )
+    return OrderTracking(
+        order_id=assignment.order_id,
+        status='Delivered',
+        location=assignment.delivery_city,
+        notes="Order successfully delivered and verified via OTP."
+    )
+
+
+def _settle_vendor_ledgers(orders):
+    # A ledger problem must not block the delivery itself: roll back only this step
+    from finance.services import FinanceService
+
+    try:
+        with transaction.atomic():
+            FinanceService.settle_orders_financials(orders)
+    except Exception as e:
+        logger.error(f"Financial settlement failed for orders {[order.id for order in orders]}: {e}")
+
+
+def _credit_agents(finalized, commissions):
+    from user.models import UserWallet, WalletTransaction
+
+    now = timezone.now()
+    earned = defaultdict(Decimal)
+    completed = defaultdict(int)
+    for assignment, commission in zip(finalized, commissions):
+        earned[assignment.agent_id] += commission.total_commission
+        completed[assignment.agent_id] += 1
+
+    # Wallets: create missing ones, then one F() update per agent
+    agent_users = {assignment.agent_id: assignment.agent.user_id for assignment in finalized}
+    UserWallet.objects.bulk_create(
+        [UserWallet(user_id=user_id) for user_id in set(agent_users.values())], ignore_conflicts=True
+    )
+    wallet_ids = dict(
+        UserWallet.objects.filter(user_id__in=agent_users.values()).values_list('user_id', 'id')
+    )
+    for agent_id in sorted(earned):
+        amount = earned[agent_id]
+        UserWallet.objects.filter(id=wallet_ids[agent_users[agent_id]]).update(
+            balance=F('balance') + amount, total_credited=F('total_credited') + amount, updated_at=now
+        )
+        DeliveryAgentProfile.objects.filter(id=agent_id).update(
+            total_deliveries=F('total_deliveries') + completed[agent_id],
+            completed_deliveries=F('completed_deliveries') + completed[agent_id],
+            total_earnings=F('total_earnings') + amount,
+            updated_at=now,
+        )
+        bump_daily_stats(
+            agent_id, now.date(), total_deliveries_completed=completed[agent_id], total_earnings=amount
+        )
+
+    WalletTransaction.objects.bulk_create([
+        WalletTransaction(
+            wallet_id=wallet_ids[agent_users[assignment.agent_id]],
+            transaction_type='credit',
+            amount=commission.total_commission,
+            description=f"Delivery Commission for Order {assignment.order.order_number}",
+        )
+        for assignment, commission in zip(finalized, commissions)
+        if commission.total_commission > 0
+    ])
+
+
+def finalize_deliveries(assignment_ids):
+    """
+    Complete the given assignments in one transaction. Assignments already
+    in a final status are skipped. Returns {assignment id: DeliveryCommission}
+    for the ones finalized.
+    """
+    from superAdmin import metrics
+    from user.models import OrderReturn, OrderTracking
+
+    with transaction.atomic(), metrics.batched_changes():
+        assignments = list(
+            DeliveryAssignment.objects.select_for_update(of=('self',))
+            .select_related('agent', 'order')
+            .filter(id__in=assignment_ids)
+            .exclude(status__in=FINAL_STATUSES)
+            .order_by('id')
+        )
+        if not assignments:
+            return {}
+
+        now = timezone.now()
+        for assignment in assignments:
+            _save_locked(assignment, status='delivered', delivery_time=now, completed_at=now)
+
+        returns = [a for a in assignments if a.assignment_type == 'return']
+        deliveries = [a for a in assignments if a.assignment_type != 'return']
+
+        if returns:
+            OrderReturn.objects.filter(
+                order_id__in=[a.order_id for a in returns], status='picked_up'
+            ).update(status='received')
+
+        orders = [a.order for a in deliveries]
+        for order in orders:
+            _save_locked(order, status='delivered', delivered_at=now)
+
+        OrderTracking.objects.bulk_create([_tracking_row(a) for a in assignments])
+        if orders:
+            _settle_vendor_ledgers(orders)
+
+        commissions = []
+        for assignment in assignments:
+            base_fee, bonus, total = commission_for(assignment)
+            commissions.append(DeliveryCommission(
+                agent_id=assignment.agent_id,
+                delivery_assignment=assignment,
+                base_fee=base_fee,
+                distance_bonus=bonus,
+                total_commission=total,
+                status='approved',
+                approved_at=now,
+                notes="Out-of-city Delivery" if bonus else "Local Delivery",
+            ))
+        DeliveryCommission.objects.bulk_create(commissions)
+        # bulk_create sends no post_save, so feed the platform metrics rollup directly
+        for commission in commissions:
+            metrics.record_change(None, metrics.commission_facts(commission))
+
+        _credit_agents(assignments, commissions)
+    return {assignment.id: commission for assignment, commission in zip(assignments, commissions)}
+
+
+def finalize_delivery(assignment):
+    """
+    Complete one assignment (see finalize_deliveries) and update the passed
+    instance to match. Returns its DeliveryCommission, or None when it had
+    already been finalized.
+    """
+    commission = finalize_deliveries([assignment.id]).get(assignment.id)
+    if commission is not None:
+        assignment.status = 'delivered'
+        assignment.delivery_time = assignment.completed_at = commission.approved_at
+        if assignment.assignment_type != 'return' and DeliveryAssignment.order.is_cached(assignment):
+            assignment.order.status = 'delivered'
+            assignment.order.delivered_at = commission.approved_at
+    return commission
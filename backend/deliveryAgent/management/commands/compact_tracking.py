@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from deliveryAgent.tracking import EPSILON_METERS, compact_history
+
+
+class Command(BaseCommand):
+    help = 'Simplify old delivery tracking history (Douglas-Peucker) and purge expired points'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7,
+                            help='Simplify points recorded more than this many days ago (default: 7)')
+        parser.add_argument('--epsilon', type=float, default=EPSILON_METERS,
+                            help=f'Simplification tolerance in metres (default: {EPSILON_METERS})')
+        parser.add_argument('--purge-days', type=int, default=None,
+                            help='Delete points older than this many days altogether')
+
+    def handle(self, *args, **options):
+        purge_after = timedelta(days=options['purge_days']) if options['purge_days'] else None
+        simplified, purged = compact_history(
+            older_than=timedelta(days=options['days']),
+            epsilon=options['epsilon'],
+            purge_after=purge_after,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully compacted tracking history: {simplified} points simplified away, {purged} purged.'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from deliveryAgent.matching import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the delivery agent service area index used by auto-assignment'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {written} agent service areas.'))
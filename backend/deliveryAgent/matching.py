@@ -0,0 +1,165 @@
+"""
+deliveryAgent/matching.py
+Candidate lookup and ranking for delivery auto-assignment.
+
+Agents are found through the AgentServiceArea inverted index (pincode,
+pincode region, city) instead of scanning every profile, their active
+workloads come from one grouped COUNT query, and distances to the delivery
+address are computed for all candidates in one pass.
+"""
+import math
+
+from django.db.models import Count, Q
+
+from .models import AgentServiceArea, DeliveryAgentProfile, DeliveryAssignment
+
+EARTH_RADIUS_KM = 6371
+STATUS_WEIGHTS = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
+UNKNOWN_DISTANCE = float('inf')
+
+
+# ── Service area index ───────────────────────────────────────
+
+def service_area_entries(agent):
+    """(kind, value) index entries for an agent profile."""
+    pincodes = {str(p).strip() for p in (agent.service_pincodes or []) if p}
+    if agent.postal_code:
+        pincodes.add(agent.postal_code.strip())
+    pincodes.discard('')
+
+    entries = {('pincode', p) for p in pincodes}
+    entries |= {('region', p[:3]) for p in pincodes if len(p) >= 3}
+
+    city = (agent.city or '').strip().lower()
+    if city:
+        entries.add(('city', city))
+    entries |= {('service_city', c.strip().lower()) for c in (agent.service_cities or []) if c and c.strip()}
+    return entries
+
+
+def index_agent(agent):
+    """Replace the index rows of one agent."""
+    AgentServiceArea.objects.filter(agent=agent).delete()
+    AgentServiceArea.objects.bulk_create([
+        AgentServiceArea(agent=agent, kind=kind, value=value[:100])
+        for kind, value in service_area_entries(agent)
+    ], ignore_conflicts=True)
+
+
+def rebuild_index(batch_size=500):
+    """Rebuild the whole index from the agent profiles. Returns the number of rows written."""
+    AgentServiceArea.objects.all().delete()
+    rows = []
+    written = 0
+    for agent in DeliveryAgentProfile.objects.only(
+            'id', 'city', 'postal_code', 'service_cities', 'service_pincodes').iterator(chunk_size=batch_size):
+        rows.extend(
+            AgentServiceArea(agent_id=agent.id, kind=kind, value=value[:100])
+            for kind, value in service_area_entries(agent)
+        )
+        if len(rows) >= batch_size:
+            AgentServiceArea.objects.bulk_create(rows, ignore_conflicts=True)
+            written += len(rows)
+            rows = []
+    AgentServiceArea.objects.bulk_create(rows, ignore_conflicts=True)
+    return written + len(rows)
+
+
+# ── Candidate lookup ─────────────────────────────────────────
+
+def eligible_agents():
+    return DeliveryAgentProfile.objects.filter(
+        approval_status='approved',
+        is_blocked=False,
+        is_active=True,
+    )
+
+
+def agents_serving(area_filter):
+    """Eligible agents with at least one index row matching `area_filter` (a Q on AgentServiceArea)."""
+    agent_ids = AgentServiceArea.objects.filter(area_filter).values('agent_id')
+    return list(eligible_agents().filter(id__in=agent_ids).select_related('user'))
+
+
+def active_workloads(agents, statuses):
+    """{agent_id: number of assignments in `statuses`} in one grouped query."""
+    counts = (
+        DeliveryAssignment.objects.filter(agent__in=[a.id for a in agents], status__in=statuses)
+        .values('agent_id')
+        .annotate(active=Count('id'))
+    )
+    return {row['agent_id']: row['active'] for row in counts}
+
+
+# ── Ranking ──────────────────────────────────────────────────
+
+def distances_km(lat, lon, agents):
+    """Great-circle distance from (lat, lon) to each agent; inf where coordinates are missing."""
+    if lat is None or lon is None:
+        return [UNKNOWN_DISTANCE] * len(agents)
+
+    located = [i for i, a in enumerate(agents) if a.latitude is not None and a.longitude is not None]
+    distances = [UNKNOWN_DISTANCE] * len(agents)
+    if not located:
+        return distances
+
+    lat1, lon1 = math.radians(float(lat)), math.radians(float(lon))
+    cos_lat1 = math.cos(lat1)
+    for i in located:
+        lat2 = math.radians(float(agents[i].latitude))
+        lon2 = math.radians(float(agents[i].longitude))
+        a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        distances[i] = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+    return distances
+
+
+def pick_best_agent(agents, address, active_statuses, use_distance=True, use_status=True):
+    """
+    Best agent by (availability status, distance, active workload), the
+    ordering auto-assignment has always used. Returns None for no agents.
+    """
+    if not agents:
+        return None
+
+    workloads = active_workloads(agents, active_statuses)
+    if use_distance:
+        distances = distances_km(address.latitude, address.longitude, agents)
+    else:
+        distances = [UNKNOWN_DISTANCE] * len(agents)
+
+    def sort_key(i):
+        agent = agents[i]
+        status_weight = STATUS_WEIGHTS.get(agent.availability_status, 4) if use_status else 0
+        return (status_weight, distances[i], workloads.get(agent.id, 0))
+
+    return agents[min(range(len(agents)), key=sort_key)]
+
+
+def delivery_tiers(address):
+    """Area filters in priority order for a delivery: pincode, pincode region, city."""
+    pincode = (address.pincode or '').strip()
+    city = (address.city or '').strip().lower()
+    state = (address.state or '').strip().lower()
+
+    tiers = []
+    if pincode:
+        tiers.append(Q(kind='pincode', value=pincode))
+    if len(pincode) >= 3:
+        tiers.append(Q(kind='region', value=pincode[:3]))
+    city_filter = Q(kind='service_city', value__in=[v for v in (city, state) if v])
+    if city:
+        city_filter |= Q(kind='city', value=city)
+    tiers.append(city_filter)
+    return tiers
+
+
+def return_tier(address):
+    """Area filter for a return pickup: exact pincode or city."""
+    pincode = (address.pincode or '').strip()
+    city = (address.city or '').strip().lower()
+    area = Q(pk__in=[])
+    if pincode:
+        area |= Q(kind='pincode', value=pincode)
+    if city:
+        area |= Q(kind__in=['city', 'service_city'], value=city)
+    return area
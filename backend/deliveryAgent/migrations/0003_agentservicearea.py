@@ -0,0 +1,50 @@
+# Generated by Django 5.1 on 2026-10-18 08:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_service_area_index(apps, schema_editor):
+    DeliveryAgentProfile = apps.get_model('deliveryAgent', 'DeliveryAgentProfile')
+    AgentServiceArea = apps.get_model('deliveryAgent', 'AgentServiceArea')
+
+    rows = []
+    for agent in DeliveryAgentProfile.objects.all():
+        pincodes = {str(p).strip() for p in (agent.service_pincodes or []) if p}
+        if agent.postal_code:
+            pincodes.add(agent.postal_code.strip())
+        pincodes.discard('')
+
+        entries = {('pincode', p) for p in pincodes}
+        entries |= {('region', p[:3]) for p in pincodes if len(p) >= 3}
+        city = (agent.city or '').strip().lower()
+        if city:
+            entries.add(('city', city))
+        entries |= {('service_city', c.strip().lower()) for c in (agent.service_cities or []) if c and c.strip()}
+
+        rows.extend(AgentServiceArea(agent_id=agent.id, kind=kind, value=value[:100]) for kind, value in entries)
+    AgentServiceArea.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentServiceArea',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('pincode', 'Pincode'), ('region', 'Pincode Region'), ('city', 'Home City'), ('service_city', 'Service City')], max_length=20)),
+                ('value', models.CharField(max_length=100)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_areas', to='deliveryAgent.deliveryagentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'value'], name='deliveryAge_kind_11b741_idx')],
+                'constraints': [models.UniqueConstraint(fields=('agent', 'kind', 'value'), name='unique_agent_service_area')],
+            },
+        ),
+        migrations.RunPython(build_service_area_index, migrations.RunPython.noop),
+    ]
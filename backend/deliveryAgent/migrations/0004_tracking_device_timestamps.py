@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 08:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0003_agentservicearea'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deliverytracking',
+            name='tracked_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
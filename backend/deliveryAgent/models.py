@@ -170,6 +170,40 @@ class DeliveryAgentProfile(models.Model):
         ).aggregate(Sum('total_commission'))['total_commission__sum'] or Decimal('0.00')
 
 
+# ===============================================
+#      AGENT SERVICE AREA INDEX
+# ===============================================
+
+class AgentServiceArea(models.Model):
+    """
+    Inverted index of the areas an agent serves (one row per pincode, pincode
+    region or city), rebuilt from DeliveryAgentProfile by deliveryAgent.matching
+    so that assignment can look agents up by area instead of scanning them all.
+    """
+
+    KIND_CHOICES = [
+        ('pincode', 'Pincode'),            # service_pincodes + postal_code
+        ('region', 'Pincode Region'),      # first 3 digits of the above
+        ('city', 'Home City'),             # profile city
+        ('service_city', 'Service City'),  # service_cities
+    ]
+
+    agent = models.ForeignKey(DeliveryAgentProfile, on_delete=models.CASCADE, related_name='service_areas')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'value']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['agent', 'kind', 'value'], name='unique_agent_service_area')
+        ]
+
+    def __str__(self):
+        return f"{self.agent_id} serves {self.kind}={self.value}"
+
+
 # ===============================================
 #      DELIVERY ASSIGNMENT MODEL
 # ===============================================
@@ -335,89 +369,9 @@ class DeliveryAssignment(models.Model):
     
     def mark_delivered(self):
         """Mark delivery as completed (Finalize standard delivery OR return pickup)"""
-        from user.models import UserWallet, Order, OrderReturn
-        from .models import DeliveryCommission, DeliveryDailyStats
-        
-        self.status = 'delivered'
-        self.delivery_time = timezone.now()
-        self.completed_at = timezone.now()
-        self.save()
+        from .finalization import finalize_delivery
 
-        if self.assignment_type == 'return':
-            # 1. Finalize all relevant Return Requests for this order
-            OrderReturn.objects.filter(
-                order=self.order, 
-                status='picked_up'
-            ).update(status='received')
-            
-            # Create Tracking
-            from user.models import OrderTracking
-            OrderTracking.objects.create(
-                order=self.order,
-                status='Return Received at Warehouse',
-                location=self.delivery_city,
-                notes="Return package(s) received and verified at the hub/warehouse."
-            )
-        else:
-            # Standard Delivery Finalization
-            if self.order:
-                self.order.status = 'delivered'
-                self.order.delivered_at = self.delivery_time
-                self.order.save(update_fields=['status', 'delivered_at'])
-                
-                from user.models import OrderTracking
-                OrderTracking.objects.create(
-                    order=self.order,
-                    status='Delivered',
-                    location=self.delivery_city,
-                    notes="Order successfully delivered and verified via OTP."
-                )
-            
-            # Settle Vendor Ledger (sets 3-day window)
-            try:
-                from finance.services import FinanceService
-                FinanceService.settle_order_financials(self.order)
-            except Exception as e:
-                print(f"DEBUG: Financial settlement error: {str(e)}")
-
-        # 2. Calculate Commission
-        is_local = self.delivery_city.lower() == self.agent.city.lower()
-        
-        distance_bonus = Decimal('0.00')
-        if not is_local:
-            distance_bonus = self.delivery_fee * Decimal('0.20')
-        
-        total_commission = self.delivery_fee + distance_bonus
-
-        commission = DeliveryCommission.objects.create(
-            agent=self.agent,
-            delivery_assignment=self,
-            base_fee=self.delivery_fee,
-            distance_bonus=distance_bonus,
-            total_commission=total_commission,
-            status='approved',
-            approved_at=timezone.now(),
-            notes="Local Delivery" if is_local else "Out-of-city Delivery"
-        )
-        
-        # 3. Credit agent's wallet
-        wallet, created = UserWallet.objects.get_or_create(user=self.agent.user)
-        wallet.add_balance(total_commission, f"Delivery Commission for Order {self.order.order_number}")
-        
-        # 4. Update agent profile stats
-        self.agent.total_deliveries += 1
-        self.agent.completed_deliveries += 1
-        self.agent.total_earnings = Decimal(str(self.agent.total_earnings)) + total_commission
-        self.agent.save()
-
-        # 5. Update daily stats
-        stats, created = DeliveryDailyStats.objects.get_or_create(
-            agent=self.agent,
-            date=timezone.now().date()
-        )
-        stats.total_deliveries_completed += 1
-        stats.total_earnings = Decimal(str(stats.total_earnings)) + total_commission
-        stats.save()
+        return finalize_delivery(self)
     
     def mark_failed(self, reason=None):
         """Mark delivery as failed"""
@@ -466,8 +420,8 @@ class DeliveryTracking(models.Model):
     status = models.CharField(max_length=50)  # e.g., "Picked Up", "In Transit", "Arrived"
     speed = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # in km/h
     
-    # Timestamp
-    tracked_at = models.DateTimeField(auto_now_add=True)
+    # Timestamp (set by the device for points uploaded in a batch)
+    tracked_at = models.DateTimeField(default=timezone.now)
     
     # Additional Info
     notes = models.TextField(blank=True, null=True)
@@ -7,7 +7,10 @@ from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 
-from .models import DeliveryAgentProfile, DeliveryAssignment, DeliveryTracking
+from .models import DeliveryAssignment, DeliveryTracking
+from .matching import agents_serving, delivery_tiers, eligible_agents, pick_best_agent, return_tier
+
+ACTIVE_DELIVERY_STATUSES = ['assigned', 'accepted', 'picked_up', 'in_transit', 'arrived', 'attempting_delivery']
 
 
 import math
@@ -35,9 +38,10 @@ def auto_assign_order(order):
     """
     Try to auto-assign `order` to the best available delivery agent.
 
-    Matching criteria:
+    Matching criteria (see deliveryAgent.matching):
       1. Pincode Match (Tier 1)
-      2. City Match (Tier 2)
+      2. Pincode Region Match (Tier 2)
+      3. City Match (Tier 3)
       
     Priority within Tiers:
       - Physical Proximity (if coordinates available)
@@ -49,10 +53,6 @@ def auto_assign_order(order):
         return None
 
     delivery_city = (delivery_address.city or '').strip().lower()
-    delivery_state = (delivery_address.state or '').strip().lower()
-    delivery_pincode = (delivery_address.pincode or '').strip()
-    delivery_lat = delivery_address.latitude
-    delivery_lon = delivery_address.longitude
 
     # Removed immediate return if no city, to allow global fallback if one agent is available
 
@@ -60,93 +60,27 @@ def auto_assign_order(order):
     if DeliveryAssignment.objects.filter(order=order).exists():
         return None
 
-    # ── Find all eligible agents ─────────────────────────────────────────
-    # We include all approved, active, and non-blocked agents.
-    # We will prioritize 'available' and 'on_delivery' status later in sorting.
-    candidates = DeliveryAgentProfile.objects.filter(
-        approval_status='approved',
-        is_blocked=False,
-        is_active=True,
-    )
-
-    matched_pincode = []  # Tier 1: Exact Pincode
-    matched_region = []   # Tier 2: Same Pincode Region (First 3 digits)
-    matched_city = []     # Tier 3: Same City
-
-    for agent in candidates:
-        agent_city = (agent.city or '').strip().lower()
-        service_cities = [c.strip().lower() for c in (agent.service_cities or []) if c]
-        service_pincodes = [str(p).strip() for p in (agent.service_pincodes or []) if p]
-        
-        # 1. Check Exact Pincode Match
-        pincode_match = delivery_pincode in service_pincodes or agent.postal_code == delivery_pincode
-        
-        # 2. Check Regional Match (First 3 digits of Pincode)
-        region_match = False
-        if not pincode_match and len(delivery_pincode) >= 3:
-            delivery_prefix = delivery_pincode[:3]
-            agent_prefixes = [p[:3] for p in service_pincodes if len(p) >= 3]
-            region_match = delivery_prefix in agent_prefixes or (agent.postal_code or '')[:3] == delivery_prefix
-
-        # 3. Check City/State Match
-        city_match = (
-            agent_city == delivery_city
-            or delivery_city in service_cities
-            or delivery_state in service_cities
-        )
-
-        if pincode_match or region_match or city_match:
-            active_count = DeliveryAssignment.objects.filter(
-                agent=agent,
-                status__in=['assigned', 'accepted', 'picked_up', 'in_transit', 'arrived', 'attempting_delivery']
-            ).count()
-            
-            # Status Weight: available(0), on_delivery(1), on_break(2), offline(3)
-            status_map = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
-            status_weight = status_map.get(agent.availability_status, 4)
-
-            # Calculate distance if coordinates available
-            distance = haversine_distance(delivery_lat, delivery_lon, agent.latitude, agent.longitude)
-            
-            # Tiered assignment
-            if pincode_match:
-                matched_pincode.append((agent, status_weight, distance, active_count))
-            elif region_match:
-                matched_region.append((agent, status_weight, distance, active_count))
-            else:
-                matched_city.append((agent, status_weight, distance, active_count))
-
-    # Selection Priority: Tier 1 > Tier 2 > Tier 3
-    if matched_pincode:
-        tier_candidates = matched_pincode
-    elif matched_region:
-        tier_candidates = matched_region
-    elif matched_city:
-        tier_candidates = matched_city
-    else:
+    # ── Find candidates tier by tier through the service area index ──────
+    # Tier 1: exact pincode, Tier 2: pincode region (first 3 digits), Tier 3: city/state
+    best_agent = None
+    for area_filter in delivery_tiers(delivery_address):
+        tier_candidates = agents_serving(area_filter)
+        if tier_candidates:
+            # Priority within a tier: availability status, proximity, then fewest active orders
+            best_agent = pick_best_agent(tier_candidates, delivery_address, ACTIVE_DELIVERY_STATUSES)
+            break
+
+    if best_agent is None:
         # ── Tier 4: Global Fallback (Any agent if no local match) ───────────
         # This solves the "No agents available" issue when only one agent is 
         # present but city/pincode doesn't match perfectly.
-        tier_candidates = []
-        for agent in candidates:
-             # Just use workload and status for global fallback
-             active_count = DeliveryAssignment.objects.filter(
-                 agent=agent,
-                 status__in=['assigned', 'accepted', 'picked_up', 'in_transit', 'arrived', 'attempting_delivery']
-             ).count()
-             status_map = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
-             status_weight = status_map.get(agent.availability_status, 4)
-             tier_candidates.append((agent, status_weight, 999999, active_count))
-
-    if not tier_candidates:
-        return None
+        best_agent = pick_best_agent(
+            list(eligible_agents().select_related('user')), delivery_address,
+            ACTIVE_DELIVERY_STATUSES, use_distance=False
+        )
 
-    # Sort logic: 
-    # 1. Availability Status (Weight)
-    # 2. Proximity (Distance)
-    # 3. Number of active orders (Load balance)
-    tier_candidates.sort(key=lambda x: (x[1], x[2], x[3]))
-    best_agent = tier_candidates[0][0]
+    if best_agent is None:
+        return None
 
     # ── Compute delivery fee ─────────────────────────────────────────────────
     # Simple rule: ₹50 base, +₹30 if out-of-city vs agent's primary city
@@ -211,32 +145,23 @@ def auto_assign_order(order):
         order.save(update_fields=['status'])
     # 'confirmed' status: leave unchanged — vendor still needs to ship
 
-    # Send notification to Agent (non-fatal)
-    try:
-        from django.core.mail import send_mail
-        from django.conf import settings
-        
-        subject = f"New Delivery Assignment: {order.order_number}"
-        message = (
-            f"Hello {best_agent.user.username},\n\n"
-            f"You have been automatically assigned a new delivery task!\n\n"
-            f"Order: {order.order_number}\n"
-            f"Pickup From: {pickup_address}\n"
-            f"Deliver To: {delivery_addr_text}\n"
-            f"Estimated Date: {estimated_date}\n"
-            f"Your Delivery Fee: ₹{delivery_fee}\n\n"
-            "Please log in to your dashboard to accept the order and begin the process.\n\n"
-            "Regards,\nShopSphere Logistics"
-        )
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[best_agent.user.email],
-            fail_silently=True
-        )
-    except Exception as e:
-        print(f"Agent Notification Failed: {e}")
+    # Notify the agent after commit via the outbox worker (user/outbox.py)
+    from user.outbox import enqueue
+
+    subject = f"New Delivery Assignment: {order.order_number}"
+    message = (
+        f"Hello {best_agent.user.username},\n\n"
+        f"You have been automatically assigned a new delivery task!\n\n"
+        f"Order: {order.order_number}\n"
+        f"Pickup From: {pickup_address}\n"
+        f"Deliver To: {delivery_addr_text}\n"
+        f"Estimated Date: {estimated_date}\n"
+        f"Your Delivery Fee: ₹{delivery_fee}\n\n"
+        "Please log in to your dashboard to accept the order and begin the process.\n\n"
+        "Regards,\nShopSphere Logistics"
+    )
+    if best_agent.user.email:
+        enqueue('send_email', subject=subject, message=message, recipient_list=[best_agent.user.email])
 
     return assignment
 
@@ -253,52 +178,22 @@ def auto_assign_return(order, return_requests=None):
     if DeliveryAssignment.objects.filter(order=order, assignment_type='return', status__in=['assigned', 'accepted', 'picked_up']).exists():
         return None
 
-    # 2. Get Candidates (Same logic as standard delivery)
-    candidates = DeliveryAgentProfile.objects.filter(
-        approval_status='approved',
-        is_blocked=False,
-        is_active=True,
-    )
-    
+    # 2. Get Candidates: agents serving the pickup pincode or city (service area index)
     delivery_address = order.delivery_address
-    delivery_city = (delivery_address.city or '').strip().lower()
-    delivery_pincode = (delivery_address.pincode or '').strip()
-    
-    tier_candidates = []
-    for agent in candidates:
-        agent_city = (agent.city or '').strip().lower()
-        service_cities = [c.strip().lower() for c in (agent.service_cities or []) if c]
-        service_pincodes = [str(p).strip() for p in (agent.service_pincodes or []) if p]
-
-        pincode_match = delivery_pincode in service_pincodes or agent.postal_code == delivery_pincode
-        city_match = (agent_city == delivery_city or delivery_city in service_cities)
-
-        if pincode_match or city_match:
-            active_count = DeliveryAssignment.objects.filter(
-                agent=agent,
-                status__in=['assigned', 'accepted', 'picked_up', 'in_transit']
-            ).count()
-            
-            # Distance if coordinates available
-            distance = haversine_distance(delivery_address.latitude, delivery_address.longitude, agent.latitude, agent.longitude)
-            
-            # Status weight (available=0, on_delivery=1, etc)
-            status_map = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
-            status_weight = status_map.get(agent.availability_status, 4)
-            
-            tier_candidates.append((agent, status_weight, distance, active_count))
-
-    if not tier_candidates:
-        # Global fallback
-        for agent in candidates:
-             active_count = DeliveryAssignment.objects.filter(agent=agent, status__in=['assigned', 'accepted', 'picked_up', 'in_transit', 'arrived', 'attempting_delivery']).count()
-             tier_candidates.append((agent, 0, 999999, active_count))
-
-    if not tier_candidates:
-        return None
+    best_agent = pick_best_agent(
+        agents_serving(return_tier(delivery_address)), delivery_address,
+        ['assigned', 'accepted', 'picked_up', 'in_transit']
+    )
 
-    tier_candidates.sort(key=lambda x: (x[1], x[2], x[3]))
-    best_agent = tier_candidates[0][0]
+    if best_agent is None:
+        # Global fallback: least busy eligible agent
+        best_agent = pick_best_agent(
+            list(eligible_agents().select_related('user')), delivery_address,
+            ACTIVE_DELIVERY_STATUSES, use_distance=False, use_status=False
+        )
+
+    if best_agent is None:
+        return None
 
     # 3. Create Assignment
     # For a return, the 'pickup_address' is the CUSTOMER address
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from user import live
+from .models import DeliveryAgentProfile, DeliveryAssignment
+from .matching import index_agent
+
+# Profile fields the service area index is built from
+SERVICE_AREA_FIELDS = {'city', 'postal_code', 'service_cities', 'service_pincodes'}
+# Assignment fields shown in the live tracking feed
+LIVE_FIELDS = {'status', 'pickup_time', 'delivery_time', 'attempts_count', 'failure_reason', 'estimated_delivery_date'}
+
+
+@receiver(post_save, sender=DeliveryAgentProfile)
+def update_service_area_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SERVICE_AREA_FIELDS.intersection(update_fields):
+        return
+    index_agent(instance)
+
+
+@receiver(post_save, sender=DeliveryAssignment)
+def publish_assignment_state(sender, instance, update_fields=None, **kwargs):
+    # Covers the transition methods (accept_delivery, mark_in_transit, mark_delivered, ...) and direct status edits
+    if update_fields is not None and LIVE_FIELDS.isdisjoint(update_fields):
+        return
+    live.publish(instance.order_id, 'assignment', live.assignment_state(instance))
@@ -1,3 +1,170 @@
+import threading
+from decimal import Decimal
+import uuid
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from deliveryAgent import matching, tracking
+from deliveryAgent.finalization import finalize_deliveries
+from deliveryAgent.models import (
+    AgentServiceArea, DeliveryAgentProfile, DeliveryAssignment, DeliveryCommission, DeliveryTracking,
+)
+from deliveryAgent.services import auto_assign_order
+from user.models import AuthUser, Order, UserWallet
+from user.tests import make_address, make_customer
+
+
+def make_agent(name, city='Hyderabad', postal_code='500001', **fields):
+    user = AuthUser.objects.create_user(username=name, email=f'{name}@example.com', password='pw123456', role='delivery')
+    values = dict(
+        user=user, phone_number='9999999999', address='Street 1', city=city, state='Telangana',
+        postal_code=postal_code, vehicle_type='bike', bank_holder_name=name, bank_account_number='123456',
+        bank_ifsc_code='IFSC0001', bank_name='Bank', approval_status='approved', availability_status='available',
+    )
+    values.update(fields)
+    return DeliveryAgentProfile.objects.create(**values)
+
+
+def make_assignment(agent, order=None, **fields):
+    values = dict(
+        agent=agent, order=order or make_order(), pickup_address='Shop', delivery_address='Home',
+        delivery_city='Hyderabad', estimated_delivery_date='2026-01-01', delivery_fee=50,
+    )
+    values.update(fields)
+    return DeliveryAssignment.objects.create(**values)
+
+
+def make_order(customer=None, address=None, **fields):
+    customer = customer or make_customer(f'customer-{uuid.uuid4().hex[:8]}')
+    values = dict(
+        user=customer, order_number=f'ORD-{uuid.uuid4().hex[:8].upper()}', payment_method='cod',
+        payment_status='completed', status='confirmed', total_amount=500,
+        delivery_address=address or make_address(customer),
+    )
+    values.update(fields)
+    return Order.objects.create(**values)
+
+
+# ── Agent matching ──────────────────────────────────────────
+
+class AgentMatchingTests(TestCase):
+    def test_pincode_match_beats_region_and_city(self):
+        make_agent('city', postal_code='500099', latitude=17.38, longitude=78.48)
+        make_agent('region', postal_code='500002')
+        pincode = make_agent('pincode', postal_code='500001', availability_status='on_delivery')
+
+        assignment = auto_assign_order(make_order())
+        self.assertEqual(assignment.agent, pincode)
+
+    def test_least_busy_agent_wins_within_a_tier(self):
+        busy = make_agent('busy')
+        idle = make_agent('idle')
+        make_assignment(busy)
+        self.assertEqual(auto_assign_order(make_order()).agent, idle)
+
+    def test_nearest_located_agent_wins_within_a_tier(self):
+        far = make_agent('far', latitude=17.50, longitude=78.60)
+        near = make_agent('near', latitude=17.39, longitude=78.49)
+        unknown = make_agent('unknown')
+        distances = matching.distances_km(17.385, 78.486, [far, near, unknown])
+        self.assertAlmostEqual(distances[1], 0.7, places=1)
+        self.assertGreater(distances[0], distances[1])
+        self.assertEqual(distances[2], matching.UNKNOWN_DISTANCE)
+
+        customer = make_customer('located')
+        address = make_address(customer)
+        address.latitude, address.longitude = Decimal('17.385'), Decimal('78.486')
+        address.save()
+        self.assertEqual(auto_assign_order(make_order(customer, address)).agent, near)
+
+    def test_index_follows_profile_changes(self):
+        agent = make_agent('mover')
+        agent.postal_code = '600001'
+        agent.city = 'Chennai'
+        agent.service_cities = ['Vellore']
+        agent.save()
+        self.assertEqual(
+            set(AgentServiceArea.objects.filter(agent=agent).values_list('kind', 'value')),
+            {('pincode', '600001'), ('region', '600'), ('city', 'chennai'), ('service_city', 'vellore')},
+        )
+
+
+# ── Location tracking ───────────────────────────────────────
+
+class TrackingBufferTests(TestCase):
+    def setUp(self):
+        self.assignment = make_assignment(make_agent('agent1'))
+        self.point = tracking.clean_point({'latitude': '17.385', 'longitude': '78.4867'})
+
+    def test_buffered_pings_are_written_in_one_flush(self):
+        buffer = tracking.TrackingBuffer(flush_size=3, flush_seconds=60)
+        self.addCleanup(buffer.flush)
+        self.assertEqual(buffer.add(self.assignment.id, self.point), 0)
+        self.assertEqual(buffer.add(self.assignment.id, self.point), 0)
+        self.assertFalse(DeliveryTracking.objects.exists())
+        self.assertEqual(buffer.add(self.assignment.id, self.point), 3)
+        self.assertEqual(DeliveryTracking.objects.filter(delivery_assignment=self.assignment).count(), 3)
+
+    def test_single_ping_stores_current_location_and_keeps_its_response(self):
+        self.addCleanup(tracking.tracking_buffer.flush)
+        client = APIClient()
+        client.force_authenticate(self.assignment.agent.user)
+        url = reverse('delivery-tracking-update-location', kwargs={'pk': self.assignment.id})
+
+        response = client.post(url, {'latitude': '17.385', 'longitude': '78.4867', 'address': 'Abids'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            {key: response.data[key] for key in ('latitude', 'longitude', 'address', 'status')},
+            {'latitude': '17.385000', 'longitude': '78.486700', 'address': 'Abids', 'status': 'In Transit'},
+        )
+        self.assertEqual(
+            DeliveryAssignment.objects.get(id=self.assignment.id).current_location,
+            {'latitude': 17.385, 'longitude': 78.4867, 'address': 'Abids'},
+        )
+        self.assertEqual(client.post(url, {'latitude': 'north'}, format='json').status_code, 400)
+
+    def test_timer_flushes_without_another_ping(self):
+        buffer = tracking.TrackingBuffer(flush_seconds=0.05)
+        flushed = threading.Event()
+        with mock.patch.object(buffer, 'flush', side_effect=lambda: flushed.set()):
+            buffer.add(self.assignment.id, self.point)
+            self.assertTrue(flushed.wait(5))
+
+
+# ── Finalization ────────────────────────────────────────────
+
+class FinalizationTests(TestCase):
+    def setUp(self):
+        self.agents = [make_agent('agent1'), make_agent('agent2')]
+
+    def assignments(self, count):
+        return [
+            make_assignment(self.agents[i % 2], make_order(status='shipping'), status='arrived')
+            for i in range(count)
+        ]
+
+    def test_double_submit_pays_the_agent_once(self):
+        assignment = self.assignments(1)[0]
+        self.assertIsNotNone(assignment.mark_delivered())
+        self.assertIsNone(DeliveryAssignment.objects.get(id=assignment.id).mark_delivered())
+
+        agent = DeliveryAgentProfile.objects.get(id=assignment.agent_id)
+        self.assertEqual((agent.completed_deliveries, agent.total_earnings), (1, Decimal('50.00')))
+        self.assertEqual(UserWallet.objects.get(user=agent.user).balance, Decimal('50.00'))
+        self.assertEqual(DeliveryCommission.objects.count(), 1)
+        self.assertEqual(Order.objects.get(id=assignment.order_id).status, 'delivered')
 
-# Create your tests here.
+    def test_each_extra_delivery_costs_two_queries(self):
+        finalize_deliveries([a.id for a in self.assignments(2)])  # wallets and daily stats rows exist from here on
+        counts = []
+        for size in (2, 6):
+            ids = [a.id for a in self.assignments(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(len(finalize_deliveries(ids)), size)
+            counts.append(len(queries))
+        self.assertEqual(counts[1] - counts[0], 2 * 4)  # one assignment and one order UPDATE each
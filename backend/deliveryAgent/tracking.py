@@ -0,0 +1,282 @@
+"""
+deliveryAgent/tracking.py
+GPS location ingestion and tracking history retention.
+
+Location pings are the highest-volume write in the app, so they avoid the
+per-ping INSERT plus full DeliveryAssignment save:
+
+- `ingest()` stores a batch of points (the batch endpoint) with one
+  bulk_create and moves the assignment's `current_location` to the newest
+  point with a single-column UPDATE, which is also pushed to customers
+  watching the order (user/live.py).
+- Single pings go through `tracking_buffer`: `current_location` is still
+  updated immediately, but the history rows are held in memory and written
+  with bulk_create once FLUSH_SIZE points have accumulated, by a timer
+  FLUSH_SECONDS after the first buffered point, and at process exit. A
+  crashed worker loses at most that window of history points, never the
+  current location. History reads flush their own process's buffer first;
+  points buffered by other workers show up within FLUSH_SECONDS.
+- `compact_history()` thins old history with Douglas-Peucker route
+  simplification, keeping status changes, and can purge very old points.
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from user import live
+from .models import DeliveryAssignment, DeliveryTracking
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_POINTS = 500
+FLUSH_SIZE = 200
+FLUSH_SECONDS = 5
+DEFAULT_STATUS = 'In Transit'
+
+# Route simplification tolerance: points closer than this to the simplified line are dropped
+EPSILON_METERS = 15
+METERS_PER_DEGREE = 111320
+
+
+# ── Points ──────────────────────────────────────────────────
+
+def _coordinate(value, name, limit):
+    try:
+        value = Decimal(str(value)).quantize(Decimal('0.000001'))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a number")
+    if not value.is_finite() or abs(value) > limit:
+        raise ValueError(f"'{name}' must be between -{limit} and {limit}")
+    return value
+
+
+def clean_point(data, received_at=None):
+    """
+    Validate one location point from request data. `tracked_at` (ISO 8601)
+    is optional and lets devices upload points they collected offline.
+    Raises ValueError.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Each point must be an object')
+    if data.get('latitude') in (None, '') or data.get('longitude') in (None, ''):
+        raise ValueError('latitude and longitude are required')
+
+    tracked_at = received_at or timezone.now()
+    if data.get('tracked_at'):
+        parsed = parse_datetime(str(data['tracked_at']))
+        if parsed is None:
+            raise ValueError("'tracked_at' must be an ISO 8601 datetime")
+        if timezone.is_aware(parsed) and not timezone.is_aware(tracked_at):
+            parsed = timezone.make_naive(parsed)
+        tracked_at = min(parsed, tracked_at)  # no points from the future
+
+    speed = data.get('speed')
+    if speed not in (None, ''):
+        try:
+            speed = Decimal(str(speed)).quantize(Decimal('0.01'))
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValueError("'speed' must be a number")
+    else:
+        speed = None
+
+    return {
+        'latitude': _coordinate(data['latitude'], 'latitude', 90),
+        'longitude': _coordinate(data['longitude'], 'longitude', 180),
+        'address': data.get('address') or '',
+        'status': data.get('status') or DEFAULT_STATUS,
+        'speed': speed,
+        'notes': data.get('notes') or '',
+        'tracked_at': tracked_at,
+    }
+
+
+def location_of(point):
+    return {
+        'latitude': float(point['latitude']),
+        'longitude': float(point['longitude']),
+        'address': point['address'],
+    }
+
+
+def set_current_location(assignment, point):
+    """Write only `current_location` (no full-row save, no model signals) and push it to live trackers."""
+    location = location_of(point)
+    DeliveryAssignment.objects.filter(id=assignment.id).update(current_location=location)
+    live.publish(assignment.order_id, 'location', location)
+
+
+def ingest(assignment, points):
+    """Store a batch of cleaned points for an assignment. Returns the created rows."""
+    points = sorted(points, key=lambda point: point['tracked_at'])
+    rows = [DeliveryTracking(delivery_assignment_id=assignment.id, **point) for point in points]
+    with transaction.atomic():
+        DeliveryTracking.objects.bulk_create(rows)
+        set_current_location(assignment, points[-1])
+    return rows
+
+
+# ── Buffered single pings ───────────────────────────────────
+
+class TrackingBuffer:
+    """In-process buffer of tracking rows, flushed with one bulk_create."""
+
+    def __init__(self, flush_size=FLUSH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self._rows = []
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, assignment_id, point):
+        """Queue a point; flushes when the buffer is full or old enough. Returns the rows written."""
+        with self._lock:
+            self._rows.append(DeliveryTracking(delivery_assignment_id=assignment_id, **point))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = len(self._rows) >= self.flush_size or time.monotonic() - self._oldest >= self.flush_seconds
+            if not due and self._timer is None:
+                # Without it, a quiet worker would hold its points until the next ping
+                self._timer = threading.Timer(self.flush_seconds, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        return self.flush() if due else 0
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Could not flush buffered tracking points: {e}")
+        finally:
+            connection.close()  # the timer thread's own connection
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows, self._oldest = self._rows, [], None
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if not rows:
+            return 0
+        # Assignments deleted while their points sat in the buffer would fail the whole insert
+        existing = set(DeliveryAssignment.objects.filter(
+            id__in={row.delivery_assignment_id for row in rows}).values_list('id', flat=True))
+        rows = [row for row in rows if row.delivery_assignment_id in existing]
+        DeliveryTracking.objects.bulk_create(rows, batch_size=self.flush_size)
+        return len(rows)
+
+
+tracking_buffer = TrackingBuffer()
+
+
+def record_ping(assignment, point):
+    """Handle a single location ping: current location now, history via the buffer."""
+    set_current_location(assignment, point)
+    tracking_buffer.add(assignment.id, point)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        tracking_buffer.flush()
+    except Exception as e:
+        logger.error(f"Could not flush {len(tracking_buffer)} buffered tracking points: {e}")
+
+
+# ── Route simplification and retention ──────────────────────
+
+def _project(points):
+    """Equirectangular projection to metres, accurate enough over a delivery route."""
+    if not points:
+        return []
+    scale = math.cos(math.radians(float(points[0][0])))
+    return [(float(lon) * METERS_PER_DEGREE * scale, float(lat) * METERS_PER_DEGREE) for lat, lon in points]
+
+
+def _distance_to_segment(point, start, end):
+    (px, py), (ax, ay), (bx, by) = point, start, end
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0, min(1, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def simplify(points, epsilon=EPSILON_METERS):
+    """
+    Douglas-Peucker simplification of a route given as (latitude, longitude)
+    pairs. Returns the indexes of the points to keep, always including both
+    ends. Iterative, so long routes cannot hit the recursion limit.
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+    projected = _project(points)
+    keep = {0, len(points) - 1}
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        farthest, distance = None, epsilon
+        for index in range(first + 1, last):
+            d = _distance_to_segment(projected[index], projected[first], projected[last])
+            if d > distance:
+                farthest, distance = index, d
+        if farthest is not None:
+            keep.add(farthest)
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return sorted(keep)
+
+
+def simplify_history(rows, epsilon=EPSILON_METERS):
+    """Ids of tracking rows (ordered by time) to delete: off-route points that carry no status change or notes."""
+    keep = set(simplify([(row.latitude, row.longitude) for row in rows], epsilon))
+    previous_status = None
+    for index, row in enumerate(rows):
+        if row.status != previous_status or row.notes:
+            keep.add(index)
+        previous_status = row.status
+    return [row.id for index, row in enumerate(rows) if index not in keep]
+
+
+def compact_history(older_than=timedelta(days=7), epsilon=EPSILON_METERS, purge_after=None):
+    """
+    Simplify the tracking history recorded before `older_than` ago, per
+    assignment, and delete points older than `purge_after` altogether.
+    Returns (points removed by simplification, points purged).
+    """
+    now = timezone.now()
+    cutoff = now - older_than
+    purged = 0
+    if purge_after is not None:
+        purged, _ = DeliveryTracking.objects.filter(tracked_at__lt=now - purge_after).delete()
+
+    simplified = 0
+    old_points = DeliveryTracking.objects.filter(tracked_at__lt=cutoff)
+    assignment_ids = (
+        old_points.order_by().values('delivery_assignment_id')
+        .annotate(points=Count('id')).filter(points__gt=2)
+        .values_list('delivery_assignment_id', flat=True)
+    )
+    for assignment_id in list(assignment_ids):
+        rows = list(
+            old_points.filter(delivery_assignment_id=assignment_id)
+            .only('id', 'latitude', 'longitude', 'status', 'notes')
+            .order_by('tracked_at', 'id')
+        )
+        drop = simplify_history(rows, epsilon)
+        if drop:
+            DeliveryTracking.objects.filter(id__in=drop).delete()
+            simplified += len(drop)
+    return simplified, purged
@@ -0,0 +1,186 @@
+"""
+finance/balances.py
+Running vendor balances.
+
+The ledger stays the source of truth, but re-summing it on every dashboard
+load or payout costs more as a vendor's history grows. VendorBalance keeps
+the totals instead:
+
+- `record_entry()` is called by FinanceService._create_ledger_entry just
+  before each insert, in the same transaction, and adds the entry with a
+  single UPDATE of the vendor's balance row.
+- `settle_entries()` flips is_settled on a set of entries and moves their
+  amounts between `uncleared` and `available`.
+- `checkpoint()` verifies a vendor's running totals against the ledger. It
+  only sums the entries added since the previous BalanceCheckpoint, and can
+  repair any drift it finds.
+
+Ledger rows are inserted after their vendor's balance row is locked, so a
+checkpoint that holds that lock sees every committed entry up to the highest
+id it reads. Any entry inserted later gets a higher id.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+
+logger = logging.getLogger(__name__)
+
+EARNING_TYPES = ('REVENUE', 'COMMISSION')
+TOTAL_FIELDS = ('lifetime_earnings', 'revenue_entries', 'total_gross', 'total_commission', 'total_net')
+ZERO = Decimal('0.00')
+
+
+def ledger_totals(entries):
+    """Totals of a LedgerEntry queryset, in VendorBalance terms, in one aggregate query."""
+    totals = entries.aggregate(
+        ledger_total=Sum('amount'),
+        uncleared=Sum('amount', filter=Q(is_settled=False)),
+        lifetime_earnings=Sum('amount', filter=Q(entry_type__in=EARNING_TYPES)),
+        revenue_entries=Count('id', filter=Q(entry_type='REVENUE')),
+        total_gross=Sum('gross_amount', filter=Q(entry_type='REVENUE')),
+        total_commission=Sum('commission_amount', filter=Q(entry_type='REVENUE')),
+        total_net=Sum('net_amount', filter=Q(entry_type='REVENUE')),
+        last_entry_id=Max('id'),
+    )
+    return {key: value if value is not None else (0 if key in ('revenue_entries', 'last_entry_id') else ZERO)
+            for key, value in totals.items()}
+
+
+def get_balance(vendor_id, lock=False):
+    """
+    The vendor's VendorBalance, computed from the ledger the first time it
+    is needed. With lock=True the row is locked until the transaction ends.
+    """
+    from .models import LedgerEntry, VendorBalance
+
+    balances = VendorBalance.objects.select_for_update() if lock else VendorBalance.objects
+    balance = balances.filter(vendor_id=vendor_id).first()
+    if balance is None:
+        totals = ledger_totals(LedgerEntry.objects.filter(vendor_id=vendor_id))
+        VendorBalance.objects.get_or_create(vendor_id=vendor_id, defaults={
+            'available': totals['ledger_total'] - totals['uncleared'],
+            'uncleared': totals['uncleared'],
+            **{field: totals[field] for field in TOTAL_FIELDS},
+        })
+        balance = balances.get(vendor_id=vendor_id)
+    return balance
+
+
+def record_entry(vendor_id, amount, entry_type, is_settled, gross_amount=0, commission_amount=0, net_amount=0):
+    """Add a ledger entry that is about to be inserted to the vendor's running balance."""
+    from .models import VendorBalance
+
+    get_balance(vendor_id)
+    bucket = 'available' if is_settled else 'uncleared'
+    updates = {bucket: F(bucket) + amount}
+    if entry_type in EARNING_TYPES:
+        updates['lifetime_earnings'] = F('lifetime_earnings') + amount
+    if entry_type == 'REVENUE':
+        updates.update(
+            revenue_entries=F('revenue_entries') + 1,
+            total_gross=F('total_gross') + gross_amount,
+            total_commission=F('total_commission') + commission_amount,
+            total_net=F('total_net') + net_amount,
+        )
+    VendorBalance.objects.filter(vendor_id=vendor_id).update(**updates)
+
+
+def settle_entries(entries, settled=True, limit=None, **extra_updates):
+    """
+    Set is_settled=`settled` (plus `extra_updates`) on the entries of the
+    queryset that differ (at most `limit` of them, lowest ids first), and
+    move their amounts between the uncleared and available balances.
+    Returns the number of entries changed.
+    """
+    from .models import LedgerEntry, VendorBalance
+
+    rows = (
+        entries.filter(is_settled=not settled).select_for_update()
+        .order_by('id').values_list('id', 'vendor_id', 'amount')
+    )
+    rows = list(rows[:limit] if limit else rows)
+    if not rows:
+        return 0
+
+    moved = defaultdict(Decimal)
+    for _, vendor_id, amount in rows:
+        moved[vendor_id] += amount
+    LedgerEntry.objects.filter(id__in=[row[0] for row in rows]).update(is_settled=settled, **extra_updates)
+
+    source, target = ('uncleared', 'available') if settled else ('available', 'uncleared')
+    for vendor_id in sorted(moved):
+        get_balance(vendor_id)
+        VendorBalance.objects.filter(vendor_id=vendor_id).update(**{
+            source: F(source) - moved[vendor_id],
+            target: F(target) + moved[vendor_id],
+        })
+    return len(rows)
+
+
+# ── Checkpoints ─────────────────────────────────────────────
+
+def checkpoint(vendor_id, repair=False):
+    """
+    Verify the vendor's running balance against the ledger and record a
+    BalanceCheckpoint (skipped when nothing changed since the last one).
+    With repair=True, drifted totals are overwritten with the ledger's.
+    Returns the latest checkpoint.
+    """
+    from .models import BalanceCheckpoint, LedgerEntry
+
+    with transaction.atomic():
+        balance = get_balance(vendor_id, lock=True)
+        previous = BalanceCheckpoint.objects.filter(vendor_id=vendor_id).order_by('-last_entry_id', '-id').first()
+        since = previous.last_entry_id if previous else 0
+
+        new = ledger_totals(LedgerEntry.objects.filter(vendor_id=vendor_id, id__gt=since))
+        uncleared = LedgerEntry.objects.filter(vendor_id=vendor_id, is_settled=False).aggregate(
+            total=Sum('amount'))['total'] or ZERO
+
+        expected = {
+            field: (getattr(previous, field) if previous else 0) + new[field]
+            for field in ('ledger_total',) + TOTAL_FIELDS
+        }
+        expected['uncleared'] = uncleared
+        expected_balance = {
+            'available': expected['ledger_total'] - uncleared,
+            'uncleared': uncleared,
+            **{field: expected[field] for field in TOTAL_FIELDS},
+        }
+        consistent = all(getattr(balance, field) == value for field, value in expected_balance.items())
+        drift = balance.available + balance.uncleared - expected['ledger_total']
+
+        # A repaired balance gets a fresh checkpoint, so the latest one never reports stale drift
+        if (previous and previous.is_consistent and consistent
+                and not new['last_entry_id'] and previous.uncleared == uncleared):
+            return previous
+
+        if not consistent:
+            logger.warning(f"Vendor {vendor_id} balance drifted from the ledger (total drift {drift})")
+            if repair:
+                for field, value in expected_balance.items():
+                    setattr(balance, field, value)
+                balance.save()
+
+        return BalanceCheckpoint.objects.create(
+            vendor_id=vendor_id,
+            last_entry_id=new['last_entry_id'] or since,
+            drift=drift,
+            is_consistent=consistent,
+            **expected,
+        )
+
+
+def checkpoint_all(repair=False):
+    """Checkpoint every vendor with ledger activity. Returns the checkpoints that found drift."""
+    from .models import LedgerEntry
+
+    drifted = []
+    for vendor_id in LedgerEntry.objects.order_by().values_list('vendor_id', flat=True).distinct():
+        result = checkpoint(vendor_id, repair=repair)
+        if not result.is_consistent:
+            drifted.append(result)
+    return drifted
@@ -0,0 +1,61 @@
+"""
+finance/commission_rules.py
+In-process commission rule table.
+
+All CategoryCommission rows and the GlobalCommission fallback are loaded
+once into a dict of plain CommissionRule tuples, so resolving the rule for an
+order item needs no query. The signals in finance/signals.py drop the table
+when a rule is saved or deleted in this process. Other worker processes
+reload theirs after at most RULES_TTL seconds.
+"""
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+CommissionRule = namedtuple('CommissionRule', ['commission_type', 'percentage', 'fixed_amount'])
+
+# Used when no GlobalCommission row exists yet (the admin settings page creates it)
+DEFAULT_RULE = CommissionRule('percentage', Decimal('10.00'), Decimal('0.00'))
+RULES_TTL = 60  # seconds
+
+_table = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def _as_rule(settings):
+    return CommissionRule(settings.commission_type, settings.percentage, settings.fixed_amount)
+
+
+def load_rules():
+    """Read every commission rule in two queries. Returns ({category: rule}, global rule)."""
+    from .models import CategoryCommission, GlobalCommission
+
+    categories = {row.category: _as_rule(row) for row in CategoryCommission.objects.all()}
+    global_settings = GlobalCommission.objects.order_by('pk').first()
+    return categories, (_as_rule(global_settings) if global_settings else DEFAULT_RULE)
+
+
+def rule_table():
+    global _table, _loaded_at
+    table = _table
+    if table is None or time.monotonic() - _loaded_at > RULES_TTL:
+        with _lock:
+            if _table is None or time.monotonic() - _loaded_at > RULES_TTL:
+                _table = load_rules()
+                _loaded_at = time.monotonic()
+            table = _table
+    return table
+
+
+def invalidate_rules():
+    global _table
+    with _lock:
+        _table = None
+
+
+def resolve(category):
+    """The rule for `category`: its CategoryCommission, else the global one."""
+    categories, global_rule = rule_table()
+    return categories.get(category, global_rule)
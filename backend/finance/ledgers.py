@@ -0,0 +1,102 @@
+"""
+finance/ledgers.py
+Ledger browsing and export for finance staff.
+
+Listings are keyset-paginated on (created_at, id) and date ranges filter on
+created_at directly, so both use the (vendor, created_at) / (created_at)
+indexes. Exports stream CSV or JSON Lines straight from a database cursor
+(`.iterator(chunk_size=...)`), keeping memory flat however many years of
+entries are pulled.
+"""
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import LedgerEntry
+
+PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+EXPORT_FIELDS = [
+    'id', 'created_at', 'vendor_id', 'vendor__shop_name', 'order__order_number', 'entry_type',
+    'amount', 'gross_amount', 'commission_amount', 'net_amount',
+    'is_settled', 'settlement_date', 'reference_id', 'description',
+]
+
+
+def _day_start(day):
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def parse_filters(params):
+    """
+    Ledger filters from query parameters: vendor, type, from, to (YYYY-MM-DD,
+    both inclusive). Raises ValueError for malformed values.
+    """
+    filters = {
+        'vendor': params.get('vendor') or None,
+        'type': params.get('type') or None,
+        'from': None,
+        'to': None,
+    }
+    if filters['vendor'] is not None and not filters['vendor'].isdigit():
+        raise ValueError('vendor must be a vendor id')
+    for key in ('from', 'to'):
+        if params.get(key):
+            try:
+                filters[key] = date.fromisoformat(params[key])
+            except ValueError:
+                raise ValueError(f"'{key}' must be a date in YYYY-MM-DD format")
+    return filters
+
+
+def filtered_entries(filters):
+    """Ledger entries matching `filters`, newest first."""
+    entries = LedgerEntry.objects.all()
+    if filters['vendor']:
+        entries = entries.filter(vendor_id=filters['vendor'])
+    if filters['type']:
+        entries = entries.filter(entry_type=filters['type'])
+    if filters['from']:
+        entries = entries.filter(created_at__gte=_day_start(filters['from']))
+    if filters['to']:
+        entries = entries.filter(created_at__lt=_day_start(filters['to'] + timedelta(days=1)))
+    return entries.order_by('-created_at', '-id')
+
+
+# ── Export ──────────────────────────────────────────────────
+
+class _Echo:
+    """File-like object whose write() returns the value, so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
+
+
+def export_rows(entries, chunk_size=EXPORT_CHUNK_SIZE):
+    return entries.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def stream_csv(entries, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(entries, chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_jsonl(entries, chunk_size=EXPORT_CHUNK_SIZE):
+    for row in export_rows(entries, chunk_size):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(entries, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    if export_format == 'csv':
+        return stream_csv(entries, chunk_size)
+    return stream_jsonl(entries, chunk_size)
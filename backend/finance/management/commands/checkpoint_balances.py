@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from finance.balances import checkpoint_all
+
+
+class Command(BaseCommand):
+    help = ('Verify every vendor running balance against the ledger (summing only entries since the '
+            'previous checkpoint) and record a balance checkpoint. Run periodically, e.g. nightly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='Overwrite drifted balances with the totals from the ledger')
+
+    def handle(self, *args, **options):
+        drifted = checkpoint_all(repair=options['repair'])
+        for result in drifted:
+            self.stdout.write(self.style.WARNING(
+                f'Vendor {result.vendor_id}: running balance drifted by {result.drift} '
+                f'(ledger total {result.ledger_total})'
+            ))
+
+        action = 'repaired' if options['repair'] else 'found'
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully checkpointed vendor balances; {action} {len(drifted)} drifted balance(s).'
+        ))
@@ -1,13 +1,26 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db import transaction
-from finance.models import LedgerEntry
+from finance.settlement import BATCH_SIZE, release_expired_funds
+
 
 class Command(BaseCommand):
     help = 'Process T+7 settlement for vendor ledger entries'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Ledger entries settled per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count the entries that would be released without settling them')
+
     def handle(self, *args, **options):
-        from finance.services import FinanceService
-        
-        count = FinanceService.release_expired_funds()
-        self.stdout.write(self.style.SUCCESS(f'Successfully processed and released funds for {count} orders.'))
+        metrics = release_expired_funds(batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        if metrics['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {metrics['released']} ledger entries (₹{metrics['amount']}) would be released "
+                f"in {metrics['batches']} batch(es) ({metrics['duration']}s)."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Successfully released funds for {metrics['released']} ledger entries "
+                f"in {metrics['batches']} batch(es) ({metrics['duration']}s)."
+            ))
@@ -0,0 +1,72 @@
+# Generated by Django 5.1 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def compute_vendor_balances(apps, schema_editor):
+    LedgerEntry = apps.get_model('finance', 'LedgerEntry')
+    VendorBalance = apps.get_model('finance', 'VendorBalance')
+
+    rows = LedgerEntry.objects.values('vendor_id').annotate(
+        available=Sum('amount', filter=Q(is_settled=True)),
+        uncleared=Sum('amount', filter=Q(is_settled=False)),
+        lifetime_earnings=Sum('amount', filter=Q(entry_type__in=['REVENUE', 'COMMISSION'])),
+        revenue_entries=Count('id', filter=Q(entry_type='REVENUE')),
+        total_gross=Sum('gross_amount', filter=Q(entry_type='REVENUE')),
+        total_commission=Sum('commission_amount', filter=Q(entry_type='REVENUE')),
+        total_net=Sum('net_amount', filter=Q(entry_type='REVENUE')),
+    ).order_by()
+    VendorBalance.objects.bulk_create([
+        VendorBalance(**{field: value or 0 for field, value in row.items()})
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_initial'),
+        ('vendor', '0006_search_hits_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorBalance',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='vendor.vendorprofile')),
+                ('available', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('uncleared', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lifetime_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_entries', models.PositiveIntegerField(default=0)),
+                ('total_gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_entry_id', models.BigIntegerField(default=0)),
+                ('ledger_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('uncleared', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lifetime_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_entries', models.PositiveIntegerField(default=0)),
+                ('total_gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('drift', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('is_consistent', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to='vendor.vendorprofile')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['vendor', '-last_entry_id'], name='finance_bal_vendor__848a8d_idx')],
+            },
+        ),
+        migrations.RunPython(compute_vendor_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_vendorbalance'),
+        ('user', '0005_customerriskprofile'),
+        ('vendor', '0006_search_hits_trending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['vendor', 'created_at'], name='finance_led_vendor__60dfe4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['created_at'], name='finance_led_created_68b7c5_idx'),
+        ),
+    ]
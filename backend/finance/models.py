@@ -103,6 +103,9 @@ class LedgerEntry(models.Model):
             models.Index(fields=['vendor', 'is_settled']),
             models.Index(fields=['settlement_date']),
             models.Index(fields=['reference_id']),
+            # Ledger browsing / export: newest first, per vendor or platform-wide
+            models.Index(fields=['vendor', 'created_at']),
+            models.Index(fields=['created_at']),
         ]
 
     def __str__(self):
@@ -132,3 +135,58 @@ class Payout(models.Model):
 
     def __str__(self):
         return f"Payout {self.id} for {self.vendor.shop_name}"
+
+
+class VendorBalance(models.Model):
+    """
+    Running totals of a vendor's ledger, updated in the same transaction as
+    every ledger insert and settlement change (see finance/balances.py), so
+    balance reads never re-sum the ledger. The row is also the lock that
+    serializes payouts of a vendor.
+    """
+    vendor = models.OneToOneField('vendor.VendorProfile', on_delete=models.CASCADE, primary_key=True, related_name='balance')
+
+    available = models.DecimalField(max_digits=14, decimal_places=2, default=0)    # settled entries
+    uncleared = models.DecimalField(max_digits=14, decimal_places=2, default=0)    # entries still in their hold period
+    lifetime_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # REVENUE + COMMISSION amounts
+    revenue_entries = models.PositiveIntegerField(default=0)
+    total_gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.vendor.shop_name} - available {self.available}"
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Ledger totals of a vendor up to (and including) ledger entry
+    `last_entry_id`. The next checkpoint only sums entries after it to
+    verify the running VendorBalance against the immutable ledger.
+    """
+    vendor = models.ForeignKey('vendor.VendorProfile', on_delete=models.CASCADE, related_name='balance_checkpoints')
+    last_entry_id = models.BigIntegerField(default=0)
+
+    ledger_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    uncleared = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lifetime_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue_entries = models.PositiveIntegerField(default=0)
+    total_gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Running balance minus ledger at checkpoint time; is_consistent covers every total
+    drift = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    is_consistent = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['vendor', '-last_entry_id']),
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.vendor_id} @ entry {self.last_entry_id}"
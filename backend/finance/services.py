@@ -1,9 +1,12 @@
 from decimal import Decimal, ROUND_HALF_UP
 from django.db import transaction, models
+from django.db.models import F, Value
+from django.db.models.functions import Concat
 from django.utils import timezone
 from datetime import timedelta
 import uuid
-from .models import CategoryCommission, LedgerEntry, Payout
+from .models import LedgerEntry, Payout
+from . import balances, commission_rules
 from user.models import OrderItem
 
 class FinanceService:
@@ -14,26 +17,22 @@ class FinanceService:
 
     @staticmethod
     def get_commission_settings(category):
-        """Fetch global commission settings for a category, fallback to GlobalCommission."""
-        from .models import GlobalCommission
-        try:
-            return CategoryCommission.objects.get(category=category)
-        except CategoryCommission.DoesNotExist:
-            # Fallback to global setting if category specific not found
-            global_settings = GlobalCommission.objects.first()
-            if not global_settings:
-                # Create default global setting if not exists
-                global_settings = GlobalCommission.objects.create(percentage=Decimal('10.00'))
-            return global_settings
+        """
+        Commission rule for a category, falling back to the global setting.
+        Resolved from the in-process rule table, without a query (see finance/commission_rules.py).
+        """
+        return commission_rules.resolve(category)
 
     @staticmethod
-    def calculate_commission(price, category):
+    def calculate_commission(price, category, settings=None):
         """
         Calculate commission based on price and category settings.
+        `settings` may be passed in when the caller already fetched them.
         Returns: (amount, rate_snapshot)
         """
         price = Decimal(str(price))
-        settings = FinanceService.get_commission_settings(category)
+        if settings is None:
+            settings = FinanceService.get_commission_settings(category)
         
         if not settings:
             # Default to 10% if not configured as per common marketplace defaults
@@ -54,22 +53,53 @@ class FinanceService:
 
         return amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP), rate_desc
 
+    @staticmethod
+    def calculate_commissions(lines):
+        """
+        calculate_commission for a list of (price, category) pairs, resolving
+        every rule from the in-process table. Returns [(amount, rate_snapshot)].
+        """
+        return [
+            FinanceService.calculate_commission(price, category, commission_rules.resolve(category))
+            for price, category in lines
+        ]
+
+    @staticmethod
+    def snapshot_commission(item, settings=None):
+        """Set commission_rate / commission_amount on an OrderItem (not saved)."""
+        comm_amount, comm_desc = FinanceService.calculate_commission(
+            item.product_price * item.quantity,
+            item.product.category,
+            settings
+        )
+        try:
+            item.commission_rate = Decimal(comm_desc.split('%')[0]) if '%' in comm_desc else Decimal('0.00')
+        except Exception:
+            item.commission_rate = Decimal('0.00')
+        item.commission_amount = comm_amount
+
     @staticmethod
     @transaction.atomic
-    def record_order_financials(order):
+    def record_order_financials(order, items=None):
         """
         Consolidate financial entries: Creates ONE LedgerEntry per Vendor per Order.
         Calculates Gross, Commission, and Net in a single row.
+        `items` may be passed when their commission is already snapshotted
+        (batched checkout); otherwise it is computed and saved per item here.
         """
+        precomputed = items is not None
+        if not precomputed:
+            items = order.items.select_related('product', 'vendor')
+
         # 1. Group items by vendor
         vendor_data = {}
-        for item in order.items.all():
-            if not item.product:
+        for item in items:
+            if not item.product_id:
                 continue
-            if not item.vendor:
+            if not item.vendor_id:
                 continue  # skip items whose vendor couldn't be resolved
                 
-            vendor_id = item.vendor.id
+            vendor_id = item.vendor_id
             if vendor_id not in vendor_data:
                 vendor_data[vendor_id] = {
                     'vendor': item.vendor,
@@ -79,23 +109,17 @@ class FinanceService:
                 }
             
             # Snapshot Commission for the item
-            comm_amount, comm_desc = FinanceService.calculate_commission(
-                item.product_price * item.quantity, 
-                item.product.category
-            )
-            try:
-                item.commission_rate = Decimal(comm_desc.split('%')[0]) if '%' in comm_desc else Decimal('0.00')
-            except Exception:
-                item.commission_rate = Decimal('0.00')
-            item.commission_amount = comm_amount
-            item.save()
+            if not precomputed:
+                FinanceService.snapshot_commission(item)
+                item.save(update_fields=['commission_rate', 'commission_amount'])
 
             vendor_data[vendor_id]['gross'] += item.subtotal
             vendor_data[vendor_id]['commission'] += item.commission_amount
             vendor_data[vendor_id]['items'].append(item.product_name)
 
-        # 2. Create Unified Ledger Entries
-        for v_id, data in vendor_data.items():
+        # 2. Create Unified Ledger Entries, in vendor id order: each locks the vendor's
+        # VendorBalance row, so concurrent checkouts sharing vendors cannot deadlock
+        for v_id, data in sorted(vendor_data.items()):
             net = data['gross'] - data['commission']
             description = f"Unified entry for Order {order.order_number}: Items: {', '.join(data['items'])}"
             
@@ -119,7 +143,7 @@ class FinanceService:
         Creates CANCELLATION entries to offset the original REVENUE entries.
         """
         original_entries = LedgerEntry.objects.filter(order=order, entry_type='REVENUE')
-        for entry in original_entries:
+        for entry in original_entries.order_by('vendor_id'):
             # Create a reverse entry
             FinanceService._create_ledger_entry(
                 vendor=entry.vendor,
@@ -135,7 +159,7 @@ class FinanceService:
             )
         
         # Also mark original as settled if they weren't, to remove from uncleared balance
-        original_entries.filter(is_settled=False).update(is_settled=True, description=F('description') + " (CANCELLED)")
+        balances.settle_entries(original_entries, settled=True, description=Concat(F('description'), Value(" (CANCELLED)")))
 
     @staticmethod
     @transaction.atomic
@@ -145,59 +169,40 @@ class FinanceService:
         Executed when an order is successfully delivered.
         Funds are NOT released immediately to vendor wallet.
         """
+        return FinanceService.settle_orders_financials([order])
+
+    @staticmethod
+    def settle_orders_financials(orders):
+        """settle_order_financials for many delivered orders at once (set-based)."""
         from datetime import timedelta
         # Funds stay uncleared for 3 days to allow for returns
         settlement_date = timezone.now() + timedelta(days=3)
         
-        updated_count = LedgerEntry.objects.filter(
-            order=order,
-            entry_type='REVENUE'
-        ).update(
-            is_settled=False,  # Force false to ensure 3-day hold
-            settlement_date=settlement_date
-        )
-        return updated_count
+        entries = LedgerEntry.objects.filter(order__in=orders, entry_type='REVENUE')
+        balances.settle_entries(entries, settled=False)  # Force false to ensure 3-day hold
+        return entries.update(settlement_date=settlement_date)
 
     @staticmethod
-    @transaction.atomic
     def release_expired_funds():
         """
         Background task: Find all ledger entries where settlement_date has passed
         and no return request exists, then mark them as settled (releasing funds to vendor).
+        Runs set-based in batches of short transactions (see finance/settlement.py).
         """
-        from user.models import OrderReturn
-        
-        # 1. Identify entries that reached settlement date
-        pending_entries = LedgerEntry.objects.filter(
-            is_settled=False,
-            settlement_date__lte=timezone.now(),
-            entry_type='REVENUE'
-        )
+        from .settlement import release_expired_funds
 
-        released_count = 0
-        for entry in pending_entries:
-            # Check if there's an active return request for this order
-            if entry.order:
-                has_active_return = OrderReturn.objects.filter(
-                    order=entry.order
-                ).exclude(status='rejected').exists()
-                
-                if not has_active_return:
-                    entry.is_settled = True
-                    entry.save(update_fields=['is_settled'])
-                    released_count += 1
-        
-        return released_count
+        return release_expired_funds()['released']
 
     @staticmethod
     @transaction.atomic
     def process_payout(vendor, amount):
         """
         Execute a payout to a vendor.
-        Requirement: Concurrent payout prevention (via transaction.atomic and balance check).
+        Requirement: Concurrent payout prevention: the vendor's balance row stays
+        locked from the balance check until the payout entry is recorded.
         """
         amount = Decimal(str(amount))
-        available = FinanceService.get_vendor_balance(vendor)
+        available = balances.get_balance(vendor.id, lock=True).available
         
         if amount > available:
             raise ValueError(f"Insufficient funds. Available: {available}, Requested: {amount}")
@@ -238,6 +243,12 @@ class FinanceService:
         # Settlement date is T+7 unless specified (like for payouts)
         settlement_date = timezone.now() + timedelta(days=7) if not is_settled else timezone.now()
 
+        # Running balance first: its row lock orders ledger inserts per vendor (see finance/balances.py)
+        balances.record_entry(
+            vendor.id, Decimal(str(amount)), entry_type, is_settled,
+            Decimal(str(gross_amount)), Decimal(str(commission_amount)), Decimal(str(net_amount)),
+        )
+
         return LedgerEntry.objects.create(
             vendor=vendor,
             amount=amount,
@@ -256,26 +267,17 @@ class FinanceService:
     @staticmethod
     def get_vendor_balance(vendor):
         """
-        Calculate vendor balance from ledger entries.
-        Requirement: Never update vendor balance directly. All balances must be derived.
+        Sum of the vendor's settled ledger entries.
+        Requirement: Never update vendor balance directly. All balances must be derived:
+        it is read from the running VendorBalance, which only ledger writes change and
+        checkpoints verify against the ledger (finance/balances.py).
         """
-        # Sum of settled credits and debits
-        balance = LedgerEntry.objects.filter(
-            vendor=vendor,
-            is_settled=True
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        
-        return balance
+        return balances.get_balance(vendor.id).available
 
     @staticmethod
     def get_uncleared_balance(vendor):
         """Sum of ledger entries that are not yet settled (T+7 period)."""
-        balance = LedgerEntry.objects.filter(
-            vendor=vendor,
-            is_settled=False
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        
-        return balance
+        return balances.get_balance(vendor.id).uncleared
 
     @staticmethod
     @transaction.atomic
@@ -369,38 +371,22 @@ class FinanceService:
     def get_vendor_earnings_summary(vendor):
         """Consolidated summary for vendor dashboard."""
         from .models import Payout
-        available = FinanceService.get_vendor_balance(vendor)
-        uncleared = FinanceService.get_uncleared_balance(vendor)
-        total_orders = LedgerEntry.objects.filter(vendor=vendor, entry_type='REVENUE').count()
+        balance = balances.get_balance(vendor.id)
         pending_payouts = Payout.objects.filter(vendor=vendor, status='pending').aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
         recent = LedgerEntry.objects.filter(vendor=vendor).order_by('-created_at')[:10]
-        
-        # Total Earnings = All REVENUE + All COMMISSION (net of all time)
-        lifetime_earnings = LedgerEntry.objects.filter(
-            vendor=vendor, 
-            entry_type__in=['REVENUE', 'COMMISSION']
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-
-        # Gross / Commission / Net aggregates (from REVENUE entries)
-        revenue_agg = LedgerEntry.objects.filter(
-            vendor=vendor,
-            entry_type='REVENUE'
-        ).aggregate(
-            gross=models.Sum('gross_amount'),
-            commission=models.Sum('commission_amount'),
-            net=models.Sum('net_amount'),
-        )
 
+        # Lifetime earnings (all REVENUE + COMMISSION) and the REVENUE gross / commission / net
+        # come from the running balance instead of re-summing the ledger
         return {
-            "available_balance": available,
-            "uncleared_balance": uncleared,
-            "lifetime_earnings": lifetime_earnings,
-            "total_orders": total_orders,
+            "available_balance": balance.available,
+            "uncleared_balance": balance.uncleared,
+            "lifetime_earnings": balance.lifetime_earnings,
+            "total_orders": balance.revenue_entries,
             "pending_payouts": pending_payouts,
             "recent_activities": recent,
-            "total_gross": revenue_agg['gross'] or Decimal('0.00'),
-            "total_commission": revenue_agg['commission'] or Decimal('0.00'),
-            "total_net": revenue_agg['net'] or Decimal('0.00'),
+            "total_gross": balance.total_gross,
+            "total_commission": balance.total_commission,
+            "total_net": balance.total_net,
         }
 
     @staticmethod
@@ -0,0 +1,79 @@
+"""
+finance/settlement.py
+Release of matured vendor funds (the T+7 / post-delivery hold).
+
+Entries are released set-based, in bounded batches: each batch is one short
+transaction that locks up to `batch_size` matured REVENUE entries whose
+order has no active return (a NOT EXISTS subquery, so no per-entry return
+lookup), flips them to settled with a single UPDATE and moves the amounts to
+the vendors' available balances. A return requested while the job runs only
+holds back entries of later batches.
+"""
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+
+from . import balances
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def releasable_entries(now=None):
+    """Unsettled REVENUE entries past their settlement date whose order has no active (non-rejected) return."""
+    from user.models import OrderReturn
+    from .models import LedgerEntry
+
+    active_returns = OrderReturn.objects.filter(order_id=OuterRef('order_id')).exclude(status='rejected')
+    return (
+        LedgerEntry.objects.filter(
+            is_settled=False,
+            settlement_date__lte=now or timezone.now(),
+            entry_type='REVENUE',
+            order__isnull=False,
+        )
+        .exclude(Exists(active_returns))
+    )
+
+
+def release_expired_funds(batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Settle every releasable entry, `batch_size` per transaction. With
+    dry_run=True nothing is written and the entries that would be released
+    are only counted. Returns metrics: released entries, amount (dry run
+    only), batches and duration in seconds.
+    """
+    started = time.monotonic()
+    now = timezone.now()
+
+    if dry_run:
+        totals = releasable_entries(now).aggregate(count=Count('id'), amount=Sum('amount'))
+        metrics = {
+            'released': totals['count'],
+            'amount': totals['amount'] or balances.ZERO,
+            'batches': -(-totals['count'] // batch_size),
+            'dry_run': True,
+        }
+    else:
+        released = batches = 0
+        while True:
+            with transaction.atomic():
+                count = balances.settle_entries(releasable_entries(now), settled=True, limit=batch_size)
+            if not count:
+                break
+            released += count
+            batches += 1
+            if count < batch_size:
+                break
+        metrics = {'released': released, 'amount': None, 'batches': batches, 'dry_run': False}
+
+    metrics['duration'] = round(time.monotonic() - started, 3)
+    logger.info(
+        f"Settlement {'dry run' if dry_run else 'run'}: {metrics['released']} entries "
+        f"in {metrics['batches']} batch(es), {metrics['duration']}s"
+    )
+    return metrics
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import CategoryCommission, GlobalCommission
+from .commission_rules import invalidate_rules
+
+
+@receiver(post_save, sender=CategoryCommission)
+@receiver(post_delete, sender=CategoryCommission)
+@receiver(post_save, sender=GlobalCommission)
+@receiver(post_delete, sender=GlobalCommission)
+def reload_commission_rules(sender, **kwargs):
+    # After commit, so the reload cannot pick up the previous rows again
+    transaction.on_commit(invalidate_rules)
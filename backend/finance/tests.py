@@ -0,0 +1,110 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from finance import balances, commission_rules
+from finance.models import BalanceCheckpoint, CategoryCommission, GlobalCommission, LedgerEntry, VendorBalance
+from finance.settlement import release_expired_funds
+from user.models import Order, OrderReturn
+from user.tests import CheckoutTestCase
+
+
+# ── Running balances ────────────────────────────────────────
+
+class VendorBalanceTests(CheckoutTestCase):
+    def test_checkout_updates_running_totals_like_the_ledger(self):
+        self.checkout((self.phone, 2))
+        self.checkout((self.phone, 1))
+
+        vendor_id = self.phone.vendor_id
+        balance = VendorBalance.objects.get(vendor_id=vendor_id)
+        totals = balances.ledger_totals(LedgerEntry.objects.filter(vendor_id=vendor_id))
+        self.assertEqual(balance.revenue_entries, 2)
+        self.assertEqual(balance.total_gross, Decimal('300.00'))
+        self.assertEqual(balance.available, Decimal('0.00'))  # still in the hold period
+        self.assertEqual(balance.uncleared, totals['uncleared'])
+        self.assertEqual(balance.total_net, totals['total_net'])
+
+    def test_vendor_balances_are_locked_in_vendor_id_order(self):
+        with mock.patch.object(balances, 'record_entry', wraps=balances.record_entry) as record_entry:
+            response = self.checkout((self.case, 1), (self.phone, 1))  # the later vendor first
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [call.args[0] for call in record_entry.call_args_list],
+            sorted([self.phone.vendor_id, self.case.vendor_id]),
+        )
+        self.assertEqual(VendorBalance.objects.get(vendor_id=self.case.vendor_id).total_gross, Decimal('20.00'))
+
+    def test_checkpoint_repairs_drift(self):
+        self.checkout((self.phone, 1))
+        vendor_id = self.phone.vendor_id
+        first = balances.checkpoint(vendor_id)
+        self.assertTrue(first.is_consistent)
+        self.assertEqual(balances.checkpoint(vendor_id), first)  # nothing changed since
+
+        expected = VendorBalance.objects.values('uncleared', 'total_gross').get(vendor_id=vendor_id)
+        VendorBalance.objects.filter(vendor_id=vendor_id).update(uncleared=0, total_gross=1)
+        drifted = balances.checkpoint(vendor_id, repair=True)
+        self.assertFalse(drifted.is_consistent)
+        self.assertEqual(drifted.drift, -expected['uncleared'])
+        self.assertEqual(VendorBalance.objects.values('uncleared', 'total_gross').get(vendor_id=vendor_id), expected)
+        self.assertTrue(balances.checkpoint(vendor_id).is_consistent)
+        self.assertEqual(BalanceCheckpoint.objects.filter(vendor_id=vendor_id).count(), 3)
+
+
+# ── Settlement ──────────────────────────────────────────────
+
+class SettlementTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        for product in (self.phone, self.case, self.phone):
+            self.checkout((product, 1))
+        self.orders = list(Order.objects.order_by('id'))
+        LedgerEntry.objects.update(settlement_date=timezone.now() - timedelta(days=1))
+
+    def test_matured_entries_are_released_in_batches(self):
+        self.assertEqual(release_expired_funds(batch_size=2, dry_run=True)['released'], 3)
+        self.assertFalse(LedgerEntry.objects.filter(is_settled=True).exists())
+
+        metrics = release_expired_funds(batch_size=2)
+        self.assertEqual((metrics['released'], metrics['batches']), (3, 2))
+        self.assertFalse(LedgerEntry.objects.filter(is_settled=False).exists())
+        balance = VendorBalance.objects.get(vendor_id=self.phone.vendor_id)
+        self.assertEqual((balance.available, balance.uncleared), (Decimal('180.00'), Decimal('0.00')))
+
+    def test_orders_with_an_active_return_are_held_back(self):
+        held, rejected = self.orders[0], self.orders[1]
+        for order, status in ((held, 'requested'), (rejected, 'rejected')):
+            OrderReturn.objects.create(
+                order=order, order_item=order.items.get(), user=self.customer,
+                reason='defective', description='Broken', status=status,
+            )
+        LedgerEntry.objects.filter(order=self.orders[2]).update(settlement_date=timezone.now() + timedelta(days=1))
+
+        self.assertEqual(release_expired_funds()['released'], 1)
+        self.assertEqual(list(LedgerEntry.objects.filter(is_settled=True).values_list('order', flat=True)), [rejected.id])
+
+
+# ── Commission rules ────────────────────────────────────────
+
+class CommissionRuleTests(TestCase):
+    def setUp(self):
+        commission_rules.invalidate_rules()
+        self.addCleanup(commission_rules.invalidate_rules)
+        GlobalCommission.objects.create(commission_type='percentage', percentage=Decimal('12.00'))
+        CategoryCommission.objects.create(category='fashion', commission_type='fixed', fixed_amount=Decimal('5.00'))
+
+    def test_category_rule_wins_over_global_without_queries(self):
+        commission_rules.resolve('fashion')
+        with self.assertNumQueries(0):
+            self.assertEqual(commission_rules.resolve('fashion'), ('fixed', Decimal('0.00'), Decimal('5.00')))
+            self.assertEqual(commission_rules.resolve('electronics').percentage, Decimal('12.00'))
+
+    def test_saved_rule_reloads_the_table(self):
+        self.assertEqual(commission_rules.resolve('electronics').percentage, Decimal('12.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            CategoryCommission.objects.create(category='electronics', percentage=Decimal('3.00'))
+        self.assertEqual(commission_rules.resolve('electronics').percentage, Decimal('3.00'))
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .api_views import (
     VendorRequestViewSet, VendorManagementViewSet, ProductManagementViewSet,
     DeliveryRequestViewSet, DeliveryAgentManagementViewSet, DashboardView,
-    CommissionSettingsViewSet, ReportsView,
+    CommissionSettingsViewSet, ReportsView, InstrumentationView,
     UserManagementView, UserBlockToggleView,
     TriggerAssignmentView, UnassignedOrdersView,
     AdminOrderTrackingViewSet, AdminOrderViewSet, DeletionRequestViewSet,
@@ -29,6 +29,7 @@ urlpatterns = [
     # Dashboard
     path('dashboard/', DashboardView.as_view(), name='admin_dashboard_api'),
     path('reports/', ReportsView.as_view(), name='admin_reports_api'),
+    path('instrumentation/', InstrumentationView.as_view(), name='admin_instrumentation_api'),
 
     # User management
     path('users/', UserManagementView.as_view(), name='admin_users_list'),
@@ -29,9 +29,10 @@ from django.utils import timezone
 from django.shortcuts import get_object_or_404
 # User = get_user_model() - Moved inside functions to avoid AppRegistryNotReady error
 
-from django.db.models import Q
+from django.db.models import F, Q
 from finance.models import GlobalCommission, CategoryCommission
 from vendor.models import VendorProfile, Product
+from vendor.catalog_cache import bump_catalog_version
 from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApprovalLog, ContactQuery
 from deliveryAgent.models import DeliveryAgentProfile, DeliveryAssignment
 from deliveryAgent.serializers import DeliveryAssignmentDetailSerializer, DeliveryAssignmentListSerializer
@@ -233,6 +234,7 @@ class VendorManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         vendor.save()
         
         Product.objects.filter(vendor=vendor).update(is_blocked=True)
+        bump_catalog_version()
         
         VendorApprovalLog.objects.create(
             vendor=vendor,
@@ -669,77 +671,10 @@ class DashboardView(AdminLoginRequiredMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
     
     def get(self, request):
-        from django.db.models import Sum
-        from user.models import Order
-        
-        total_vendors = VendorProfile.objects.count()
-        pending_vendors = VendorProfile.objects.filter(approval_status='pending').count()
-        approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-        blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-        
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(status='active').count()
-        inactive_products = Product.objects.filter(status='inactive').count()
-        blocked_products = Product.objects.filter(is_blocked=True).count()
-        
-        total_agents = DeliveryAgentProfile.objects.count()
-        pending_agents = DeliveryAgentProfile.objects.filter(approval_status='pending').count()
-        approved_agents = DeliveryAgentProfile.objects.filter(approval_status='approved').count()
-        blocked_agents = DeliveryAgentProfile.objects.filter(is_blocked=True).count()
-
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status='pending').count()
-        delivered_orders = Order.objects.filter(status='delivered').count()
-        cancelled_orders = Order.objects.filter(status='cancelled').count()
-        
-        # User stats (all non-staff/superuser)
-        User = get_user_model()
-        total_users = User.objects.filter(is_superuser=False, is_staff=False).count()
-        active_users = User.objects.filter(is_superuser=False, is_staff=False, is_blocked=False).count()
-        blocked_users = User.objects.filter(is_superuser=False, is_staff=False, is_blocked=True).count()
+        from .dashboard import dashboard_stats
 
-        # Deletion requests count
-        deletion_requests = VendorProfile.objects.filter(is_deletion_requested=True).count() + \
-                           DeliveryAgentProfile.objects.filter(is_deletion_requested=True).count()
-        
-        # Basic revenue for dashboard quick-view
-        revenue_summary = Order.objects.filter(payment_status='completed').aggregate(
-            total=Sum('total_amount'),
-        )
-        
-        return Response({
-            'vendors': {
-                'total': total_vendors,
-                'pending': pending_vendors,
-                'approved': approved_vendors,
-                'blocked': blocked_vendors
-            },
-            'products': {
-                'total': total_products,
-                'active': active_products,
-                'inactive': inactive_products,
-                'blocked': blocked_products
-            },
-            'agents': {
-                'total': total_agents,
-                'pending': pending_agents,
-                'approved': approved_agents,
-                'blocked': blocked_agents
-            },
-            'users': {
-                'total': total_users,
-                'active': active_users,
-                'blocked': blocked_users
-            },
-            'orders': {
-                'total': total_orders,
-                'pending': pending_orders,
-                'delivered': delivered_orders,
-                'cancelled': cancelled_orders
-            },
-            'deletion_requests': deletion_requests,
-            'total_revenue': float(revenue_summary['total'] or 0)
-        })
+        # Cached for a few seconds and invalidated on approval / block / order status changes
+        return Response(dashboard_stats())
 
 
 
@@ -758,162 +693,74 @@ class ReportsView(APIView):
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
 
     def get(self, request):
-        from django.db.models import Count, Avg, Sum
-        from django.db.models.functions import TruncDate
         from django.utils import timezone
         from datetime import timedelta
-        from user.models import Order, OrderItem
-        from deliveryAgent.models import DeliveryCommission, DeliveryAssignment, DeliveryAgentProfile
-        from finance.models import LedgerEntry
+        from .metrics import REPORT_DAYS, platform_report, top_vendors, top_products, catalog_counts
 
+        # Order, revenue, finance, delivery and signup figures come from the
+        # daily rollup (superAdmin/metrics.py), not from the history tables.
         today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        seven_days_ago = today - timedelta(days=7)
-
-        # ── Orders ───────────────────────────────
-        order_qs = Order.objects.all()
-        completed_qs = order_qs.filter(payment_status='completed')
-
-        order_status_breakdown = list(
-            order_qs.values('status').annotate(count=Count('id')).order_by('-count')
-        )
-        payment_status_breakdown = list(
-            order_qs.values('payment_status').annotate(count=Count('id')).order_by('-count')
-        )
-
-        # ── Revenue ───────────────────────────────
-        total_revenue = float(completed_qs.aggregate(t=Sum('total_amount'))['t'] or 0)
-        avg_order_value = float(completed_qs.aggregate(a=Avg('total_amount'))['a'] or 0)
-        revenue_today = float(completed_qs.filter(created_at__date=today).aggregate(t=Sum('total_amount'))['t'] or 0)
-        revenue_week = float(completed_qs.filter(created_at__date__gte=seven_days_ago).aggregate(t=Sum('total_amount'))['t'] or 0)
-        revenue_month = float(completed_qs.filter(created_at__date__gte=thirty_days_ago).aggregate(t=Sum('total_amount'))['t'] or 0)
-
-        # ── Daily trend ───────────────────────────
-        daily_revenue = list(
-            completed_qs.filter(created_at__date__gte=thirty_days_ago)
-            .annotate(day=TruncDate('created_at'))
-            .values('day')
-            .annotate(revenue=Sum('total_amount'), orders=Count('id'))
-            .order_by('day')
-        )
-        for d in daily_revenue:
-            d['day'] = d['day'].strftime('%d %b')
-            d['revenue'] = float(d['revenue'])
-
-        # ── Finance ───────────────────────────────
-        finance_agg = LedgerEntry.objects.aggregate(
-            total_gross=Sum('gross_amount'),
-            total_commission=Sum('commission_amount'),
-            total_net=Sum('net_amount'),
-        )
-
-        # ── Top Vendors ───────────────────────────
-        top_vendors = list(
-            LedgerEntry.objects.filter(entry_type='REVENUE')
-            .values('vendor__shop_name')
-            .annotate(
-                total_gross=Sum('gross_amount'),
-                total_commission=Sum('commission_amount'),
-                total_net=Sum('net_amount'),
-                order_count=Count('order', distinct=True)
-            )
-            .order_by('-total_net')[:10]
-        )
-        for v in top_vendors:
+        report = platform_report(today)
+        since = today - timedelta(days=REPORT_DAYS)
+
+        daily_revenue = [
+            {'day': d['day'].strftime('%d %b'), 'revenue': float(d['revenue']), 'orders': d['orders']}
+            for d in report['daily_revenue']
+        ]
+        user_growth = [
+            {'day': u['day'].strftime('%d %b'), 'count': u['count']}
+            for u in report['user_growth']
+        ]
+
+        # ── Top lists (last REPORT_DAYS days) ─────
+        vendors = top_vendors(since)
+        for v in vendors:
             for k in ['total_gross', 'total_commission', 'total_net']:
                 v[k] = float(v[k] or 0)
-
-        # ── Top Products ──────────────────────────
-        top_products = list(
-            OrderItem.objects.values('product_name')
-            .annotate(
-                total_qty=Sum('quantity'),
-                total_revenue=Sum('subtotal'),
-                order_count=Count('order', distinct=True),
-            )
-            .order_by('-total_qty')[:10]
-        )
-        for p in top_products:
+        products = top_products(since)
+        for p in products:
             p['total_revenue'] = float(p['total_revenue'] or 0)
 
-        # ── Delivery ──────────────────────────────
-        total_commissions_paid = float(DeliveryCommission.objects.filter(status='paid').aggregate(t=Sum('total_commission'))['t'] or 0)
-        total_commissions_pending = float(DeliveryCommission.objects.filter(status__in=['pending', 'approved']).aggregate(t=Sum('total_commission'))['t'] or 0)
-        total_deliveries_done = DeliveryAssignment.objects.filter(status='delivered').count()
-        total_deliveries_failed = DeliveryAssignment.objects.filter(status='failed').count()
-
-        # ── Vendors & Products ────────────────────
-        total_vendors = VendorProfile.objects.count()
-        approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-        blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(is_blocked=False).count()
-        blocked_products = Product.objects.filter(is_blocked=True).count()
-        total_agents = DeliveryAgentProfile.objects.count()
-        approved_agents = DeliveryAgentProfile.objects.filter(approval_status='approved').count()
-
-        # ── User Growth ───────────────────────────
-        User = get_user_model()
-        total_users = User.objects.filter(role='customer').count()
-        new_users_today = User.objects.filter(role='customer', date_joined__date=today).count()
-        new_users_week = User.objects.filter(role='customer', date_joined__date__gte=seven_days_ago).count()
-        
-        user_growth = list(
-            User.objects.filter(role='customer', date_joined__date__gte=thirty_days_ago)
-            .annotate(day=TruncDate('date_joined'))
-            .values('day')
-            .annotate(count=Count('id'))
-            .order_by('day')
-        )
-        for u in user_growth:
-            u['day'] = u['day'].strftime('%d %b')
-
         return Response({
             # Orders
-            'total_orders': order_qs.count(),
-            'orders_today': order_qs.filter(created_at__date=today).count(),
-            'orders_this_week': order_qs.filter(created_at__date__gte=seven_days_ago).count(),
-            'orders_this_month': order_qs.filter(created_at__date__gte=thirty_days_ago).count(),
-            'order_status_breakdown': order_status_breakdown,
-            'payment_status_breakdown': payment_status_breakdown,
+            'total_orders': report['total_orders'],
+            'orders_today': report['orders_today'],
+            'orders_this_week': report['orders_this_week'],
+            'orders_this_month': report['orders_this_month'],
+            'order_status_breakdown': report['order_status_breakdown'],
+            'payment_status_breakdown': report['payment_status_breakdown'],
 
             # Revenue
-            'total_revenue': total_revenue,
-            'avg_order_value': avg_order_value,
-            'revenue_today': revenue_today,
-            'revenue_week': revenue_week,
-            'revenue_month': revenue_month,
+            'total_revenue': float(report['total_revenue']),
+            'avg_order_value': float(report['avg_order_value']),
+            'revenue_today': float(report['revenue_today']),
+            'revenue_week': float(report['revenue_week']),
+            'revenue_month': float(report['revenue_month']),
             'daily_revenue': daily_revenue,
 
             # Finance
-            'total_gross': float(finance_agg['total_gross'] or 0),
-            'total_platform_commission': float(finance_agg['total_commission'] or 0),
-            'total_net': float(finance_agg['total_net'] or 0),
-
-            # Vendors & Products
-            'total_vendors': total_vendors,
-            'approved_vendors': approved_vendors,
-            'blocked_vendors': blocked_vendors,
-            'total_products': total_products,
-            'active_products': active_products,
-            'blocked_products': blocked_products,
-            'top_vendors': top_vendors,
+            'total_gross': float(report['total_gross']),
+            'total_platform_commission': float(report['total_platform_commission']),
+            'total_net': float(report['total_net']),
+
+            # Vendors & Products (top lists: last REPORT_DAYS days, like the *_month figures)
+            **catalog_counts(),
+            'report_days': REPORT_DAYS,
+            'top_vendors_month': vendors,
 
             # Products
-            'top_products': top_products,
+            'top_products_month': products,
 
             # Delivery
-            'total_delivery_commissions_paid': total_commissions_paid,
-            'total_delivery_commissions_pending': total_commissions_pending,
-            'total_deliveries_done': total_deliveries_done,
-            'total_deliveries_failed': total_deliveries_failed,
-            'total_agents': total_agents,
-            'approved_agents': approved_agents,
-            
+            'total_delivery_commissions_paid': float(report['total_commissions_paid']),
+            'total_delivery_commissions_pending': float(report['total_commissions_pending']),
+            'total_deliveries_done': report['total_deliveries_done'],
+            'total_deliveries_failed': report['total_deliveries_failed'],
+
             # User Growth (New)
-            'total_customers': total_users,
-            'new_users_today': new_users_today,
-            'new_users_week': new_users_week,
+            'total_customers': report['total_customers'],
+            'new_users_today': report['new_users_today'],
+            'new_users_week': report['new_users_week'],
             'user_growth': user_growth,
 
             # Meta
@@ -921,29 +768,63 @@ class ReportsView(APIView):
         })
 
 
+class InstrumentationView(APIView):
+    """
+    GET    /superAdmin/api/instrumentation/  — per-endpoint query counts, DB time,
+                                              response sizes and repeated (N+1) queries
+    DELETE /superAdmin/api/instrumentation/  — reset the counters
+    Figures are for the worker process that answers.
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+
+    def get(self, request):
+        from .instrumentation import endpoint_stats
+
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', True):
+            return Response({'error': 'Query instrumentation is disabled'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(endpoint_stats.snapshot())
+
+    def delete(self, request):
+        from .instrumentation import endpoint_stats
+
+        endpoint_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class UserManagementView(APIView):
     """
-    GET /superAdmin/api/users/  — Customers only, with live risk scores.
+    GET /superAdmin/api/users/  — Customers only, with risk scores.
     Risk score 0-100 derived from:
       - Cancellation rate  → up to 40 pts
       - Return rate        → up to 30 pts
       - Failed payments    → up to 30 pts
+    Scores are stored in CustomerRiskProfile (see user/risk.py), so they can
+    be sorted (?ordering=riskScore / -riskScore) and filtered (?min_risk=N) in SQL.
     """
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
 
+    ORDERINGS = {
+        'riskScore': (F('risk_profile__risk_score').asc(nulls_first=True), '-date_joined'),
+        '-riskScore': (F('risk_profile__risk_score').desc(nulls_last=True), '-date_joined'),
+        'joinDate': ('date_joined',),
+        '-joinDate': ('-date_joined',),
+    }
+
     def get(self, request):
         from django.db.models import Count, Q
         from django.core.paginator import Paginator
-        from user.models import Order, OrderReturn
         from django.contrib.auth import get_user_model
         from rest_framework.response import Response
         User = get_user_model()
         PAGE_SIZE = 50
 
         # Non-staff, non-superuser accounts of any role (customer, vendor, delivery)
-        qs = User.objects.filter(
-            is_superuser=False, is_staff=False
-        ).order_by('-date_joined')
+        base_users = User.objects.filter(is_superuser=False, is_staff=False)
+
+        ordering = request.query_params.get('ordering', '-joinDate').strip()
+        if ordering not in self.ORDERINGS:
+            return Response({'error': f"Invalid ordering. Use one of: {', '.join(self.ORDERINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        qs = base_users.select_related('risk_profile').order_by(*self.ORDERINGS[ordering])
 
         # Optional search
         search = request.query_params.get('search', '').strip()
@@ -959,52 +840,31 @@ class UserManagementView(APIView):
         elif status_filter == 'ACTIVE':
             qs = qs.filter(is_blocked=False)
 
-        # Aggregate stats bases on full user set (before search/status filters)
-        base_users = User.objects.filter(
-            is_superuser=False, is_staff=False
+        # Optional minimum risk score (accounts without a profile have a score of 0)
+        min_risk = request.query_params.get('min_risk', '').strip()
+        if min_risk:
+            try:
+                min_risk = int(min_risk)
+            except ValueError:
+                return Response({'error': 'min_risk must be an integer between 0 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+            if min_risk > 0:
+                qs = qs.filter(risk_profile__risk_score__gte=min_risk)
+
+        # Aggregate stats based on full user set (before search/status filters)
+        counts = base_users.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_blocked=False)),
+            blocked=Count('id', filter=Q(is_blocked=True)),
         )
-        total_count = base_users.count()
-        active_count = base_users.filter(is_blocked=False).count()
-        blocked_count = base_users.filter(is_blocked=True).count()
 
         # Pagination
         page_number = int(request.query_params.get('page', 1))
         paginator = Paginator(qs, PAGE_SIZE)
         page_obj = paginator.get_page(page_number)
-        current_batch = page_obj.object_list
-        batch_user_ids = [u.id for u in current_batch]
-
-        # Pre-fetch order stats per user for the CURRENT BATCH ONLY
-        order_stats = {
-            row['user_id']: row
-            for row in Order.objects.filter(user_id__in=batch_user_ids).values('user_id').annotate(
-                total=Count('id'),
-                cancelled=Count('id', filter=Q(status='cancelled')),
-                failed_payments=Count('id', filter=Q(payment_status='failed')),
-            )
-        }
-        # Pre-fetch return counts per user for the CURRENT BATCH ONLY
-        return_counts = {
-            row['user_id']: row['returns']
-            for row in OrderReturn.objects.filter(user_id__in=batch_user_ids).values('user_id').annotate(returns=Count('id'))
-        }
 
         user_list = []
-        for u in current_batch:
-            stats = order_stats.get(u.id, {})
-            total_orders = stats.get('total', 0)
-            cancelled = stats.get('cancelled', 0)
-            failed_pay = stats.get('failed_payments', 0)
-            returns = return_counts.get(u.id, 0)
-
-            # ── Risk score ────────────────────────────────────────────────
-            cancel_rate = (cancelled / total_orders) if total_orders else 0
-            cancel_score = round(cancel_rate * 40)
-            return_rate = (returns / total_orders) if total_orders else 0
-            return_score = round(return_rate * 30)
-            payment_score = min(failed_pay * 10, 30)
-            risk_score = min(cancel_score + return_score + payment_score, 100)
-
+        for u in page_obj.object_list:
+            profile = getattr(u, 'risk_profile', None)
             user_list.append({
                 'id': u.id,
                 'name': u.username or u.email.split('@')[0],
@@ -1014,18 +874,18 @@ class UserManagementView(APIView):
                 'blocked_reason': u.blocked_reason or '',
                 'joinDate': u.date_joined.strftime('%Y-%m-%d'),
                 'is_active': u.is_active,
-                'total_orders': total_orders,
-                'cancelled_orders': cancelled,
-                'return_requests': returns,
-                'failed_payments': failed_pay,
-                'riskScore': risk_score,
+                'total_orders': profile.total_orders if profile else 0,
+                'cancelled_orders': profile.cancelled_orders if profile else 0,
+                'return_requests': profile.return_requests if profile else 0,
+                'failed_payments': profile.failed_payments if profile else 0,
+                'riskScore': profile.risk_score if profile else 0,
             })
 
         return Response({
             'users': user_list,
-            'total': total_count,
-            'active': active_count,
-            'blocked': blocked_count,
+            'total': counts['total'],
+            'active': counts['active'],
+            'blocked': counts['blocked'],
             'num_pages': paginator.num_pages,
             'current_page': page_obj.number,
         })
@@ -1173,6 +1033,9 @@ class AdminOrderViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset().exclude(status='pending')
+        if self.action != 'list':
+            # Nested reviews, images and assignments come from the request's batch loaders (user/loaders.py)
+            queryset = queryset.select_related('billing_address').prefetch_related('items', 'tracking_history')
         status_param = self.request.query_params.get('status')
         if status_param:
             queryset = queryset.filter(status=status_param)
@@ -2,3 +2,6 @@ from django.apps import AppConfig
 
 class SuperAdminConfig(AppConfig):
     name = 'superAdmin'
+
+    def ready(self):
+        import superAdmin.signals
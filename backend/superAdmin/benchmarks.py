@@ -0,0 +1,623 @@
+"""
+superAdmin/benchmarks.py
+Synthetic data and a load driver for benchmarking the hot endpoints.
+
+`generate_dataset()` creates a dataset of a chosen size: vendors, products
+with stored images, customers with addresses, orders with items and
+REVENUE ledger entries, and delivery agents. Everything is written with
+bulk_create in chunks of CHUNK_SIZE orders, so a million orders take
+minutes rather than hours. Rows written that way send no model signals,
+so the function ends by rebuilding the tables those signals maintain
+(search index, agent service areas, daily metrics, vendor balances).
+
+`run_benchmark()` drives SCENARIOS from a pool of threads, either
+in-process through django.test.Client or against a running server
+(`base_url`). It returns latency percentiles and queries per request for
+each scenario, in the JSON document `manage.py run_benchmarks` saves, so
+runs on different commits can be compared with `compare()`.
+"""
+import io
+import itertools
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+BENCH_PREFIX = 'bench'
+CHUNK_SIZE = 5000
+COMMISSION_RATE = Decimal('10.00')
+CITIES = [
+    ('Hyderabad', 'Telangana', '500001'),
+    ('Bengaluru', 'Karnataka', '560001'),
+    ('Chennai', 'Tamil Nadu', '600001'),
+    ('Mumbai', 'Maharashtra', '400001'),
+    ('Pune', 'Maharashtra', '411001'),
+    ('Delhi', 'Delhi', '110001'),
+]
+# (status, weight) of generated orders
+ORDER_STATUSES = [('delivered', 60), ('confirmed', 20), ('shipping', 10), ('cancelled', 5), ('pending', 5)]
+IMAGE_COLOURS = ['#d94f4f', '#4f8fd9', '#4fd98a', '#d9c44f', '#9b4fd9', '#4fd9d4', '#d98f4f', '#707070']
+
+
+# ── Dataset generation ──────────────────────────────────────
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the given auto_now_add fields' values instead of stamping every row with now."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _store_images(count):
+    """Save `count` distinct JPEGs to the image store. Returns [(content hash, size)]."""
+    from PIL import Image
+    from vendor.image_storage import get_image_storage
+
+    storage = get_image_storage()
+    stored = []
+    for index in range(count):
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 800), IMAGE_COLOURS[index % len(IMAGE_COLOURS)]).save(buffer, 'JPEG', quality=85)
+        data = buffer.getvalue()
+        stored.append((storage.save(data), len(data)))
+    return stored
+
+
+def _create_users(tag, kind, count, password, **fields):
+    from user.models import AuthUser
+
+    fields.setdefault('role', kind)
+    return AuthUser.objects.bulk_create([
+        AuthUser(
+            username=f'{BENCH_PREFIX}_{tag}_{kind}{index}',
+            email=f'{BENCH_PREFIX}-{tag}-{kind}{index}@example.com',
+            password=password, **fields,
+        )
+        for index in range(count)
+    ], batch_size=CHUNK_SIZE)
+
+
+def _create_orders(chunk, rng, tag, customers, products, start, days):
+    """One chunk of orders with their items and one REVENUE ledger entry per vendor and order."""
+    from finance.models import LedgerEntry
+    from user.models import Order, OrderItem
+
+    now = timezone.now()
+    statuses, weights = zip(*ORDER_STATUSES)
+    orders, lines = [], []
+    for index in range(start, start + chunk):
+        user_id, address_id = rng.choice(customers)
+        created_at = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        status = rng.choices(statuses, weights)[0]
+        picked = rng.sample(products, rng.randint(1, 4))
+        order_lines = [(product, rng.randint(1, 3)) for product in picked]
+        subtotal = sum(product[2] * quantity for product, quantity in order_lines)
+        tax = (subtotal * Decimal('0.05')).quantize(Decimal('0.01'))
+        orders.append(Order(
+            user_id=user_id,
+            order_number=f'BENCH-{tag}-{index:07d}',
+            delivery_address_id=address_id,
+            billing_address_id=address_id,
+            status=status,
+            payment_method='cod' if index % 3 else 'upi',
+            payment_status='completed' if status in ('delivered', 'confirmed', 'shipping') else 'pending',
+            subtotal=subtotal,
+            tax_amount=tax,
+            shipping_cost=Decimal('50.00'),
+            total_amount=subtotal + tax + Decimal('50.00'),
+            created_at=created_at,
+            delivered_at=created_at + timedelta(days=3) if status == 'delivered' else None,
+        ))
+        lines.append(order_lines)
+
+    Order.objects.bulk_create(orders)
+    items, entries = [], []
+    for order, order_lines in zip(orders, lines):
+        by_vendor = {}
+        for (product_id, vendor_id, price, name), quantity in order_lines:
+            line_total = price * quantity
+            commission = (line_total * COMMISSION_RATE / 100).quantize(Decimal('0.01'))
+            items.append(OrderItem(
+                order=order, product_id=product_id, vendor_id=vendor_id, product_name=name,
+                product_price=price, quantity=quantity, subtotal=line_total,
+                vendor_status='delivered' if order.status == 'delivered' else 'received',
+                commission_rate=COMMISSION_RATE, commission_amount=commission,
+            ))
+            gross, total_commission = by_vendor.get(vendor_id, (Decimal('0.00'), Decimal('0.00')))
+            by_vendor[vendor_id] = (gross + line_total, total_commission + commission)
+        if order.status in ('cancelled', 'pending'):
+            continue
+        for vendor_id, (gross, commission) in by_vendor.items():
+            settles = order.delivered_at + timedelta(days=3) if order.delivered_at else None
+            entries.append(LedgerEntry(
+                vendor_id=vendor_id, order=order, entry_type='REVENUE',
+                amount=gross - commission, gross_amount=gross, commission_amount=commission,
+                net_amount=gross - commission,
+                description=f'Unified entry for Order {order.order_number}',
+                is_settled=bool(settles and settles < now), settlement_date=settles,
+                reference_id=f'ORD_{order.order_number}_V_{vendor_id}',
+                created_at=order.created_at,
+            ))
+    OrderItem.objects.bulk_create(items, batch_size=CHUNK_SIZE)
+    LedgerEntry.objects.bulk_create(entries, batch_size=CHUNK_SIZE)
+    return len(items), len(entries)
+
+
+def generate_dataset(orders=10000, customers=500, vendors=50, products=2000, agents=60,
+                     images_per_product=3, days=90, seed=None, log=print):
+    """
+    Create a synthetic dataset (see the module docstring) and rebuild the
+    derived tables. Returns {'tag': ..., model name: rows created}. All
+    usernames start with `bench_<tag>_`, which is how run_benchmark() finds them.
+    """
+    from deliveryAgent.models import DeliveryAgentProfile
+    from finance.balances import checkpoint_all
+    from finance.models import LedgerEntry
+    from user.models import Address, Order
+    from vendor.models import Product, ProductImage, VendorProfile
+
+    rng = random.Random(seed)
+    tag = uuid.UUID(int=rng.getrandbits(128)).hex[:6]
+    password = make_password(f'{BENCH_PREFIX}-{tag}')  # hashed once, shared by every generated account
+    counts = {'tag': tag}
+
+    with transaction.atomic():
+        vendor_users = _create_users(tag, 'vendor', vendors, password)
+        vendor_rows = VendorProfile.objects.bulk_create([
+            VendorProfile(
+                user=user, shop_name=f'Bench Shop {index}', shop_description='Synthetic benchmark vendor',
+                address=f'{index} Market Road', business_type=VendorProfile.BUSINESS_CHOICES[0][0],
+                approval_status='approved',
+            )
+            for index, user in enumerate(vendor_users)
+        ])
+
+        categories = [choice for choice, _ in Product.CATEGORY_CHOICES]
+        product_rows = Product.objects.bulk_create([
+            Product(
+                vendor=rng.choice(vendor_rows), name=f'Bench product {index}', brand=f'Brand {index % 40}',
+                description=f'Synthetic benchmark product number {index}.', category=rng.choice(categories),
+                price=Decimal(rng.randint(9900, 499900)) / 100, quantity=10 ** 6, status='active',
+            )
+            for index in range(products)
+        ], batch_size=CHUNK_SIZE)
+        stored = _store_images(max(images_per_product, 1) * 2)
+        ProductImage.objects.bulk_create([
+            ProductImage(
+                product=product, content_hash=content_hash, image_size=size,
+                image_mimetype='image/jpeg', image_filename=f'bench-{position}.jpg',
+            )
+            for product in product_rows
+            for position, (content_hash, size) in enumerate(rng.sample(stored, images_per_product))
+        ], batch_size=CHUNK_SIZE)
+
+        customer_users = _create_users(tag, 'customer', customers, password)
+        addresses = Address.objects.bulk_create([
+            Address(
+                user=user, name=user.username, phone='9000000000', address_line1=f'{index} Bench Street',
+                city=city, state=state, pincode=pincode, is_default=True,
+            )
+            for index, user in enumerate(customer_users)
+            for city, state, pincode in [CITIES[index % len(CITIES)]]
+        ], batch_size=CHUNK_SIZE)
+
+        agent_users = _create_users(tag, 'delivery', agents, password)
+        DeliveryAgentProfile.objects.bulk_create([
+            DeliveryAgentProfile(
+                user=user, phone_number='9100000000', address=f'{index} Depot Lane', city=city, state=state,
+                postal_code=pincode, vehicle_type='motorcycle', bank_holder_name=user.username,
+                bank_account_number=f'{index:012d}', bank_ifsc_code='BENCH000001', bank_name='Bench Bank',
+                approval_status='approved', availability_status='available', is_active=True,
+                service_cities=[city], service_pincodes=[pincode],
+            )
+            for index, user in enumerate(agent_users)
+            for city, state, pincode in [CITIES[index % len(CITIES)]]
+        ], batch_size=CHUNK_SIZE)
+
+        admin = _create_users(tag, 'admin', 1, password, is_staff=True, role='customer')
+
+    counts.update({
+        'vendors': vendors, 'products': products, 'product_images': products * images_per_product,
+        'customers': customers, 'agents': agents, 'admins': len(admin),
+    })
+    log(f'Created {vendors} vendors, {products} products, {customers} customers and {agents} agents')
+
+    customer_keys = [(address.user_id, address.id) for address in addresses]
+    product_keys = [(product.id, product.vendor_id, product.price, product.name) for product in product_rows]
+    item_count = entry_count = 0
+    with explicit_timestamps(Order._meta.get_field('created_at'), LedgerEntry._meta.get_field('created_at')):
+        for start in range(0, orders, CHUNK_SIZE):
+            with transaction.atomic():
+                items, entries = _create_orders(
+                    min(CHUNK_SIZE, orders - start), rng, tag, customer_keys, product_keys, start, days
+                )
+            item_count += items
+            entry_count += entries
+            log(f'Created {min(start + CHUNK_SIZE, orders)}/{orders} orders')
+    counts.update({'orders': orders, 'order_items': item_count, 'ledger_entries': entry_count})
+
+    # bulk_create sent no signals: rebuild what they would have maintained
+    quiet = io.StringIO()
+    call_command('rebuild_search_index', stdout=quiet)
+    call_command('rebuild_agent_index', stdout=quiet)
+    call_command('rebuild_daily_metrics', stdout=quiet)
+    checkpoint_all(repair=True)
+    log('Rebuilt the search index, agent service areas, daily metrics and vendor balances')
+    return counts
+
+
+# ── Request driver ──────────────────────────────────────────
+
+class Fixtures:
+    """The generated accounts and rows the scenarios send requests for (the newest dataset)."""
+
+    def __init__(self, tag=None, sample=200, seed=None):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from user.models import Address, AuthUser, Order
+        from vendor.models import Product, ProductImage
+
+        if tag is None:
+            newest = (
+                AuthUser.objects.filter(username__startswith=f'{BENCH_PREFIX}_', username__endswith='_admin0')
+                .order_by('-id').values_list('username', flat=True).first()
+            )
+            if newest is None:
+                raise ValueError('No benchmark dataset found; run generate_benchmark_data first')
+            tag = newest.split('_')[1]
+        prefix = f'{BENCH_PREFIX}_{tag}_'
+        self.tag = tag
+        self.rng = random.Random(seed)
+
+        admin = AuthUser.objects.get(username=f'{prefix}admin0')
+        self.admin_token = str(AccessToken.for_user(admin))
+        addresses = list(
+            Address.objects.filter(user__username__startswith=f'{prefix}customer')
+            .select_related('user').order_by('?')[:sample]
+        )
+        self.customers = [(str(AccessToken.for_user(address.user)), address.id) for address in addresses]
+        self.products = list(
+            Product.objects.filter(vendor__user__username__startswith=prefix)
+            .order_by('?').values('id', 'name', 'price')[:sample]
+        )
+        self.image_ids = list(
+            ProductImage.objects.filter(product__vendor__user__username__startswith=prefix)
+            .order_by('?').values_list('id', flat=True)[:sample]
+        )
+        # Each auto-assignment request consumes one order: hand out distinct ones
+        unassigned = (
+            Order.objects.filter(order_number__startswith=f'BENCH-{tag}-', status='confirmed',
+                                 delivery_assignments__isnull=True)
+            .order_by('-id').values_list('id', flat=True)
+        )
+        self._unassigned = iter(list(unassigned[:10000]))
+        self._lock = threading.Lock()
+        if not (self.customers and self.products and self.image_ids):
+            raise ValueError(f"Benchmark dataset '{tag}' is incomplete")
+
+    def customer(self, index):
+        return self.customers[index % len(self.customers)]
+
+    def next_unassigned_order(self):
+        with self._lock:
+            return next(self._unassigned, None)
+
+
+def _home_api(fixtures, index):
+    return 'GET', f"{reverse('user_products_json')}?page={index % 5 + 1}", None, None
+
+
+def _process_payment(fixtures, index):
+    token, address_id = fixtures.customer(index)
+    products = fixtures.products[index % len(fixtures.products):][:3] or fixtures.products[:1]
+    body = {
+        'payment_mode': 'cod',
+        'address_id': address_id,
+        'items': [
+            {'product_id': p['id'], 'name': p['name'], 'price': str(p['price']), 'quantity': 1} for p in products
+        ],
+    }
+    return 'POST', reverse('process_payment'), body, token
+
+
+def _my_orders(fixtures, index):
+    token, _ = fixtures.customer(index)
+    return 'GET', reverse('my_orders'), None, token
+
+
+def _reports(fixtures, index):
+    return 'GET', reverse('admin_reports_api'), None, fixtures.admin_token
+
+
+def _auto_assign_order(fixtures, index):
+    order_id = fixtures.next_unassigned_order()
+    if order_id is None:
+        raise ValueError('No unassigned confirmed orders left; generate a larger dataset')
+    return 'POST', reverse('trigger_assignment', kwargs={'order_id': order_id}), None, fixtures.admin_token
+
+
+def _serve_product_image(fixtures, index):
+    image_id = fixtures.image_ids[index % len(fixtures.image_ids)]
+    return 'GET', reverse('serve_product_image', kwargs={'image_id': image_id}), None, None
+
+
+# name -> callable(fixtures, request index) -> (method, path, JSON body, bearer token)
+SCENARIOS = {
+    'home_api': _home_api,
+    'process_payment': _process_payment,
+    'my_orders': _my_orders,
+    'reports': _reports,
+    'auto_assign_order': _auto_assign_order,
+    'serve_product_image': _serve_product_image,
+}
+
+
+class Sample:
+    __slots__ = ('status', 'seconds', 'queries', 'size', 'error')
+
+    def __init__(self, status, seconds, queries=None, size=0, error=None):
+        self.status = status
+        self.seconds = seconds
+        self.queries = queries
+        self.size = size
+        self.error = error
+
+
+class InProcessTransport:
+    """Requests through django.test.Client in the calling thread, counting queries on its DB connections."""
+
+    label = 'in-process'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def send(self, method, path, body, token):
+        from django.test import Client
+        from .instrumentation import QueryRecorder
+
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        headers = {'HTTP_ACCEPT': 'application/json'}
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        data = json.dumps(body) if body is not None else ''
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = client.generic(method, path, data, content_type='application/json', **headers)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            response.close()
+        return Sample(response.status_code, time.perf_counter() - started, recorder.count, len(content))
+
+    def close(self):
+        # Worker threads open their own DB connections
+        connections.close_all()
+
+
+class HttpTransport:
+    """
+    Requests to a running server over one keep-alive connection per thread.
+    Queries per request are read from the Server-Timing header, so the
+    server needs SERVER_TIMING_HEADER=True for them to be reported.
+    """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.label = base_url
+        self.secure = parts.scheme == 'https'
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+
+    def _connection(self):
+        import http.client
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            factory = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+            conn = self._local.conn = factory(self.netloc, timeout=60)
+        return conn
+
+    def send(self, method, path, body, token):
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = json.dumps(body).encode() if body is not None else None
+
+        conn = self._connection()
+        started = time.perf_counter()
+        try:
+            conn.request(method, self.prefix + path, body=payload, headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+        except OSError:
+            conn.close()
+            self._local.conn = None
+            raise
+        seconds = time.perf_counter() - started
+        return Sample(response.status, seconds, server_timing_queries(response.getheader('Server-Timing')), len(content))
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+
+
+def server_timing_queries(header):
+    """Query count from a `db;dur=..;desc="N queries"` Server-Timing entry, or None."""
+    for entry in (header or '').split(','):
+        name, *params = [part.strip() for part in entry.split(';')]
+        for param in params:
+            if name == 'db' and param.startswith('desc='):
+                try:
+                    return int(param[5:].strip('"').split()[0])
+                except (ValueError, IndexError):
+                    return None
+    return None
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample.seconds * 1000 for sample in samples)
+    queries = sorted(sample.queries for sample in samples if sample.queries is not None)
+    errors = [sample for sample in samples if not 200 <= sample.status < 400]
+    return {
+        'requests': len(samples),
+        'errors': len(errors),
+        'first_error': next((sample.error or f'HTTP {sample.status}' for sample in errors), None),
+        'status_codes': dict(Counter(str(sample.status) for sample in samples)),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'mean': round(sum(latencies) / len(latencies), 2),
+            'max': round(latencies[-1], 2),
+        } if latencies else None,
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 1),
+            'p95': percentile(queries, 95),
+            'max': queries[-1],
+        } if queries else None,
+        'avg_response_bytes': round(sum(sample.size for sample in samples) / len(samples)) if samples else 0,
+    }
+
+
+def drive(scenario, fixtures, transport, requests, concurrency, warmup=0):
+    """Send `requests` requests of one scenario from `concurrency` threads. Returns its summary."""
+    counter = itertools.count()
+    samples = []
+
+    def worker(total, keep):
+        try:
+            while True:
+                index = next(counter)  # itertools.count is safe to share between threads
+                if index >= total:
+                    return
+                started = time.perf_counter()
+                try:
+                    sample = transport.send(*scenario(fixtures, index))
+                except Exception as e:
+                    sample = Sample(0, time.perf_counter() - started, error=f'{type(e).__name__}: {e}')
+                if keep:
+                    samples.append(sample)
+        finally:
+            transport.close()
+
+    def run(total, keep):
+        threads = [threading.Thread(target=worker, args=(total, keep)) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    if warmup:
+        run(warmup, keep=False)
+        counter = itertools.count(warmup)
+        requests += warmup
+    started = time.perf_counter()
+    run(requests, keep=True)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def dataset_counts(tag):
+    from finance.models import LedgerEntry
+    from user.models import Order
+    from vendor.models import Product
+
+    return {
+        'tag': tag,
+        'orders': Order.objects.filter(order_number__startswith=f'BENCH-{tag}-').count(),
+        'products': Product.objects.filter(vendor__user__username__startswith=f'{BENCH_PREFIX}_{tag}_').count(),
+        'ledger_entries': LedgerEntry.objects.filter(order__order_number__startswith=f'BENCH-{tag}-').count(),
+    }
+
+
+def run_benchmark(scenarios=None, requests=200, concurrency=8, warmup=10, base_url=None, tag=None,
+                  seed=None, log=print):
+    """Run the scenarios one after another. Returns the result document (JSON-serializable)."""
+    names = scenarios or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    fixtures = Fixtures(tag=tag, seed=seed)
+    transport = HttpTransport(base_url) if base_url else InProcessTransport()
+    results = {}
+    for name in names:
+        log(f'Running {name} ({requests} requests, {concurrency} threads)...')
+        results[name] = drive(SCENARIOS[name], fixtures, transport, requests, concurrency, warmup)
+    return {
+        'timestamp': timezone.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'database': connection.vendor,
+        'target': transport.label,
+        'requests_per_scenario': requests,
+        'concurrency': concurrency,
+        'dataset': dataset_counts(fixtures.tag),
+        'scenarios': results,
+    }
+
+
+def default_output_path(result):
+    directory = Path(settings.BASE_DIR) / 'benchmark_results'
+    stamp = result['timestamp'].replace(':', '').replace('-', '')
+    return directory / f"{stamp}-{result['commit'] or 'nocommit'}.json"
+
+
+def compare(previous, current):
+    """Rows of (scenario, metric, previous, current, change %) for scenarios present in both runs."""
+    rows = []
+    for name, now in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric, path in (('p50 ms', ('latency_ms', 'p50')), ('p95 ms', ('latency_ms', 'p95')),
+                             ('p99 ms', ('latency_ms', 'p99')), ('queries', ('queries_per_request', 'mean'))):
+            old, new = before.get(path[0]), now.get(path[0])
+            if not old or not new:
+                continue
+            old, new = old[path[1]], new[path[1]]
+            change = round((new - old) / old * 100, 1) if old else None
+            rows.append((name, metric, old, new, change))
+    return rows
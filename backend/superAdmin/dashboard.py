@@ -0,0 +1,98 @@
+"""
+superAdmin/dashboard.py
+Counters for the admin dashboard.
+
+Each table's breakdown is one conditional aggregate (COUNT ... FILTER)
+instead of a COUNT(*) per status; order counts and revenue come from the
+daily metrics rollup. The result is cached for a few seconds so admins
+refreshing the page share one computation, and dropped explicitly (see
+superAdmin/signals.py) when an approval, block, deletion request, order
+status or user transition is saved.
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+
+CACHE_KEY = 'admin_dashboard_stats'
+CACHE_TIMEOUT = 10  # seconds
+
+# Fields whose changes alter the dashboard, per model label
+TRACKED_FIELDS = {
+    'vendor.vendorprofile': {'approval_status', 'is_blocked', 'is_deletion_requested'},
+    'vendor.product': {'status', 'is_blocked'},
+    'deliveryAgent.deliveryagentprofile': {'approval_status', 'is_blocked', 'is_deletion_requested'},
+    'user.order': {'status', 'payment_status', 'total_amount'},
+    'user.authuser': {'is_blocked', 'is_staff', 'is_superuser'},
+}
+
+
+def compute_dashboard_stats():
+    from django.contrib.auth import get_user_model
+    from deliveryAgent.models import DeliveryAgentProfile
+    from vendor.models import Product, VendorProfile
+    from .models import PlatformDailyMetrics
+
+    vendors = VendorProfile.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(approval_status='pending')),
+        approved=Count('id', filter=Q(approval_status='approved')),
+        rejected=Count('id', filter=Q(approval_status='rejected')),
+        blocked=Count('id', filter=Q(is_blocked=True)),
+        deletion_requested=Count('id', filter=Q(is_deletion_requested=True)),
+    )
+    products = Product.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='active')),
+        inactive=Count('id', filter=Q(status='inactive')),
+        blocked=Count('id', filter=Q(is_blocked=True)),
+    )
+    agents = DeliveryAgentProfile.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(approval_status='pending')),
+        approved=Count('id', filter=Q(approval_status='approved')),
+        blocked=Count('id', filter=Q(is_blocked=True)),
+        deletion_requested=Count('id', filter=Q(is_deletion_requested=True)),
+    )
+    # All non-staff/superuser accounts
+    users = get_user_model().objects.filter(is_superuser=False, is_staff=False).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_blocked=False)),
+        blocked=Count('id', filter=Q(is_blocked=True)),
+    )
+
+    # Orders: one row per day from the rollup instead of a scan of the order table
+    order_statuses = Counter()
+    total_orders = 0
+    for orders, statuses in PlatformDailyMetrics.objects.values_list('orders', 'order_statuses'):
+        total_orders += orders
+        order_statuses.update(statuses)
+    total_revenue = PlatformDailyMetrics.objects.aggregate(total=Sum('revenue'))['total']
+
+    deletion_requests = vendors.pop('deletion_requested') + agents.pop('deletion_requested')
+    return {
+        'vendors': vendors,
+        'products': products,
+        'agents': agents,
+        'users': users,
+        'orders': {
+            'total': total_orders,
+            'pending': order_statuses['pending'],
+            'delivered': order_statuses['delivered'],
+            'cancelled': order_statuses['cancelled'],
+        },
+        'deletion_requests': deletion_requests,
+        'total_revenue': float(total_revenue or 0),
+    }
+
+
+def dashboard_stats():
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(CACHE_KEY, stats, CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    cache.delete(CACHE_KEY)
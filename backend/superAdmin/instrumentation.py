@@ -0,0 +1,215 @@
+"""
+superAdmin/instrumentation.py
+Per-endpoint SQL instrumentation.
+
+`QueryInstrumentationMiddleware` wraps every request's database calls
+(`connection.execute_wrapper`) and records, per resolved URL name:
+requests, query counts, DB time, total time, response size and the
+statements repeated within a single request. A statement repeated with
+different parameters is the N+1 signature. The stats live in this process
+(`endpoint_stats`, served to admins by the instrumentation API) and are
+optionally exposed per response as a `Server-Timing` header.
+
+QUERY_BUDGETS gives hot endpoints a query ceiling: a request above its
+budget is logged as a warning, and `assert_max_queries()` lets tests fail
+when an endpoint regresses:
+
+    with assert_max_queries('my_orders', 10):
+        client.get('/my_orders')
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# URL name -> max queries per request
+QUERY_BUDGETS = {
+    'user_products': 12,
+    'user_products_json': 12,
+    'cart': 10,
+    'my_orders': 10,
+    'order_summaries': 4,
+    'admin_reports_api': 10,
+    'admin_dashboard_api': 12,
+}
+TOP_DUPLICATES = 5  # repeated statements kept per endpoint
+UNRESOLVED = '<unresolved>'
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """The statement with its IN lists collapsed, so batches of any size count as one shape."""
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', sql)).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper callable counting the queries of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.statements.items() if count > 1}
+
+
+# ── Stats ───────────────────────────────────────────────────
+
+class EndpointStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.since = timezone.now()
+
+    def record(self, name, recorder, duration, size):
+        with self._lock:
+            stats = self._endpoints.setdefault(name, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0, 'total_time': 0.0,
+                'response_bytes': 0, 'max_response_bytes': 0, 'over_budget': 0, 'duplicates': Counter(),
+            })
+            stats['requests'] += 1
+            stats['queries'] += recorder.count
+            stats['max_queries'] = max(stats['max_queries'], recorder.count)
+            stats['db_time'] += recorder.duration
+            stats['total_time'] += duration
+            if size is not None:
+                stats['response_bytes'] += size
+                stats['max_response_bytes'] = max(stats['max_response_bytes'], size)
+            budget = QUERY_BUDGETS.get(name)
+            if budget is not None and recorder.count > budget:
+                stats['over_budget'] += 1
+            duplicates = stats['duplicates']
+            duplicates.update(recorder.duplicates())
+            if len(duplicates) > TOP_DUPLICATES * 4:  # keep memory bounded
+                stats['duplicates'] = Counter(dict(duplicates.most_common(TOP_DUPLICATES)))
+
+    def snapshot(self):
+        with self._lock:
+            rows = []
+            for name, stats in self._endpoints.items():
+                requests = stats['requests']
+                rows.append({
+                    'endpoint': name,
+                    'requests': requests,
+                    'avg_queries': round(stats['queries'] / requests, 1),
+                    'max_queries': stats['max_queries'],
+                    'budget': QUERY_BUDGETS.get(name),
+                    'over_budget': stats['over_budget'],
+                    'avg_db_ms': round(stats['db_time'] / requests * 1000, 2),
+                    'avg_total_ms': round(stats['total_time'] / requests * 1000, 2),
+                    'avg_response_bytes': round(stats['response_bytes'] / requests),
+                    'max_response_bytes': stats['max_response_bytes'],
+                    'duplicate_queries': [
+                        {'sql': sql, 'count': count} for sql, count in stats['duplicates'].most_common(TOP_DUPLICATES)
+                    ],
+                })
+            since = self.since
+        rows.sort(key=lambda row: row['avg_queries'] * row['requests'], reverse=True)
+        return {'since': since, 'endpoints': rows}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.since = timezone.now()
+
+
+endpoint_stats = EndpointStats()
+
+# Callables receiving (url name, QueryRecorder) for each request, see assert_max_queries
+_observers = []
+
+
+# ── Middleware ──────────────────────────────────────────────
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_INSTRUMENTATION', True)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', settings.DEBUG)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        name = (match.view_name if match else None) or UNRESOLVED
+        # Streaming responses (SSE, exports) have no size up front and query while streaming
+        size = None if response.streaming else len(response.content)
+        endpoint_stats.record(name, recorder, duration, size)
+
+        budget = QUERY_BUDGETS.get(name)
+        if budget is not None and recorder.count > budget:
+            logger.warning(f"{name} ran {recorder.count} queries (budget {budget}): {request.path}")
+        for observer in list(_observers):
+            observer(name, recorder)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+                f'total;dur={duration * 1000:.1f}'
+            )
+        return response
+
+
+# ── Test assertions ─────────────────────────────────────────
+
+@contextmanager
+def assert_max_queries(url_name, limit=None):
+    """
+    Fail (AssertionError) if a request to `url_name` made inside the block
+    runs more than `limit` queries (default: its QUERY_BUDGETS entry), or if
+    no such request is made at all. Needs the middleware enabled.
+    """
+    limit = QUERY_BUDGETS.get(url_name) if limit is None else limit
+    if limit is None:
+        raise ValueError(f"No query budget for '{url_name}'; pass a limit")
+
+    seen = []
+
+    def observe(name, recorder):
+        if name == url_name:
+            seen.append(recorder)
+
+    _observers.append(observe)
+    try:
+        yield seen
+    finally:
+        _observers.remove(observe)
+
+    if not seen:
+        raise AssertionError(f"No request to '{url_name}' was made")
+    worst = max(seen, key=lambda recorder: recorder.count)
+    if worst.count > limit:
+        repeated = '\n'.join(f'  {count}x {sql}' for sql, count in Counter(worst.duplicates()).most_common(TOP_DUPLICATES))
+        raise AssertionError(
+            f"'{url_name}' ran {worst.count} queries (limit {limit})"
+            + (f"; repeated statements:\n{repeated}" if repeated else '')
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from superAdmin.benchmarks import generate_dataset
+
+
+class Command(BaseCommand):
+    help = ('Bulk-create a synthetic dataset for run_benchmarks: vendors, products with images, customers, '
+            'orders with items and ledger entries, and delivery agents. Scales to millions of orders.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--vendors', type=int, default=50)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--agents', type=int, default=60)
+        parser.add_argument('--images-per-product', type=int, default=3)
+        parser.add_argument('--days', type=int, default=90,
+                            help='Spread order dates over this many past days')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Random seed, for a reproducible dataset')
+
+    def handle(self, *args, **options):
+        for name in ('orders', 'customers', 'vendors', 'products', 'agents', 'days'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be at least 1')
+        if options['images_per_product'] < 0:
+            raise CommandError('--images-per-product cannot be negative')
+
+        counts = generate_dataset(
+            orders=options['orders'], customers=options['customers'], vendors=options['vendors'],
+            products=options['products'], agents=options['agents'],
+            images_per_product=options['images_per_product'], days=options['days'], seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully generated benchmark dataset '{counts['tag']}': {counts['orders']} orders, "
+            f"{counts['order_items']} items, {counts['ledger_entries']} ledger entries."
+        ))
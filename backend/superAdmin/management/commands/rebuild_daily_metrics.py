@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from superAdmin.metrics import rebuild_metrics
+
+
+class Command(BaseCommand):
+    help = ('Recompute the PlatformDailyMetrics rollup from orders, ledger entries, deliveries and signups. '
+            'Without options the whole history is rebuilt; --days N repairs only the most recent days.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only rebuild the last N days (including today)')
+        parser.add_argument('--since', type=str, default=None,
+                            help='Only rebuild from this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        start = None
+        if options['since']:
+            try:
+                start = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+        elif options['days']:
+            start = timezone.now().date() - timedelta(days=options['days'] - 1)
+
+        written = rebuild_metrics(start=start)
+        scope = f'since {start}' if start else 'for the whole history'
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt daily metrics {scope} ({written} day rows).'))
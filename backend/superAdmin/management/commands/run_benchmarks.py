@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from superAdmin.benchmarks import SCENARIOS, compare, default_output_path, run_benchmark
+
+
+class Command(BaseCommand):
+    help = ('Load-test the hot endpoints against the dataset from generate_benchmark_data and save '
+            'p50/p95/p99 latency and queries per request as JSON. Requests run in-process by default; '
+            'use PostgreSQL for concurrent runs, since SQLite serializes writers (process_payment).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=None,
+                            help='Scenarios to run (default: all)')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument('--base-url', default=None,
+                            help='Benchmark a running server (e.g. http://127.0.0.1:8000) instead of in-process')
+        parser.add_argument('--dataset', default=None, help='Dataset tag (default: the newest)')
+        parser.add_argument('--output', default=None,
+                            help='Result file (default: benchmark_results/<time>-<commit>.json)')
+        parser.add_argument('--compare', default=None, help='Earlier result file to compare against')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['warmup'] < 0:
+            raise CommandError('--requests and --concurrency must be at least 1, --warmup at least 0')
+        previous = None
+        if options['compare']:
+            try:
+                previous = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read {options["compare"]}: {e}')
+
+        try:
+            result = run_benchmark(
+                scenarios=options['scenarios'], requests=options['requests'],
+                concurrency=options['concurrency'], warmup=options['warmup'],
+                base_url=options['base_url'], tag=options['dataset'], log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"\n{'scenario':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7} "
+                          f"{'queries':>8} {'errors':>7}")
+        for name, summary in result['scenarios'].items():
+            latency = summary['latency_ms'] or {}
+            queries = summary['queries_per_request'] or {}
+            self.stdout.write(
+                f"{name:<20} {latency.get('p50', '-'):>8} {latency.get('p95', '-'):>8} {latency.get('p99', '-'):>8} "
+                f"{summary['throughput_rps'] or '-':>7} {queries.get('mean', '-'):>8} {summary['errors']:>7}"
+            )
+            if summary['first_error']:
+                self.stdout.write(self.style.WARNING(f"  first error: {summary['first_error']}"))
+
+        if previous is not None:
+            self.stdout.write(f"\nCompared with {previous.get('commit')} ({previous.get('timestamp')}):")
+            for name, metric, old, new, change in compare(previous, result):
+                change = f'{change:+.1f}%' if change is not None else '-'
+                self.stdout.write(f'{name:<20} {metric:<8} {old:>10} -> {new:<10} {change}')
+
+        output = Path(options['output']) if options['output'] else default_output_path(result)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Successfully saved benchmark results to {output}'))
@@ -0,0 +1,437 @@
+"""
+superAdmin/metrics.py
+Daily platform metrics rollup behind the admin reports.
+
+Every order, ledger entry, delivery assignment, delivery commission and
+customer signup contributes a few counters to the PlatformDailyMetrics row
+of the day it was created on. The signals in superAdmin/signals.py turn each
+save / delete into a -old +new contribution and apply it once the
+surrounding transaction has committed, so checkout never waits on the day
+row. `rebuild_metrics()` recomputes any range of days from the source tables
+(initial backfill, and repairing drift from bulk updates that bypass signals).
+
+The reports read the rollup only: the table holds one row per day, so the
+cost no longer grows with the number of orders.
+"""
+import logging
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REPORT_DAYS = 30
+TOP_LIST_SIZE = 10
+PENDING_COMMISSION_STATUSES = ('pending', 'approved')
+
+COUNTER_FIELDS = (
+    'orders', 'completed_orders', 'revenue',
+    'ledger_gross', 'ledger_commission', 'ledger_net',
+    'deliveries_done', 'deliveries_failed',
+    'delivery_commissions_paid', 'delivery_commissions_pending',
+    'new_customers',
+)
+BREAKDOWN_FIELDS = ('order_statuses', 'payment_statuses')
+
+
+def day_of(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def start_of(day):
+    """Datetime of midnight at the start of `day`, for index-friendly range filters."""
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def _amount(value):
+    return Decimal(str(value or 0))
+
+
+# ── Contributions ───────────────────────────────────────────
+# Each returns (day, {counter: delta}) for one source row, or None when the
+# row does not count towards any metric. Keys of the status breakdowns are
+# (field, status) tuples.
+
+def order_facts(order):
+    facts = {
+        'orders': 1,
+        ('order_statuses', order.status): 1,
+        ('payment_statuses', order.payment_status): 1,
+    }
+    if order.payment_status == 'completed':
+        facts['completed_orders'] = 1
+        facts['revenue'] = _amount(order.total_amount)
+    return day_of(order.created_at), facts
+
+
+def ledger_facts(entry):
+    return day_of(entry.created_at), {
+        'ledger_gross': _amount(entry.gross_amount),
+        'ledger_commission': _amount(entry.commission_amount),
+        'ledger_net': _amount(entry.net_amount),
+    }
+
+
+def assignment_facts(assignment):
+    if assignment.status == 'delivered':
+        return day_of(assignment.assigned_at), {'deliveries_done': 1}
+    if assignment.status == 'failed':
+        return day_of(assignment.assigned_at), {'deliveries_failed': 1}
+    return None
+
+
+def commission_facts(commission):
+    if commission.status == 'paid':
+        return day_of(commission.created_at), {'delivery_commissions_paid': _amount(commission.total_commission)}
+    if commission.status in PENDING_COMMISSION_STATUSES:
+        return day_of(commission.created_at), {'delivery_commissions_pending': _amount(commission.total_commission)}
+    return None
+
+
+def customer_facts(user):
+    if user.role != 'customer':
+        return None
+    return day_of(user.date_joined), {'new_customers': 1}
+
+
+# ── Incremental maintenance ─────────────────────────────────
+
+_batch = threading.local()
+
+
+def _merge(target, deltas):
+    for day, facts in deltas.items():
+        for key, value in facts.items():
+            target[day][key] += value
+
+
+def _nonzero(deltas):
+    deltas = {
+        day: {key: value for key, value in facts.items() if value}
+        for day, facts in deltas.items()
+    }
+    return {day: facts for day, facts in deltas.items() if facts}
+
+
+def record_change(before, after):
+    """
+    Replace contribution `before` by `after` (either may be None) in the
+    rollup, once the current transaction commits.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for sign, contribution in ((-1, before), (1, after)):
+        if contribution is None:
+            continue
+        day, facts = contribution
+        for key, value in facts.items():
+            deltas[day][key] += sign * value
+
+    pending = getattr(_batch, 'deltas', None)
+    if pending is not None:
+        _merge(pending, deltas)
+        return
+    deltas = _nonzero(deltas)
+    if deltas:
+        transaction.on_commit(lambda: apply_deltas(deltas))
+
+
+@contextmanager
+def batched_changes():
+    """
+    Collect the record_change() calls made inside the block (e.g. a bulk
+    operation saving many rows) and apply them as one rollup update after
+    commit, instead of one per saved row.
+    """
+    if getattr(_batch, 'deltas', None) is not None:  # already batching
+        yield
+        return
+    _batch.deltas = defaultdict(lambda: defaultdict(int))
+    try:
+        yield
+        deltas = _nonzero(_batch.deltas)
+    finally:
+        _batch.deltas = None
+    if deltas:
+        transaction.on_commit(lambda: apply_deltas(deltas))
+
+
+def apply_deltas(deltas):
+    """
+    Add {day: {counter: delta}} to the rollup rows, one short transaction per
+    day. Counters are incremented in the UPDATE itself (F expressions); only
+    the status breakdown maps, when they change, are read and written back,
+    under the row lock that UPDATE already holds.
+    """
+    from .models import PlatformDailyMetrics
+
+    for day in sorted(deltas):
+        counters = {key: delta for key, delta in deltas[day].items() if not isinstance(key, tuple)}
+        breakdowns = defaultdict(dict)
+        for key, delta in deltas[day].items():
+            if isinstance(key, tuple):
+                field, name = key
+                breakdowns[field][name] = delta
+        try:
+            with transaction.atomic():
+                PlatformDailyMetrics.objects.bulk_create([PlatformDailyMetrics(date=day)], ignore_conflicts=True)
+                rows = PlatformDailyMetrics.objects.filter(date=day)
+                rows.update(updated_at=timezone.now(), **{key: F(key) + delta for key, delta in counters.items()})
+                if breakdowns:
+                    stored = rows.values(*breakdowns).get()
+                    for field, changes in breakdowns.items():
+                        counts = stored[field]
+                        for name, delta in changes.items():
+                            counts[name] = counts.get(name, 0) + delta
+                            if not counts[name]:
+                                del counts[name]
+                    rows.update(**stored)
+        except Exception as e:
+            # The report can be repaired with rebuild_daily_metrics; the business write already committed
+            logger.warning(f"Could not update daily metrics for {day}: {e}")
+
+
+# ── Rebuild from source tables ──────────────────────────────
+
+def rebuild_metrics(start=None, end=None):
+    """
+    Recompute the rows for days start..end (inclusive; open-ended when None)
+    from the source tables and replace them. Returns the number of rows written.
+    """
+    from django.contrib.auth import get_user_model
+    from deliveryAgent.models import DeliveryAssignment, DeliveryCommission
+    from finance.models import LedgerEntry
+    from user.models import Order
+    from .models import PlatformDailyMetrics
+
+    def in_range(queryset, field):
+        if start:
+            queryset = queryset.filter(**{f'{field}__gte': start_of(start)})
+        if end:
+            queryset = queryset.filter(**{f'{field}__lt': start_of(end + timedelta(days=1))})
+        return queryset.annotate(day=TruncDate(field))
+
+    days = defaultdict(lambda: {'order_statuses': Counter(), 'payment_statuses': Counter()})
+
+    orders = (
+        in_range(Order.objects.all(), 'created_at')
+        .values('day', 'status', 'payment_status')
+        .annotate(count=Count('id'), amount=Sum('total_amount'))
+    )
+    for row in orders:
+        day = days[row['day']]
+        day['orders'] = day.get('orders', 0) + row['count']
+        day['order_statuses'][row['status']] += row['count']
+        day['payment_statuses'][row['payment_status']] += row['count']
+        if row['payment_status'] == 'completed':
+            day['completed_orders'] = day.get('completed_orders', 0) + row['count']
+            day['revenue'] = day.get('revenue', 0) + (row['amount'] or 0)
+
+    ledger = (
+        in_range(LedgerEntry.objects.all(), 'created_at')
+        .values('day')
+        .annotate(gross=Sum('gross_amount'), commission=Sum('commission_amount'), net=Sum('net_amount'))
+    )
+    for row in ledger:
+        days[row['day']].update(
+            ledger_gross=row['gross'] or 0,
+            ledger_commission=row['commission'] or 0,
+            ledger_net=row['net'] or 0,
+        )
+
+    deliveries = (
+        in_range(DeliveryAssignment.objects.filter(status__in=['delivered', 'failed']), 'assigned_at')
+        .values('day', 'status')
+        .annotate(count=Count('id'))
+    )
+    for row in deliveries:
+        field = 'deliveries_done' if row['status'] == 'delivered' else 'deliveries_failed'
+        days[row['day']][field] = row['count']
+
+    commissions = (
+        in_range(DeliveryCommission.objects.all(), 'created_at')
+        .values('day')
+        .annotate(
+            paid=Sum('total_commission', filter=Q(status='paid')),
+            pending=Sum('total_commission', filter=Q(status__in=PENDING_COMMISSION_STATUSES)),
+        )
+    )
+    for row in commissions:
+        days[row['day']].update(
+            delivery_commissions_paid=row['paid'] or 0,
+            delivery_commissions_pending=row['pending'] or 0,
+        )
+
+    signups = (
+        in_range(get_user_model().objects.filter(role='customer'), 'date_joined')
+        .values('day')
+        .annotate(count=Count('id'))
+    )
+    for row in signups:
+        days[row['day']]['new_customers'] = row['count']
+
+    rows = [
+        PlatformDailyMetrics(
+            date=day,
+            order_statuses=dict(values.pop('order_statuses')),
+            payment_statuses=dict(values.pop('payment_statuses')),
+            **values,
+        )
+        for day, values in sorted(days.items())
+    ]
+
+    with transaction.atomic():
+        stale = PlatformDailyMetrics.objects.all()
+        if start:
+            stale = stale.filter(date__gte=start)
+        if end:
+            stale = stale.filter(date__lte=end)
+        stale.delete()
+        PlatformDailyMetrics.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+# ── Reading ─────────────────────────────────────────────────
+
+def platform_report(today=None):
+    """
+    Order, revenue, finance, delivery and signup figures for the reports
+    pages, from the rollup rows in a single query: lifetime totals, today /
+    last 7 days / last REPORT_DAYS days, and the daily trends.
+    """
+    from .models import PlatformDailyMetrics
+
+    today = today or timezone.now().date()
+    month_start = today - timedelta(days=REPORT_DAYS)
+    week_start = today - timedelta(days=7)
+
+    totals = defaultdict(int)
+    week = defaultdict(int)
+    month = defaultdict(int)
+    today_row = defaultdict(int)
+    order_statuses = Counter()
+    payment_statuses = Counter()
+    daily_revenue = []
+    user_growth = []
+
+    for row in PlatformDailyMetrics.objects.order_by('date').values('date', *COUNTER_FIELDS, *BREAKDOWN_FIELDS):
+        order_statuses.update(row['order_statuses'])
+        payment_statuses.update(row['payment_statuses'])
+        periods = [totals]
+        if row['date'] >= month_start:
+            periods.append(month)
+            if row['completed_orders']:
+                daily_revenue.append({'day': row['date'], 'revenue': row['revenue'], 'orders': row['completed_orders']})
+            if row['new_customers']:
+                user_growth.append({'day': row['date'], 'count': row['new_customers']})
+        if row['date'] >= week_start:
+            periods.append(week)
+        if row['date'] == today:
+            periods.append(today_row)
+        for period in periods:
+            for field in COUNTER_FIELDS:
+                period[field] += row[field]
+
+    return {
+        # Orders
+        'total_orders': totals['orders'],
+        'orders_today': today_row['orders'],
+        'orders_this_week': week['orders'],
+        'orders_this_month': month['orders'],
+        'order_status_breakdown': [
+            {'status': status, 'count': count} for status, count in order_statuses.most_common() if count
+        ],
+        'payment_status_breakdown': [
+            {'payment_status': status, 'count': count} for status, count in payment_statuses.most_common() if count
+        ],
+
+        # Revenue
+        'total_revenue': totals['revenue'],
+        'avg_order_value': totals['revenue'] / totals['completed_orders'] if totals['completed_orders'] else 0,
+        'revenue_today': today_row['revenue'],
+        'revenue_week': week['revenue'],
+        'revenue_month': month['revenue'],
+        'daily_revenue': daily_revenue,
+
+        # Finance
+        'total_gross': totals['ledger_gross'],
+        'total_platform_commission': totals['ledger_commission'],
+        'total_net': totals['ledger_net'],
+
+        # Delivery
+        'total_commissions_paid': totals['delivery_commissions_paid'],
+        'total_commissions_pending': totals['delivery_commissions_pending'],
+        'total_deliveries_done': totals['deliveries_done'],
+        'total_deliveries_failed': totals['deliveries_failed'],
+
+        # Users
+        'total_customers': totals['new_customers'],
+        'new_users_today': today_row['new_customers'],
+        'new_users_week': week['new_customers'],
+        'user_growth': user_growth,
+    }
+
+
+def top_vendors(since):
+    """Vendors with the highest net order revenue booked since `since`."""
+    from finance.models import LedgerEntry
+
+    return list(
+        LedgerEntry.objects.filter(entry_type='REVENUE', created_at__gte=start_of(since))
+        .values('vendor__shop_name', 'vendor__id')
+        .annotate(
+            total_gross=Sum('gross_amount'),
+            total_commission=Sum('commission_amount'),
+            total_net=Sum('net_amount'),
+            order_count=Count('order', distinct=True),
+        )
+        .order_by('-total_net')[:TOP_LIST_SIZE]
+    )
+
+
+def top_products(since):
+    """Most ordered products, by quantity, in orders placed since `since`."""
+    from user.models import OrderItem
+
+    return list(
+        OrderItem.objects.filter(order__created_at__gte=start_of(since))
+        .values('product_name')
+        .annotate(
+            total_qty=Sum('quantity'),
+            total_revenue=Sum('subtotal'),
+            order_count=Count('order', distinct=True),
+        )
+        .order_by('-total_qty')[:TOP_LIST_SIZE]
+    )
+
+
+def catalog_counts():
+    """Vendor, product and delivery agent head counts, one conditional aggregate per table."""
+    from deliveryAgent.models import DeliveryAgentProfile
+    from vendor.models import Product, VendorProfile
+
+    counts = VendorProfile.objects.aggregate(
+        total_vendors=Count('id'),
+        approved_vendors=Count('id', filter=Q(approval_status='approved')),
+        blocked_vendors=Count('id', filter=Q(is_blocked=True)),
+    )
+    counts.update(Product.objects.aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(is_blocked=False)),
+        blocked_products=Count('id', filter=Q(is_blocked=True)),
+    ))
+    counts.update(DeliveryAgentProfile.objects.aggregate(
+        total_agents=Count('id'),
+        approved_agents=Count('id', filter=Q(approval_status='approved')),
+    ))
+    return counts
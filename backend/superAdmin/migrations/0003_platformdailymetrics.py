@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superAdmin', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformDailyMetrics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders', models.IntegerField(default=0)),
+                ('order_statuses', models.JSONField(blank=True, default=dict)),
+                ('payment_statuses', models.JSONField(blank=True, default=dict)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ledger_gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ledger_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ledger_net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('deliveries_done', models.IntegerField(default=0)),
+                ('deliveries_failed', models.IntegerField(default=0)),
+                ('delivery_commissions_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('delivery_commissions_pending', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('new_customers', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Platform daily metrics',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -76,3 +76,44 @@ class ContactQuery(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+
+class PlatformDailyMetrics(models.Model):
+    """
+    One row per calendar day of platform activity, kept up to date from order,
+    ledger, delivery and signup events (see superAdmin/metrics.py) so the
+    reports pages read a month of rows instead of aggregating history.
+    Orders, deliveries and delivery commissions count towards the day they
+    were created on, whatever their current status.
+    """
+    date = models.DateField(unique=True)
+
+    # Orders
+    orders = models.IntegerField(default=0)
+    order_statuses = models.JSONField(default=dict, blank=True)    # {status: count}
+    payment_statuses = models.JSONField(default=dict, blank=True)  # {payment_status: count}
+    completed_orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Finance ledger
+    ledger_gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ledger_commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ledger_net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Delivery
+    deliveries_done = models.IntegerField(default=0)
+    deliveries_failed = models.IntegerField(default=0)
+    delivery_commissions_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    delivery_commissions_pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Users
+    new_customers = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Platform daily metrics'
+
+    def __str__(self):
+        return f"Metrics {self.date}"
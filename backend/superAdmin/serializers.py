@@ -8,6 +8,7 @@ from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApproval
 from deliveryAgent.models import DeliveryAgentProfile
 from user.models import Order, OrderItem, Address, OrderTracking, OrderReturn
 from user.serializers import OrderItemSerializer, AddressSerializer, OrderTrackingSerializer
+from user.loaders import order_loaders
 
 class AdminOrderListSerializer(serializers.ModelSerializer):
     customer_email = serializers.CharField(source='user.email', read_only=True)
@@ -29,9 +30,24 @@ class AdminOrderDetailSerializer(serializers.ModelSerializer):
     tracking_history = OrderTrackingSerializer(many=True, read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
     
-    delivery_agent_name = serializers.CharField(source='delivery_assignment.agent.user.username', read_only=True)
-    delivery_assignment_id = serializers.IntegerField(source='delivery_assignment.id', read_only=True)
-    delivery_assignment_status = serializers.CharField(source='delivery_assignment.status', read_only=True)
+    delivery_agent_name = serializers.SerializerMethodField()
+    delivery_assignment_id = serializers.SerializerMethodField()
+    delivery_assignment_status = serializers.SerializerMethodField()
+
+    def _delivery_assignment(self, obj):
+        return order_loaders(self.context).delivery_assignment.load(obj.id)
+
+    def get_delivery_agent_name(self, obj):
+        assignment = self._delivery_assignment(obj)
+        return assignment.agent.user.username if assignment else None
+
+    def get_delivery_assignment_id(self, obj):
+        assignment = self._delivery_assignment(obj)
+        return assignment.id if assignment else None
+
+    def get_delivery_assignment_status(self, obj):
+        assignment = self._delivery_assignment(obj)
+        return assignment.status if assignment else None
 
     def get_delivery_address(self, obj):
         # Prefer the explicit delivery address linked to the order
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from deliveryAgent.models import DeliveryAgentProfile, DeliveryAssignment, DeliveryCommission
+from finance.models import LedgerEntry
+from user.models import Order
+from vendor.models import Product, VendorProfile
+from . import dashboard, metrics
+
+# Source model -> (contribution function, fields the contribution depends on)
+TRACKED_MODELS = {
+    Order: (metrics.order_facts, {'status', 'payment_status', 'total_amount', 'created_at'}),
+    LedgerEntry: (metrics.ledger_facts, {'gross_amount', 'commission_amount', 'net_amount', 'created_at'}),
+    DeliveryAssignment: (metrics.assignment_facts, {'status', 'assigned_at'}),
+    DeliveryCommission: (metrics.commission_facts, {'status', 'total_commission', 'created_at'}),
+    get_user_model(): (metrics.customer_facts, {'role', 'date_joined'}),
+}
+
+
+def _affects_metrics(sender, update_fields):
+    # e.g. the last_login save on every sign-in touches no metric
+    return update_fields is None or not TRACKED_MODELS[sender][1].isdisjoint(update_fields)
+
+
+def remember_metrics(sender, instance, update_fields=None, **kwargs):
+    # Edits need the stored contribution to compute the delta
+    instance._stored_metrics = None
+    if instance.pk and _affects_metrics(sender, update_fields):
+        # Callers that read the row under lock pass it along (deliveryAgent/finalization.py)
+        stored = getattr(instance, '_stored_state', None) or sender._default_manager.filter(pk=instance.pk).first()
+        if stored is not None:
+            instance._stored_metrics = TRACKED_MODELS[sender][0](stored)
+
+
+def update_metrics(sender, instance, created, update_fields=None, **kwargs):
+    if not _affects_metrics(sender, update_fields):
+        return
+    before = None if created else getattr(instance, '_stored_metrics', None)
+    metrics.record_change(before, TRACKED_MODELS[sender][0](instance))
+
+
+def remove_metrics(sender, instance, **kwargs):
+    metrics.record_change(TRACKED_MODELS[sender][0](instance), None)
+
+
+for model in TRACKED_MODELS:
+    uid = f'platform_metrics_{model._meta.label_lower}'
+    pre_save.connect(remember_metrics, sender=model, dispatch_uid=uid)
+    post_save.connect(update_metrics, sender=model, dispatch_uid=uid)
+    post_delete.connect(remove_metrics, sender=model, dispatch_uid=uid)
+
+
+def refresh_dashboard(sender, instance, update_fields=None, **kwargs):
+    # After commit (and after the metrics rollup update above), so the next read sees the new state
+    tracked = dashboard.TRACKED_FIELDS[sender._meta.label_lower]
+    if update_fields is None or not tracked.isdisjoint(update_fields):
+        transaction.on_commit(dashboard.invalidate_dashboard_stats)
+
+
+for model in (VendorProfile, Product, DeliveryAgentProfile, Order, get_user_model()):
+    uid = f'admin_dashboard_{model._meta.label_lower}'
+    post_save.connect(refresh_dashboard, sender=model, dispatch_uid=uid)
+    post_delete.connect(refresh_dashboard, sender=model, dispatch_uid=uid)
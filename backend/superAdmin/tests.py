@@ -1,3 +1,215 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models import Sum
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from superAdmin import benchmarks, metrics
+from superAdmin.instrumentation import assert_max_queries
+from superAdmin.models import PlatformDailyMetrics
+from user.models import AuthUser, Order
+from deliveryAgent import tracking
+from finance.balances import checkpoint_all
+from finance.models import LedgerEntry
+from deliveryAgent.tests import make_agent, make_assignment
+from user.tests import CheckoutTestCase, raw_cursor
+from vendor.tests import ImageStoreTestCase, make_vendor
+
+
+def make_admin(name='admin1'):
+    return AuthUser.objects.create_user(
+        username=name, email=f'{name}@example.com', password='pw123456', is_staff=True, role='admin',
+    )
+
+
+def admin_client(user=None):
+    client = APIClient()
+    client.force_authenticate(user or make_admin())
+    return client
+
+
+# ── Daily metrics ───────────────────────────────────────────
+
+class DailyMetricsTests(CheckoutTestCase):
+    def metrics_row(self):
+        return PlatformDailyMetrics.objects.get()
+
+    def test_checkout_updates_the_day_row_once(self):
+        with mock.patch.object(metrics, 'apply_deltas', wraps=metrics.apply_deltas) as apply_deltas, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.checkout((self.phone, 2), (self.case, 1)).status_code, 200)
+        self.assertEqual(apply_deltas.call_count, 1)
+
+        order = Order.objects.get()
+        row = self.metrics_row()
+        self.assertEqual((row.orders, row.completed_orders, row.revenue), (1, 1, order.total_amount))
+        self.assertEqual(row.order_statuses, {'confirmed': 1})
+        self.assertEqual(row.payment_statuses, {'completed': 1})
+        self.assertEqual(row.ledger_gross, Decimal('220.00'))
+
+    def test_status_change_moves_breakdown_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout((self.phone, 1))
+        order = Order.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'delivered'
+            order.save(update_fields=['status'])
+
+        row = self.metrics_row()
+        self.assertEqual(row.orders, 1)
+        self.assertEqual(row.order_statuses, {'delivered': 1})
+
+    def test_rebuild_matches_incremental_rollup(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout((self.phone, 1), (self.case, 3))
+        incremental = PlatformDailyMetrics.objects.values().get()
+        metrics.rebuild_metrics()
+        rebuilt = PlatformDailyMetrics.objects.values().get()
+        # The customer signed up in setUp, outside captureOnCommitCallbacks
+        for field in set(metrics.COUNTER_FIELDS + metrics.BREAKDOWN_FIELDS) - {'new_customers'}:
+            self.assertEqual(rebuilt[field], incremental[field], field)
+
+
+class ReportsApiTests(CheckoutTestCase):
+    def test_top_lists_are_labelled_with_their_period(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout((self.phone, 2), (self.case, 1))
+
+        data = admin_client().get(reverse('admin_reports_api')).json()
+        self.assertEqual(data['report_days'], metrics.REPORT_DAYS)
+        self.assertEqual([v['vendor__shop_name'] for v in data['top_vendors_month']], ['vendor1', 'vendor2'])
+        self.assertEqual([p['product_name'] for p in data['top_products_month']], ['Phone', 'Case'])
+        self.assertEqual(data['total_orders'], 1)
+
+    def test_reports_stay_within_query_budget(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.checkout((self.phone, 1), (self.case, 1))
+        with assert_max_queries('admin_reports_api'):
+            response = admin_client().get(reverse('admin_reports_api'))
+        self.assertEqual(response.json()['total_orders'], 3)
+
+
+# ── Dashboard ───────────────────────────────────────────────
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = admin_client()
+        self.url = reverse('admin_dashboard_api')
+
+    def test_stats_are_cached_until_a_tracked_change(self):
+        vendor = make_vendor()
+        agent = make_agent('agent1')
+        first = self.client.get(self.url).json()
+        self.assertEqual((first['vendors']['blocked'], first['agents']['blocked']), (0, 0))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor.is_blocked = True
+            vendor.save(update_fields=['is_blocked'])
+            agent.is_blocked = True
+            agent.save(update_fields=['is_blocked'])
+        stats = self.client.get(self.url).json()
+        self.assertEqual((stats['vendors']['blocked'], stats['agents']['blocked']), (1, 1))
+
+    def test_untracked_saves_keep_the_cache(self):
+        vendor = make_vendor()
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            vendor.shop_description = 'New description'
+            vendor.save(update_fields=['shop_description'])
+        self.assertEqual(callbacks, [])
+        self.assertIsNotNone(cache.get('admin_dashboard_stats'))
+
+
+# ── Ledgers ─────────────────────────────────────────────────
+
+class LedgerPageTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.checkout((self.phone, 1), (self.case, 1))
+        self.client.force_login(make_admin())
+        self.url = reverse('manage_ledgers')
+
+    def test_pages_continue_from_the_cursor(self):
+        with mock.patch('finance.ledgers.PAGE_SIZE', 1):
+            first = self.client.get(self.url)
+            second = self.client.get(self.url, {'cursor': first.context['next_cursor']})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.context['ledgers']) + len(second.context['ledgers']), 2)
+        self.assertNotEqual(first.context['ledgers'][0], second.context['ledgers'][0])
+        self.assertIsNone(second.context['next_cursor'])
+
+    def test_tampered_cursor_restarts_from_the_first_page(self):
+        for values in (['not-a-date', 1], ['2026-01-01T00:00:00', 'x'], [None, 1]):
+            with self.subTest(values=values):
+                response = self.client.get(self.url, {'cursor': raw_cursor(values)})
+                self.assertRedirects(response, self.url, fetch_redirect_response=False)
+
+
+# ── Delivery tracking ───────────────────────────────────────
+
+class TrackingDetailTests(TestCase):
+    def test_page_includes_points_still_in_the_buffer(self):
+        assignment = make_assignment(make_agent('agent1'))
+        self.addCleanup(tracking.tracking_buffer.flush)
+        tracking.record_ping(assignment, tracking.clean_point({'latitude': '17.385', 'longitude': '78.4867'}))
+
+        self.client.force_login(make_admin())
+        response = self.client.get(reverse('tracking_detail', kwargs={'assignment_id': assignment.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['tracking_history']), 1)
+
+
+# ── Benchmarks ──────────────────────────────────────────────
+
+class BenchmarkDatasetTests(ImageStoreTestCase):
+    def test_generated_dataset_is_consistent_and_drivable(self):
+        counts = benchmarks.generate_dataset(
+            orders=40, customers=5, vendors=2, products=6, agents=2, images_per_product=1, seed=7, log=lambda _: None,
+        )
+        self.assertEqual(benchmarks.dataset_counts(counts['tag']), {
+            'tag': counts['tag'], 'orders': 40, 'products': 6, 'ledger_entries': counts['ledger_entries'],
+        })
+        self.assertEqual(LedgerEntry.objects.count(), counts['ledger_entries'])
+        self.assertEqual(checkpoint_all(), [])  # vendor balances were rebuilt from the ledger
+        self.assertEqual(PlatformDailyMetrics.objects.aggregate(total=Sum('orders'))['total'], 40)
+
+        fixtures = benchmarks.Fixtures(seed=7)
+        self.assertEqual(fixtures.tag, counts['tag'])
+        self.assertEqual(len(fixtures.customers), 5)
+
+
+class BenchmarkSummaryTests(TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual([benchmarks.percentile(ordered, p) for p in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertIsNone(benchmarks.percentile([], 50))
+
+    def test_drive_summarizes_every_request(self):
+        class Transport:
+            def send(self, method, path, body, token):
+                return benchmarks.Sample(200 if 'page=1' not in path else 500, 0.01, queries=3, size=10)
+
+            def close(self):
+                pass
+
+        summary = benchmarks.drive(benchmarks.SCENARIOS['home_api'], None, Transport(), 20, concurrency=4, warmup=5)
+        self.assertEqual(summary['requests'], 20)
+        self.assertEqual(summary['errors'], 4)  # every fifth request asks for page 1
+        self.assertEqual(summary['queries_per_request'], {'mean': 3.0, 'p95': 3, 'max': 3})
 
-# Create your tests here.
+    def test_compare_reports_relative_change(self):
+        run = lambda p50, queries: {'scenarios': {'cart': {
+            'latency_ms': {'p50': p50, 'p95': p50, 'p99': p50}, 'queries_per_request': {'mean': queries}}}}
+        rows = benchmarks.compare(run(10, 4), run(5, 5))
+        self.assertIn(('cart', 'p50 ms', 10, 5, -50.0), rows)
+        self.assertIn(('cart', 'queries', 4, 5, 25.0), rows)
+        self.assertEqual(benchmarks.server_timing_queries('app;dur=5, db;dur=2.1;desc="7 queries"'), 7)
@@ -9,6 +9,7 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from vendor.models import VendorProfile, Product
+from vendor.catalog_cache import bump_catalog_version
 from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApprovalLog
 from deliveryAgent.models import DeliveryAgentProfile
 from finance.models import LedgerEntry
@@ -68,20 +69,10 @@ def admin_logout_view(request):
     return redirect('admin_login')
 
 @admin_required
-def admin_dashboard(request):    
-    total_vendors = VendorProfile.objects.count()
-    pending_vendors = VendorProfile.objects.filter(approval_status='pending').count()
-    approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-    rejected_vendors = VendorProfile.objects.filter(approval_status='rejected').count()
-    blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-    
-    total_products = Product.objects.count()
-    blocked_products = Product.objects.filter(is_blocked=True).count()
+def admin_dashboard(request):
+    from .dashboard import dashboard_stats
 
-    total_agents = DeliveryAgentProfile.objects.count()
-    pending_agents = DeliveryAgentProfile.objects.filter(approval_status='pending').count()
-    approved_agents = DeliveryAgentProfile.objects.filter(approval_status='approved').count()
-    blocked_agents = DeliveryAgentProfile.objects.filter(is_blocked=True).count()
+    stats = dashboard_stats()
 
     # Financial Metrics
     from django.db.models import Sum
@@ -98,17 +89,17 @@ def admin_dashboard(request):
     )['total'] or 0
 
     context = {
-        'total_vendors': total_vendors,
-        'pending_vendors': pending_vendors,
-        'approved_vendors': approved_vendors,
-        'rejected_vendors': rejected_vendors,
-        'blocked_vendors': blocked_vendors,
-        'total_products': total_products,
-        'blocked_products': blocked_products,
-        'total_agents': total_agents,
-        'pending_agents': pending_agents,
-        'approved_agents': approved_agents,
-        'blocked_agents': blocked_agents,
+        'total_vendors': stats['vendors']['total'],
+        'pending_vendors': stats['vendors']['pending'],
+        'approved_vendors': stats['vendors']['approved'],
+        'rejected_vendors': stats['vendors']['rejected'],
+        'blocked_vendors': stats['vendors']['blocked'],
+        'total_products': stats['products']['total'],
+        'blocked_products': stats['products']['blocked'],
+        'total_agents': stats['agents']['total'],
+        'pending_agents': stats['agents']['pending'],
+        'approved_agents': stats['agents']['approved'],
+        'blocked_agents': stats['agents']['blocked'],
         
         # New Financial Metrics
         'total_platform_commission': finance_stats['total_comm'] or 0,
@@ -301,6 +292,7 @@ def block_vendor(request, vendor_id):
             pass
 
         vendor.products.update(is_blocked=True, blocked_reason=f"Vendor blocked: {reason}")
+        bump_catalog_version()
 
         return redirect('vendor_detail', vendor_id=vendor.id)
 
@@ -459,39 +451,80 @@ def unblock_product(request, product_id):
 
 @admin_required
 def manage_ledgers(request):
-    vendor_id = request.GET.get('vendor')
-    entry_type = request.GET.get('type')
-    
-    ledgers = LedgerEntry.objects.all().select_related('vendor', 'order')
-    
-    if vendor_id:
-        ledgers = ledgers.filter(vendor_id=vendor_id)
-    if entry_type:
-        ledgers = ledgers.filter(entry_type=entry_type)
-        
-    ledgers = ledgers.order_by('-created_at')
-    
+    from finance.ledgers import PAGE_SIZE, parse_filters, filtered_entries
+    from user.pagination import InvalidCursor, keyset_paginate
+
+    filter_error = None
+    try:
+        filters = parse_filters(request.GET)
+    except ValueError as e:
+        filter_error = str(e)
+        filters = parse_filters({})
+
+    ledgers = filtered_entries(filters)
+
     # Aggregates
     totals = ledgers.aggregate(
         gross=Sum('gross_amount'),
         comm=Sum('commission_amount'),
         net=Sum('net_amount')
     )
-    
+
+    # Keyset pagination: each page continues after the last (created_at, id) of the previous one
+    try:
+        page, next_cursor = keyset_paginate(
+            ledgers.select_related('vendor', 'order'), request.GET.get('cursor'), PAGE_SIZE
+        )
+    except InvalidCursor:
+        return redirect('manage_ledgers')
+
+    # Current filters, for the next page and export links
+    query = request.GET.copy()
+    query.pop('cursor', None)
+
     vendors = VendorProfile.objects.filter(approval_status='approved')
-    
+
     context = {
-        'ledgers': ledgers,
+        'ledgers': page,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+        'filter_query': query.urlencode(),
         'vendors': vendors,
         'total_gross': totals['gross'] or 0,
         'total_comm': totals['comm'] or 0,
         'total_net': totals['net'] or 0,
-        'selected_vendor': vendor_id,
-        'selected_type': entry_type,
+        'selected_vendor': filters['vendor'],
+        'selected_type': filters['type'],
+        'date_from': request.GET.get('from', ''),
+        'date_to': request.GET.get('to', ''),
+        'filter_error': filter_error,
     }
-    
+
     return render(request, 'mainApp/manage_ledgers.html', context)
 
+
+@admin_required
+def export_ledgers(request):
+    """Stream the filtered ledger as CSV (?format=csv, default) or JSON Lines (?format=jsonl)."""
+    from django.http import HttpResponseBadRequest, StreamingHttpResponse
+    from finance.ledgers import EXPORT_FORMATS, parse_filters, filtered_entries, stream_export
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        filters = parse_filters(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(
+        stream_export(filtered_entries(filters), export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    filename = f"ledger-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @admin_required
 def manage_delivery_requests(request):
     status_filter = request.GET.get('status', 'pending')
@@ -693,146 +726,22 @@ def unblock_delivery_agent(request, agent_id):
 
 @admin_required
 def admin_reports(request):
-    """Live analytics and reports for the admin dashboard."""
-    from django.db.models import Count, Avg
+    """Analytics and reports for the admin dashboard, read from the daily metrics rollup."""
     from django.utils import timezone
     from datetime import timedelta
-    from user.models import Order, OrderItem
-    from deliveryAgent.models import DeliveryCommission, DeliveryAssignment
+    from .metrics import REPORT_DAYS, platform_report, top_vendors, top_products, catalog_counts
 
-    # ── Date range ──────────────────────────────────────────────────────
     today = timezone.now().date()
-    thirty_days_ago = today - timedelta(days=30)
-    seven_days_ago = today - timedelta(days=7)
-
-    # ── Order Stats ──────────────────────────────────────────────────────
-    order_qs = Order.objects.all()
-    total_orders = order_qs.count()
-    orders_today = order_qs.filter(created_at__date=today).count()
-    orders_this_week = order_qs.filter(created_at__date__gte=seven_days_ago).count()
-    orders_this_month = order_qs.filter(created_at__date__gte=thirty_days_ago).count()
-
-    # Status breakdown
-    order_status_breakdown = list(
-        order_qs.values('status')
-                .annotate(count=Count('id'))
-                .order_by('-count')
-    )
-
-    # Payment status breakdown
-    payment_status_breakdown = list(
-        order_qs.values('payment_status')
-                .annotate(count=Count('id'))
-                .order_by('-count')
-    )
-
-    # ── Revenue (from completed/delivered orders) ─────────────────────
-    completed_orders = order_qs.filter(payment_status='completed')
-    total_revenue = completed_orders.aggregate(total=Sum('total_amount'))['total'] or 0
-    avg_order_value = completed_orders.aggregate(avg=Avg('total_amount'))['avg'] or 0
-
-    # Revenue today / this week / this month
-    revenue_today = completed_orders.filter(created_at__date=today).aggregate(t=Sum('total_amount'))['t'] or 0
-    revenue_week = completed_orders.filter(created_at__date__gte=seven_days_ago).aggregate(t=Sum('total_amount'))['t'] or 0
-    revenue_month = completed_orders.filter(created_at__date__gte=thirty_days_ago).aggregate(t=Sum('total_amount'))['t'] or 0
-
-    # ── Daily Revenue Trend (last 30 days) ───────────────────────────
-    from django.db.models.functions import TruncDate
-    daily_revenue = list(
-        completed_orders.filter(created_at__date__gte=thirty_days_ago)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(revenue=Sum('total_amount'), orders=Count('id'))
-        .order_by('day')
-    )
-
-    # ── Finance ──────────────────────────────────────────────────────
-    finance_agg = LedgerEntry.objects.aggregate(
-        total_gross=Sum('gross_amount'),
-        total_commission=Sum('commission_amount'),
-        total_net=Sum('net_amount'),
-    )
-    total_platform_commission = finance_agg['total_commission'] or 0
-
-    # ── Top Vendors by Net Earnings ──────────────────────────────────
-    top_vendors = list(
-        LedgerEntry.objects.filter(entry_type='REVENUE')
-        .values('vendor__shop_name', 'vendor__id')
-        .annotate(
-            total_gross=Sum('gross_amount'),
-            total_commission=Sum('commission_amount'),
-            total_net=Sum('net_amount'),
-            order_count=Count('order', distinct=True)
-        )
-        .order_by('-total_net')[:10]
-    )
-
-    # ── Most Ordered Products ─────────────────────────────────────────
-    top_products = list(
-        OrderItem.objects.values('product_name')
-        .annotate(
-            total_qty=Sum('quantity'),
-            total_revenue=Sum('subtotal'),
-            order_count=Count('order', distinct=True),
-        )
-        .order_by('-total_qty')[:10]
-    )
-
-    # ── Delivery Agent Performance ────────────────────────────────────
-    total_commissions_paid = DeliveryCommission.objects.filter(status='paid').aggregate(t=Sum('total_commission'))['t'] or 0
-    total_commissions_pending = DeliveryCommission.objects.filter(status__in=['pending', 'approved']).aggregate(t=Sum('total_commission'))['t'] or 0
-    total_deliveries_done = DeliveryAssignment.objects.filter(status='delivered').count()
-    total_deliveries_failed = DeliveryAssignment.objects.filter(status='failed').count()
-
-    # ── Vendor Stats ──────────────────────────────────────────────────
-    total_vendors = VendorProfile.objects.count()
-    approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-    blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-
-    # ── Product Stats ─────────────────────────────────────────────────
-    total_products = Product.objects.count()
-    active_products = Product.objects.filter(is_blocked=False).count()
-    blocked_products = Product.objects.filter(is_blocked=True).count()
+    since = today - timedelta(days=REPORT_DAYS)
 
     context = {
-        # Order stats
-        'total_orders': total_orders,
-        'orders_today': orders_today,
-        'orders_this_week': orders_this_week,
-        'orders_this_month': orders_this_month,
-        'order_status_breakdown': order_status_breakdown,
-        'payment_status_breakdown': payment_status_breakdown,
-
-        # Revenue
-        'total_revenue': total_revenue,
-        'avg_order_value': avg_order_value,
-        'revenue_today': revenue_today,
-        'revenue_week': revenue_week,
-        'revenue_month': revenue_month,
-        'daily_revenue': daily_revenue,
-
-        # Finance
-        'total_platform_commission': total_platform_commission,
-        'total_gross': finance_agg['total_gross'] or 0,
-        'total_net': finance_agg['total_net'] or 0,
+        # Orders, revenue, finance and delivery totals
+        **platform_report(today),
 
         # Vendors & products
-        'total_vendors': total_vendors,
-        'approved_vendors': approved_vendors,
-        'blocked_vendors': blocked_vendors,
-        'total_products': total_products,
-        'active_products': active_products,
-        'blocked_products': blocked_products,
-        'top_vendors': top_vendors,
-
-        # Products
-        'top_products': top_products,
-
-        # Delivery
-        'total_commissions_paid': total_commissions_paid,
-        'total_commissions_pending': total_commissions_pending,
-        'total_deliveries_done': total_deliveries_done,
-        'total_deliveries_failed': total_deliveries_failed,
+        **catalog_counts(),
+        'top_vendors': top_vendors(since),
+        'top_products': top_products(since),
 
         # Meta
         'report_date': today,
@@ -857,9 +766,11 @@ def manage_tracking(request):
 
 @admin_required
 def tracking_detail(request, assignment_id):
+    from deliveryAgent import tracking
     from deliveryAgent.models import DeliveryAssignment, DeliveryTracking
     
     assignment = get_object_or_404(DeliveryAssignment.objects.select_related('agent', 'agent__user', 'order', 'order__user'), id=assignment_id)
+    tracking.tracking_buffer.flush()
     tracking_history = DeliveryTracking.objects.filter(delivery_assignment=assignment).order_by('-tracked_at')
     
     context = {
@@ -0,0 +1,116 @@
+"""
+user/checkout.py
+Batched write path for placing an order.
+
+All product rows of an order are locked with a single SELECT ... FOR UPDATE
+in ascending id order (so two concurrent checkouts always lock in the same
+order and cannot deadlock), order items are inserted with one bulk INSERT
+carrying their commission snapshot, and stock is decremented with a single
+CASE-based UPDATE. Must be called inside transaction.atomic().
+"""
+import logging
+import time
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+
+from finance.services import FinanceService
+from vendor.catalog_cache import bump_catalog_version
+from vendor.models import Product
+
+from .models import OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+def lock_products(product_ids):
+    """Lock and return {id: Product} for `product_ids`, acquiring row locks in id order."""
+    ids = sorted({int(pid) for pid in product_ids if pid})
+    if not ids:
+        return {}
+    products = (
+        Product.objects.select_for_update(of=('self',))
+        .select_related('vendor')
+        .filter(id__in=ids)
+        .order_by('id')
+    )
+    return {product.id: product for product in products}
+
+
+def check_stock(lines):
+    """
+    Raise ValueError if any locked product has less stock than the total
+    quantity requested for it across `lines`.
+    """
+    requested = OrderedDict()
+    for line in lines:
+        if line['product']:
+            requested[line['product'].id] = requested.get(line['product'].id, 0) + line['quantity']
+
+    products = {line['product'].id: line['product'] for line in lines if line['product']}
+    for product_id, quantity in requested.items():
+        product = products[product_id]
+        if product.quantity < quantity:
+            raise ValueError(
+                f"Insufficient stock for '{product.name}'. "
+                f"Available: {product.quantity}, Requested: {quantity}"
+            )
+    return requested
+
+
+def build_order_items(order, lines):
+    """Unsaved OrderItems for `lines`, with the commission snapshot already set."""
+    items = []
+    for line in lines:
+        product = line['product']
+        item = OrderItem(
+            order=order,
+            product=product,
+            vendor=product.vendor if product else line.get('vendor'),
+            product_name=line['name'],
+            quantity=line['quantity'],
+            product_price=line['price'],
+            subtotal=line['price'] * line['quantity'],
+        )
+        if product and item.vendor_id:
+            # Commission rules are resolved in memory (finance/commission_rules.py)
+            FinanceService.snapshot_commission(item)
+        items.append(item)
+    return items
+
+
+def decrement_stock(requested, products):
+    """Subtract {product_id: quantity} from the locked `products` ({id: Product}) in one UPDATE."""
+    if not requested:
+        return
+    Product.objects.filter(id__in=list(requested)).update(
+        quantity=Case(
+            *[When(id=product_id, then=F('quantity') - quantity) for product_id, quantity in requested.items()],
+            default=F('quantity'),
+            output_field=IntegerField(),
+        )
+    )
+    # Cached catalog responses are served with current stock (vendor/catalog_cache.py),
+    # so only a sell-out, which takes products out of the deal of the day, retires them
+    if any(products[product_id].quantity <= quantity for product_id, quantity in requested.items()):
+        bump_catalog_version()
+
+
+def place_order_items(order, lines):
+    """
+    Create the order items of `order` and take their stock. `lines` are dicts
+    with product (a row locked by lock_products, or None), name, price and
+    quantity. Returns the created OrderItems.
+    """
+    requested = check_stock(lines)
+    items = OrderItem.objects.bulk_create(build_order_items(order, lines))
+    decrement_stock(requested, {line['product'].id: line['product'] for line in lines if line['product']})
+    return items
+
+
+def log_lock_hold_time(order, locked_at):
+    """Log how long the order's product rows stay locked, once the transaction commits."""
+    transaction.on_commit(lambda: logger.info(
+        f"Checkout {order.order_number}: product locks held {(time.perf_counter() - locked_at) * 1000:.1f} ms"
+    ))
@@ -0,0 +1,271 @@
+"""
+user/live.py
+Live order tracking over Server-Sent Events.
+
+Instead of every watching customer re-running the order_tracking query on
+each poll, state changes are pushed:
+
+- Publishers (Order / DeliveryAssignment post_save in the signals modules,
+  and agent location pings in deliveryAgent/tracking.py) call `publish()`.
+  After the transaction commits, this writes the new state of one section
+  ('order', 'assignment' or 'location') to the cache under a per-order key
+  and wakes this process's subscribers through the in-process `broker`.
+- Each SSE stream (`event_stream()`) waits on the broker and, when woken,
+  reads only the cache keys of its order. The ORM is queried once, for the
+  initial snapshot when the stream opens.
+- Changes published by other processes (the other web workers, the outbox
+  worker running auto-assignment) reach a stream through the periodic check
+  every POLL_SECONDS: delivery is immediate in-process and at most
+  POLL_SECONDS late across processes. With the Redis cache
+  (settings.LIVE_SHARED_CACHE) the check reads the cache keys. With the
+  per-process local-memory cache, which other processes never write, it
+  re-reads the snapshot from the database instead (two queries per stream
+  every POLL_SECONDS) and sends the sections that changed.
+- Streams opened from a browser authenticate with a stream token
+  (`stream_token()`): signed, bound to one user and order, and valid for
+  STREAM_TOKEN_SECONDS. It goes in the query string because EventSource
+  cannot set headers, so the access JWT never has to.
+
+Streams are long-lived, so the endpoint must be served through
+ShopSphere.asgi by an ASGI server (render.yaml runs gunicorn with uvicorn
+workers). Under WSGI each stream would hold a worker thread for its whole
+lifetime, so the endpoint answers 501 there instead.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('order', 'assignment', 'location')
+LIVE_TTL = 60 * 60 * 24  # seconds a section's latest state is kept in the cache
+POLL_SECONDS = 15  # cross-process catch-up interval, doubles as the keep-alive
+MAX_STREAM_SECONDS = 60 * 30  # clients reconnect (EventSource does so automatically)
+RETRY_MILLISECONDS = 3000
+STREAM_TOKEN_SECONDS = 60 * 5  # covers EventSource's automatic reconnects after a network blip
+STREAM_TOKEN_SALT = 'user.live.stream_token'
+FINAL_ORDER_STATUSES = {'delivered', 'cancelled', 'returned'}
+
+# Customer-facing progress steps (see views.order_tracking)
+ORDER_STEP_INDEX = {'pending': 0, 'confirmed': 1, 'shipping': 2, 'out_for_delivery': 3, 'delivered': 4}
+
+
+def section_key(order_id, section):
+    return f'live_order:{order_id}:{section}'
+
+
+# ── Broker ──────────────────────────────────────────────────
+
+class Subscription:
+    def __init__(self, order_id):
+        self.order_id = order_id
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self):
+        # Called from whichever thread published; asyncio.Event is not thread-safe
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout):
+        """True when woken by a publish, False on timeout."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+
+class Broker:
+    """In-process pub/sub of order ids to the streams watching them."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, order_id):
+        subscription = Subscription(order_id)
+        with self._lock:
+            self._subscribers[order_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            watchers = self._subscribers.get(subscription.order_id)
+            if watchers is not None:
+                watchers.discard(subscription)
+                if not watchers:
+                    del self._subscribers[subscription.order_id]
+
+    def subscriber_count(self, order_id=None):
+        with self._lock:
+            if order_id is not None:
+                return len(self._subscribers.get(order_id, ()))
+            return sum(len(watchers) for watchers in self._subscribers.values())
+
+    def notify(self, order_id):
+        with self._lock:
+            watchers = list(self._subscribers.get(order_id, ()))
+        for subscription in watchers:
+            try:
+                subscription.wake()
+            except RuntimeError:  # the stream's event loop has already closed
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+# ── Publishing ──────────────────────────────────────────────
+
+def _store(order_id, section, data):
+    # time_ns() orders updates across processes closely enough for a UI feed
+    cache.set(section_key(order_id, section), {'seq': time.time_ns(), 'data': data}, LIVE_TTL)
+    broker.notify(order_id)
+
+
+def publish(order_id, section, data):
+    """Push the new state of one section of an order's live view once the current transaction commits."""
+    if section not in SECTIONS:
+        raise ValueError(f"Unknown live section: {section}")
+
+    def push():
+        try:
+            _store(order_id, section, data)
+        except Exception as e:  # live updates must never break the write that triggered them
+            logger.error(f"Live update for order {order_id} ({section}) failed: {e}")
+
+    transaction.on_commit(push)
+
+
+def order_state(order):
+    return {
+        'order_number': order.order_number,
+        'status': order.status,
+        'payment_status': order.payment_status,
+        'current_step_index': ORDER_STEP_INDEX.get(order.status, 0),
+    }
+
+
+def assignment_state(assignment):
+    return {
+        'id': assignment.id,
+        'assignment_type': assignment.assignment_type,
+        'status': assignment.status,
+        'estimated_delivery': str(assignment.estimated_delivery_date),
+        'pickup_time': assignment.pickup_time,
+        'delivery_time': assignment.delivery_time,
+        'attempts_count': assignment.attempts_count,
+        'failure_reason': assignment.failure_reason,
+    }
+
+
+def initial_state(order):
+    """Snapshot sent when a stream opens: the order, its latest assignment and the agent's last location."""
+    assignment = order.delivery_assignments.order_by('-assigned_at').first()
+    return {
+        'order': order_state(order),
+        'assignment': assignment_state(assignment) if assignment else None,
+        'location': (assignment.current_location or None) if assignment else None,
+    }
+
+
+def current_state(order_id):
+    """initial_state() of the order as it is stored now."""
+    from .models import Order
+
+    return initial_state(Order.objects.get(pk=order_id))
+
+
+# ── Stream tokens ───────────────────────────────────────────
+
+def stream_token(user, order_number):
+    """A short-lived token letting `user` open the live stream of one order, and nothing else."""
+    return signing.dumps({'user': user.pk, 'order': order_number}, salt=STREAM_TOKEN_SALT)
+
+
+def stream_token_user_id(token, order_number):
+    """The user id a stream token was issued to, or None if it is invalid, expired or for another order."""
+    try:
+        claims = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=STREAM_TOKEN_SECONDS)
+    except signing.BadSignature:  # includes SignatureExpired
+        return None
+    return claims.get('user') if claims.get('order') == order_number else None
+
+
+# ── Streaming ───────────────────────────────────────────────
+
+def sse_message(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder))
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _changes(order_id, seen):
+    """Sections whose cached state is newer than `seen` (updated in place)."""
+    keys = {section_key(order_id, section): section for section in SECTIONS}
+    stored = await cache.aget_many(list(keys))
+    changes = []
+    for key, entry in stored.items():
+        section = keys[key]
+        if entry['seq'] > seen.get(section, 0):
+            seen[section] = entry['seq']
+            changes.append((section, entry))
+    return sorted(changes, key=lambda change: change[1]['seq'])
+
+
+def _encoded(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+
+
+async def event_stream(order_id, load_snapshot, max_seconds=MAX_STREAM_SECONDS):
+    """
+    SSE events for one order: a 'snapshot' (from the `load_snapshot`
+    coroutine function, which must read the current state: without a shared
+    cache it is also polled for changes), then an 'order' / 'assignment' / 'location' event
+    for each change, with keep-alive comments in between. Ends when the
+    order reaches a final status or after `max_seconds`.
+    """
+    subscription = broker.subscribe(order_id)
+    try:
+        # Skip what was cached before the snapshot; a change racing with it is sent again, which is harmless
+        seen = {}
+        await _changes(order_id, seen)
+        snapshot = await load_snapshot()
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        yield sse_message('snapshot', snapshot)
+
+        deadline = time.monotonic() + max_seconds
+        status = snapshot['order']['status']
+        sent = {section: _encoded(snapshot[section]) for section in SECTIONS}
+        while status not in FINAL_ORDER_STATUSES and time.monotonic() < deadline:
+            woken = await subscription.wait(min(POLL_SECONDS, max(deadline - time.monotonic(), 0)))
+            changes = [(section, entry['data'], entry['seq']) for section, entry in await _changes(order_id, seen)]
+            if not woken and not settings.LIVE_SHARED_CACHE:
+                # Other processes' publishes never reach this process's cache: compare with the database
+                current = await load_snapshot()
+                changed = {section for section, _, _ in changes}
+                changes += [
+                    (section, current[section], None) for section in SECTIONS
+                    if section not in changed and _encoded(current[section]) != sent[section]
+                ]
+            for section, data, seq in changes:
+                if section == 'order':
+                    status = data['status']
+                sent[section] = _encoded(data)
+                yield sse_message(section, data, seq)
+            if not changes:
+                yield ': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,127 @@
+"""
+user/loaders.py
+Request-scoped batch loaders for the order serializers.
+
+Per-object lookups in SerializerMethodFields (the customer's review of each
+item, each product's first image, each order's return, its delivery
+assignment) used to cost one query per row. A BatchLoader collects the keys
+of a whole page first (`OrderListSerializer` primes them for every order
+it is about to render) and resolves them with one query per relation the
+first time any of them is needed. Loaders live on the request, so every
+serializer rendering the same response shares their results.
+"""
+
+
+class BatchLoader:
+    """
+    DataLoader-style loader over `batch_fn(keys) -> {key: value}`. Keys are
+    queued with `prime()`; `load()` of a key not resolved yet fetches it
+    together with everything queued in a single call. Missing keys load as None.
+    """
+
+    def __init__(self, batch_fn):
+        self.batch_fn = batch_fn
+        self._queued = set()
+        self._results = {}
+
+    def prime(self, keys):
+        self._queued.update(key for key in keys if key is not None and key not in self._results)
+
+    def load(self, key):
+        if key is None:
+            return None
+        if key not in self._results:
+            keys, self._queued = self._queued | {key}, set()
+            found = self.batch_fn(keys)
+            for each in keys:
+                self._results[each] = found.get(each)
+        return self._results[key]
+
+
+# ── Batch functions ─────────────────────────────────────────
+
+def first_image_ids(product_ids):
+    """{product id: id of its first image} (what product.images.first() returns)."""
+    from vendor.models import ProductImage
+
+    first = {}
+    rows = ProductImage.objects.filter(product_id__in=product_ids).order_by('product_id', 'pk')
+    for product_id, image_id in rows.values_list('product_id', 'id'):
+        first.setdefault(product_id, image_id)
+    return first
+
+
+def user_reviews(user, product_ids):
+    """{product id: the user's Review of it}."""
+    from .models import Review
+
+    return {review.Product_id: review for review in Review.objects.filter(user=user, Product_id__in=product_ids)}
+
+
+def latest_returns(order_ids):
+    """{order id: its most recent OrderReturn} (what order.returns.first() returns)."""
+    from .models import OrderReturn
+
+    latest = {}
+    rows = (
+        OrderReturn.objects.filter(order_id__in=order_ids)
+        .only('order_id', 'status', 'reason', 'created_at')
+        .order_by('order_id', '-created_at', '-id')
+    )
+    for order_return in rows:
+        latest.setdefault(order_return.order_id, order_return)
+    return latest
+
+
+def latest_delivery_assignments(order_ids):
+    """{order id: its most recent delivery (not return) DeliveryAssignment, with agent and user}."""
+    from deliveryAgent.models import DeliveryAssignment
+
+    latest = {}
+    rows = (
+        DeliveryAssignment.objects.filter(order_id__in=order_ids, assignment_type='delivery')
+        .select_related('agent__user')
+        .order_by('order_id', '-assigned_at', '-id')
+    )
+    for assignment in rows:
+        latest.setdefault(assignment.order_id, assignment)
+    return latest
+
+
+# ── Request-scoped registry ─────────────────────────────────
+
+class OrderLoaders:
+    def __init__(self, user=None):
+        self.first_image = BatchLoader(first_image_ids)
+        self.order_return = BatchLoader(latest_returns)
+        self.delivery_assignment = BatchLoader(latest_delivery_assignments)
+        self.review = None
+        if user is not None and user.is_authenticated:
+            self.review = BatchLoader(lambda product_ids: user_reviews(user, product_ids))
+
+    def prime_orders(self, orders):
+        """Queue the keys of a page of orders. Items are only read when they were prefetched."""
+        order_ids = [order.id for order in orders]
+        self.order_return.prime(order_ids)
+        self.delivery_assignment.prime(order_ids)
+
+        product_ids = [
+            item.product_id
+            for order in orders
+            if 'items' in getattr(order, '_prefetched_objects_cache', {})
+            for item in order.items.all()
+        ]
+        self.first_image.prime(product_ids)
+        if self.review is not None:
+            self.review.prime(product_ids)
+
+
+def order_loaders(context):
+    """The OrderLoaders of the serializer context's request (or of the context itself without one)."""
+    request = context.get('request')
+    if request is None:
+        return context.setdefault('order_loaders', OrderLoaders())
+    loaders = getattr(request, '_order_loaders', None)
+    if loaders is None:
+        loaders = request._order_loaders = OrderLoaders(getattr(request, 'user', None))
+    return loaders
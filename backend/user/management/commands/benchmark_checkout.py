@@ -0,0 +1,100 @@
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from finance.services import FinanceService
+from user.checkout import lock_products, place_order_items
+from user.models import AuthUser, Order, OrderItem
+from vendor.models import Product, VendorProfile
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Measure product lock hold time and query count per order for the batched checkout '
+            'path versus the previous per-line path. All data is created in a rolled-back transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 5, 20],
+                            help='Cart sizes (order lines) to benchmark')
+        parser.add_argument('--orders', type=int, default=20,
+                            help='Orders placed per cart size and strategy')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['lines'], options['orders'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def run(self, line_counts, orders):
+        tag = uuid.uuid4().hex[:8]
+        user = AuthUser.objects.create_user(username=f'bench{tag}', email=f'bench-{tag}@example.com', password=tag)
+        vendor_user = AuthUser.objects.create_user(username=f'vendor{tag}', email=f'vendor-{tag}@example.com', password=tag)
+        vendor = VendorProfile.objects.create(
+            user=vendor_user, shop_name='Benchmark', shop_description='-', address='-',
+            business_type='retail', approval_status='approved'
+        )
+        products = Product.objects.bulk_create([
+            Product(vendor=vendor, name=f'Bench product {i}', description='-',
+                    category=Product.CATEGORY_CHOICES[i % 5][0], price=Decimal('99.00'), quantity=10 ** 6)
+            for i in range(max(line_counts))
+        ])
+
+        self.stdout.write(f"{'lines':>5}  {'strategy':<9} {'lock ms p50':>11} {'lock ms max':>11} {'queries':>8}")
+        for count in line_counts:
+            lines = [{'product_id': p.id, 'quantity': 2} for p in products[:count]]
+            for name, strategy in (('per-line', self.per_line), ('batched', self.batched)):
+                timings, queries = [], 0
+                for _ in range(orders):
+                    with transaction.atomic():
+                        order = Order.objects.create(
+                            user=user, order_number=f'BENCH-{uuid.uuid4().hex[:10]}',
+                            payment_method='cod', status='confirmed'
+                        )
+                        with CaptureQueriesContext(connection) as captured:
+                            started = time.perf_counter()
+                            strategy(order, lines)
+                            # Row locks are held until here (the commit point)
+                            timings.append((time.perf_counter() - started) * 1000)
+                        queries = len(captured.captured_queries)
+                self.stdout.write(
+                    f'{count:>5}  {name:<9} {statistics.median(timings):>11.2f} {max(timings):>11.2f} {queries:>8}'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (all data rolled back).'))
+
+    def per_line(self, order, lines):
+        """The previous write path: one lock, insert and update per line, then per-item commission saves."""
+        for line in lines:
+            product = Product.objects.select_for_update().get(id=line['product_id'])
+            OrderItem.objects.create(
+                order=order, product=product, vendor=product.vendor, product_name=product.name,
+                quantity=line['quantity'], product_price=product.price,
+                subtotal=product.price * line['quantity'],
+            )
+            Product.objects.filter(pk=product.pk).update(quantity=F('quantity') - line['quantity'])
+        FinanceService.record_order_financials(order)
+
+    def batched(self, order, lines):
+        products = lock_products(line['product_id'] for line in lines)
+        order_lines = [
+            {
+                'product': products[line['product_id']],
+                'name': products[line['product_id']].name,
+                'price': products[line['product_id']].price,
+                'quantity': line['quantity'],
+            }
+            for line in lines
+        ]
+        items = place_order_items(order, order_lines)
+        FinanceService.record_order_financials(order, items)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from user.outbox import process_due_messages
+
+
+class Command(BaseCommand):
+    help = 'Run queued side effects (emails, delivery auto-assignment) from the outbox table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Messages claimed per poll')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the due messages once and exit (e.g. from cron)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_ok = total_failed = 0
+
+        while True:
+            succeeded, failed = process_due_messages(batch_size)
+            total_ok += succeeded
+            total_failed += failed
+            if succeeded or failed:
+                self.stdout.write(f'Processed {succeeded + failed} messages ({failed} failed)')
+
+            if succeeded + failed < batch_size:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully processed {total_ok} outbox messages ({total_failed} failed).'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from user.risk import rebuild_risk_profiles
+
+
+class Command(BaseCommand):
+    help = 'Recompute every CustomerRiskProfile (order, cancellation, return and failed payment counters) from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of profiles inserted per batch')
+
+    def handle(self, *args, **options):
+        written = rebuild_risk_profiles(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {written} customer risk profiles.'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-18 08:29
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def compute_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('vendor', 'Product')
+    Review = apps.get_model('user', 'Review')
+
+    totals = Review.objects.values('Product_id').annotate(rating_total=Sum('rating'), review_count=Count('id'))
+    products = []
+    for row in totals:
+        average = (Decimal(row['rating_total']) / row['review_count']).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        products.append(Product(
+            id=row['Product_id'],
+            rating_sum=row['rating_total'],
+            total_reviews=row['review_count'],
+            average_rating=average,
+        ))
+    Product.objects.filter(reviews__isnull=True).update(rating_sum=0, total_reviews=0, average_rating=0)
+    Product.objects.bulk_update(products, ['rating_sum', 'total_reviews', 'average_rating'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_initial'),
+        ('vendor', '0005_product_rating_sum'),
+    ]
+
+    operations = [
+        migrations.RunPython(compute_rating_aggregates, migrations.RunPython.noop),
+    ]
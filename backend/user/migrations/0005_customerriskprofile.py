@@ -0,0 +1,65 @@
+# Generated by Django 5.1 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def risk_score(total_orders, cancelled_orders, return_requests, failed_payments):
+    # Copy of user.risk.risk_score as of this migration; later changes to the
+    # live formula must not change what this migration computes
+    cancel_rate = (cancelled_orders / total_orders) if total_orders else 0
+    return_rate = (return_requests / total_orders) if total_orders else 0
+    payment_score = min(failed_payments * 10, 30)
+    return min(round(cancel_rate * 40) + round(return_rate * 30) + payment_score, 100)
+
+
+def compute_risk_profiles(apps, schema_editor):
+    Order = apps.get_model('user', 'Order')
+    OrderReturn = apps.get_model('user', 'OrderReturn')
+    CustomerRiskProfile = apps.get_model('user', 'CustomerRiskProfile')
+
+    counters = {}
+    orders = Order.objects.values('user_id').annotate(
+        total=Count('id'),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+        failed=Count('id', filter=Q(payment_status='failed')),
+    )
+    for row in orders:
+        counters[row['user_id']] = {
+            'total_orders': row['total'], 'cancelled_orders': row['cancelled'],
+            'return_requests': 0, 'failed_payments': row['failed'],
+        }
+    for row in OrderReturn.objects.values('user_id').annotate(returns=Count('id')):
+        counters.setdefault(row['user_id'], {
+            'total_orders': 0, 'cancelled_orders': 0, 'return_requests': 0, 'failed_payments': 0,
+        })['return_requests'] = row['returns']
+
+    CustomerRiskProfile.objects.bulk_create([
+        CustomerRiskProfile(user_id=user_id, risk_score=risk_score(**values), **values)
+        for user_id, values in counters.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerRiskProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='risk_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('cancelled_orders', models.PositiveIntegerField(default=0)),
+                ('return_requests', models.PositiveIntegerField(default=0)),
+                ('failed_payments', models.PositiveIntegerField(default=0)),
+                ('risk_score', models.PositiveSmallIntegerField(db_index=True, default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(compute_risk_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0004_tracking_device_timestamps'),
+        ('user', '0005_customerriskprofile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='user_order_user_id_b0a53e_idx'),
+        ),
+    ]
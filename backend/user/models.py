@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from django.conf import settings
+from django.utils import timezone
 
 class AuthUser(AbstractUser):
     """Extended user model with role-based access"""
@@ -186,6 +187,7 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['user', 'status']),
             models.Index(fields=['order_number']),
+            models.Index(fields=['user', '-created_at']),
         ]
 
     def __str__(self):
@@ -709,5 +711,61 @@ class Review(models.Model):
         unique_together = ('Product', 'user')
         ordering = ['-created_at']
 
+    def save(self, *args, **kwargs):
+        # Keep the review row and the product's rating aggregates (user.signals) in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Review for {self.Product.name} by {self.reviewer_name or (self.user.username if self.user else 'Anonymous')}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Side effect (email, delivery assignment...) recorded in the same transaction
+    as the change that caused it and executed after commit by the
+    `process_outbox` worker (see user/outbox.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id} ({self.status})"
+
+
+class CustomerRiskProfile(models.Model):
+    """
+    Order history counters and the derived 0-100 risk score of an account,
+    kept up to date on order status / payment changes and return requests
+    (see user/risk.py) so admins can sort and filter users by risk in SQL.
+    """
+    user = models.OneToOneField(AuthUser, on_delete=models.CASCADE, primary_key=True, related_name='risk_profile')
+    total_orders = models.PositiveIntegerField(default=0)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+    return_requests = models.PositiveIntegerField(default=0)
+    failed_payments = models.PositiveIntegerField(default=0)
+    risk_score = models.PositiveSmallIntegerField(default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Risk {self.risk_score} - {self.user.email}"
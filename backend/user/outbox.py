@@ -0,0 +1,130 @@
+"""
+user/outbox.py
+Transactional outbox for side effects of request handling.
+
+`enqueue()` only inserts an OutboxMessage row, inside the caller's
+transaction: if the checkout rolls back, the email / assignment is never
+sent; if it commits, the message is guaranteed to be picked up. The
+`process_outbox` management command polls the table, runs the handler
+registered for each topic and retries failures with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 60 * 60
+# A message claimed longer ago than this is assumed to belong to a dead worker
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue(topic, **payload):
+    """Record a side effect to run after the current transaction commits."""
+    from .models import OutboxMessage
+
+    if topic not in HANDLERS:
+        raise ValueError(f"Unknown outbox topic: {topic}")
+    return OutboxMessage.objects.create(topic=topic, payload=payload)
+
+
+# ── Handlers ────────────────────────────────────────────────
+
+def handle_send_email(payload):
+    from django.core.mail import send_mail
+
+    send_mail(
+        subject=payload['subject'],
+        message=payload['message'],
+        from_email=settings.EMAIL_HOST_USER,
+        recipient_list=payload['recipient_list'],
+    )
+
+
+def handle_auto_assign_order(payload):
+    from deliveryAgent.services import auto_assign_order
+    from .models import Order
+
+    order = Order.objects.select_related('delivery_address').filter(id=payload['order_id']).first()
+    if order is None:
+        logger.warning(f"Outbox: order {payload['order_id']} no longer exists, skipping assignment")
+        return
+    auto_assign_order(order)
+
+
+HANDLERS = {
+    'send_email': handle_send_email,
+    'auto_assign_order': handle_auto_assign_order,
+}
+
+
+# ── Worker side ─────────────────────────────────────────────
+
+def backoff(attempts):
+    return timedelta(seconds=min(BASE_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to `batch_size` due messages as processing and return them.
+    SKIP LOCKED lets several workers poll the table without blocking each other.
+    """
+    from .models import OutboxMessage
+
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', available_at__lte=now) |
+                Q(status='processing', claimed_at__lt=now - CLAIM_TIMEOUT)
+            )
+            .order_by('id')[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(id__in=[m.id for m in messages]).update(status='processing', claimed_at=now)
+    return messages
+
+
+def process_message(message):
+    """Run one message's handler and record the outcome. Returns True on success."""
+    handler = HANDLERS.get(message.topic)
+    message.attempts += 1
+    try:
+        if handler is None:
+            raise ValueError(f"No handler for topic '{message.topic}'")
+        with transaction.atomic():
+            handler(message.payload)
+            message.status = 'done'
+            message.processed_at = timezone.now()
+            message.last_error = ''
+            message.save(update_fields=['status', 'attempts', 'processed_at', 'last_error'])
+        return True
+    except Exception as e:
+        message.last_error = f"{type(e).__name__}: {e}"
+        if message.attempts >= MAX_ATTEMPTS:
+            message.status = 'failed'
+            logger.error(f"Outbox message {message.id} ({message.topic}) failed permanently: {e}")
+        else:
+            message.status = 'pending'
+            message.available_at = timezone.now() + backoff(message.attempts)
+            logger.warning(f"Outbox message {message.id} ({message.topic}) attempt {message.attempts} failed: {e}")
+        message.save(update_fields=['status', 'attempts', 'available_at', 'last_error'])
+        return False
+
+
+def process_due_messages(batch_size=50):
+    """Claim and process one batch. Returns (succeeded, failed) counts."""
+    succeeded = failed = 0
+    for message in claim_batch(batch_size):
+        if process_message(message):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
@@ -0,0 +1,111 @@
+"""
+user/pagination.py
+Keyset (cursor) pagination for function-based list views.
+
+Instead of COUNT(*) + OFFSET, each page continues strictly after the last row
+of the previous one: `WHERE (key1, id) < (last_key1, last_id)` on the query's
+own ordering. Every page costs the same as the first, whatever its depth.
+The cursor handed to clients is an opaque base64 token of those last values.
+"""
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    values = [
+        str(v) if isinstance(v, Decimal) else v.isoformat() if isinstance(v, date) else v
+        for v in values
+    ]
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """
+    Values of `cursor`, converted by the model `fields` they belong to.
+    Raises InvalidCursor for anything that is not a cursor those fields produced.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor('Invalid cursor')
+
+    converted = []
+    for field, value in zip(fields, values):
+        if value is None:
+            raise InvalidCursor('Invalid cursor')
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)  # e.g. integers beyond the column's range
+        except (ValueError, TypeError, ValidationError) as e:
+            raise InvalidCursor('Invalid cursor') from e
+        converted.append(value)
+    return converted
+
+
+def _field(queryset, name):
+    """Model field (or annotation output field) behind an ordering name such as 'vendor__created_at'."""
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    model = queryset.model
+    *relations, last = name.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.pk if last == 'pk' else model._meta.get_field(last)
+
+
+def _ordering(queryset):
+    """Ordering fields of `queryset` as (name, descending) pairs, ending with the primary key."""
+    ordering = []
+    for field in queryset.query.order_by or ['-pk']:
+        if not isinstance(field, str):
+            raise ValueError('Keyset pagination needs plain field orderings')
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        ordering.append((name, descending))
+    # A unique trailing key makes the position unambiguous
+    if ordering[-1][0] not in ('id', 'pk'):
+        ordering.append(('id', ordering[-1][1]))
+    return ordering
+
+
+def _after(ordering, values):
+    """Q selecting the rows that come after `values` in `ordering`."""
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(ordering, values):
+        lookup = 'lt' if descending else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_paginate(queryset, cursor, page_size):
+    """
+    Return (rows, next_cursor) for the page after `cursor` (None or '' for the
+    first page). `next_cursor` is None on the last page. Raises InvalidCursor.
+    """
+    ordering = _ordering(queryset)
+    if cursor:
+        fields = [_field(queryset, name) for name, _ in ordering]
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, fields)))
+
+    # One extra row tells whether another page exists without counting
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([getattr(rows[-1], name) for name, _ in ordering])
+    return rows, next_cursor
@@ -0,0 +1,112 @@
+"""
+user/ratings.py
+Incremental product rating aggregates.
+
+Product.rating_sum / total_reviews / average_rating are updated in place with
+a single UPDATE whenever a Review is created, edited or deleted (see
+user.signals), so catalog listings can read them straight from the product row
+instead of aggregating the review table. `reconcile_product_ratings` recomputes
+them from scratch to repair any drift.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Case, Count, DecimalField, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from vendor.catalog_cache import bump_catalog_version
+from vendor.models import Product
+
+AVERAGE_FIELD = DecimalField(max_digits=3, decimal_places=2)
+
+
+def apply_rating_change(product_id, rating_delta, count_delta):
+    """
+    Add `rating_delta` to the product's rating sum and `count_delta` to its
+    review count, and recompute the average from the new values, atomically
+    in one statement.
+    """
+    if not product_id or (rating_delta == 0 and count_delta == 0):
+        return
+
+    new_sum = F('rating_sum') + rating_delta
+    new_count = F('total_reviews') + count_delta
+    Product.objects.filter(id=product_id).update(
+        rating_sum=new_sum,
+        total_reviews=new_count,
+        average_rating=Case(
+            # All right-hand sides see the pre-update row, so test old count + delta
+            When(total_reviews__gt=-count_delta,
+                 then=Cast(Cast(new_sum, FloatField()) / new_count, AVERAGE_FIELD)),
+            default=Value(0),
+            output_field=AVERAGE_FIELD,
+        ),
+    )
+    bump_catalog_version()
+
+
+def review_added(review):
+    apply_rating_change(review.Product_id, review.rating, 1)
+
+
+def review_removed(review):
+    apply_rating_change(review.Product_id, -review.rating, -1)
+
+
+def review_changed(old_product_id, old_rating, review):
+    """Apply an edit to an existing review (rating and, rarely, product changed)."""
+    if old_product_id == review.Product_id:
+        apply_rating_change(review.Product_id, review.rating - old_rating, 0)
+    else:
+        apply_rating_change(old_product_id, -old_rating, -1)
+        review_added(review)
+
+
+def _average(rating_sum, count):
+    if not count:
+        return Decimal('0.00')
+    return (Decimal(rating_sum) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def reconcile_product_ratings(batch_size=1000, dry_run=False):
+    """
+    Recompute rating aggregates of every product from the review table and
+    correct the ones that drifted. Returns the list of corrected product ids.
+    """
+    from .models import Review
+
+    corrected = []
+    last_id = 0
+    while True:
+        products = list(
+            Product.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values('id', 'rating_sum', 'total_reviews', 'average_rating')[:batch_size]
+        )
+        if not products:
+            break
+        last_id = products[-1]['id']
+
+        actual = {
+            row['Product_id']: row
+            for row in Review.objects.filter(Product_id__in=[p['id'] for p in products])
+            .values('Product_id')
+            .annotate(rating_total=Sum('rating'), review_count=Count('id'))
+        }
+
+        stale = []
+        for p in products:
+            row = actual.get(p['id'], {})
+            rating_sum = row.get('rating_total') or 0
+            count = row.get('review_count') or 0
+            average = _average(rating_sum, count)
+            # Tolerate last-digit rounding differences between databases
+            if (p['rating_sum'], p['total_reviews']) != (rating_sum, count) or \
+                    abs(Decimal(p['average_rating']) - average) > Decimal('0.01'):
+                stale.append(Product(id=p['id'], rating_sum=rating_sum, total_reviews=count, average_rating=average))
+
+        if stale and not dry_run:
+            Product.objects.bulk_update(stale, ['rating_sum', 'total_reviews', 'average_rating'])
+            bump_catalog_version()
+        corrected.extend(p.id for p in stale)
+
+    return corrected
@@ -0,0 +1,107 @@
+"""
+user/risk.py
+Customer risk scores.
+
+The 0-100 score weighs an account's cancellation rate (up to 40 points),
+return rate (up to 30) and failed payments (10 each, up to 30). Instead of
+aggregating Order / OrderReturn on every admin request, the counters behind
+it are kept in CustomerRiskProfile and adjusted by the signals in
+user/signals.py as orders are placed, cancelled, fail payment or get a
+return request. `rebuild_risk_profiles()` recomputes them from scratch.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+COUNTER_FIELDS = ('total_orders', 'cancelled_orders', 'return_requests', 'failed_payments')
+
+
+def risk_score(total_orders, cancelled_orders, return_requests, failed_payments):
+    cancel_rate = (cancelled_orders / total_orders) if total_orders else 0
+    return_rate = (return_requests / total_orders) if total_orders else 0
+    payment_score = min(failed_payments * 10, 30)
+    return min(round(cancel_rate * 40) + round(return_rate * 30) + payment_score, 100)
+
+
+def order_counters(order):
+    return {
+        'total_orders': 1,
+        'cancelled_orders': int(order.status == 'cancelled'),
+        'failed_payments': int(order.payment_status == 'failed'),
+    }
+
+
+def apply_risk_change(user_id, create=True, **deltas):
+    """
+    Add `deltas` to the user's counters and recompute the score. With
+    create=False a missing profile is left alone (e.g. while the user
+    itself is being deleted).
+    """
+    from .models import CustomerRiskProfile
+
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        if create:
+            CustomerRiskProfile.objects.get_or_create(user_id=user_id)
+        profile = CustomerRiskProfile.objects.select_for_update().filter(user_id=user_id).first()
+        if profile is None:
+            return
+        for field, delta in deltas.items():
+            setattr(profile, field, max(getattr(profile, field) + delta, 0))
+        profile.risk_score = risk_score(*(getattr(profile, field) for field in COUNTER_FIELDS))
+        profile.save()
+
+
+def order_saved(stored, order):
+    """Move the counters from the stored version of an order (None when new) to its saved version."""
+    changes = defaultdict(Counter)
+    if stored is not None:
+        for field, value in order_counters(stored).items():
+            changes[stored.user_id][field] -= value
+    for field, value in order_counters(order).items():
+        changes[order.user_id][field] += value
+    for user_id, deltas in changes.items():
+        apply_risk_change(user_id, **deltas)
+
+
+def order_deleted(order):
+    apply_risk_change(order.user_id, create=False, **{f: -v for f, v in order_counters(order).items()})
+
+
+def return_requested(order_return):
+    apply_risk_change(order_return.user_id, return_requests=1)
+
+
+def return_deleted(order_return):
+    apply_risk_change(order_return.user_id, create=False, return_requests=-1)
+
+
+def rebuild_risk_profiles(batch_size=1000):
+    """Recompute every profile from Order and OrderReturn. Returns the number of profiles written."""
+    from .models import CustomerRiskProfile, Order, OrderReturn
+
+    counters = defaultdict(Counter)
+    orders = Order.objects.values('user_id').annotate(
+        total=Count('id'),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+        failed=Count('id', filter=Q(payment_status='failed')),
+    )
+    for row in orders:
+        counters[row['user_id']].update(
+            total_orders=row['total'], cancelled_orders=row['cancelled'], failed_payments=row['failed']
+        )
+    for row in OrderReturn.objects.values('user_id').annotate(returns=Count('id')):
+        counters[row['user_id']]['return_requests'] += row['returns']
+
+    profiles = []
+    for user_id, values in counters.items():
+        values = {field: values[field] for field in COUNTER_FIELDS}
+        profiles.append(CustomerRiskProfile(user_id=user_id, risk_score=risk_score(**values), **values))
+
+    with transaction.atomic():
+        CustomerRiskProfile.objects.all().delete()
+        CustomerRiskProfile.objects.bulk_create(profiles, batch_size=batch_size)
+    return len(profiles)
@@ -1,9 +1,11 @@
 from rest_framework import serializers
+from django.db import models
 from .models import (AuthUser, Cart, CartItem, Order, OrderItem, Address, 
                      UserWallet, WalletTransaction, OrderReturn, Refund, 
                      TwoFactorAuth, Notification, Dispute, Coupon, CouponUsage, Review)
 from vendor.models import Product, ProductImage
-from django.urls import reverse
+from vendor.renditions import product_image_url
+from .loaders import order_loaders
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -49,11 +51,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image', 'uploaded_at']
 
     def get_image(self, obj):
-        request = self.context.get('request')
-        path = reverse('serve_product_image', kwargs={'image_id': obj.id})
-        if request:
-            return request.build_absolute_uri(path)
-        return path
+        return product_image_url(obj.id, self.context.get('request'), self.context.get('image_size'))
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -72,18 +70,8 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
 
     def get_average_rating(self, obj):
-        # Use annotated values if available to avoid N+1 queries
-        rating = getattr(obj, 'average_rating', None)
-        if rating is None:
-            rating = getattr(obj, 'avg_rating', None)
-            
-        if rating is not None:
-            return round(float(rating), 1)
-            
-        # Fallback to calculation if not annotated (rare)
-        from django.db.models import Avg
-        avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(float(avg or 0.0), 1)
+        # Stored aggregate kept in sync with the reviews by user.ratings
+        return round(float(obj.average_rating or 0.0), 1)
 
 
     def get_image(self, obj):
@@ -93,27 +81,21 @@ class ProductSerializer(serializers.ModelSerializer):
             # Check if 'images' has been prefetched
             images = obj.images.all()
             if images:
-                first_image = images[0]
-                path = reverse('serve_product_image', kwargs={'image_id': first_image.id})
-                if request:
-                    return request.build_absolute_uri(path)
-                return path
+                # Listing views pass image_size='thumb' to link the small rendition
+                return product_image_url(images[0].id, request, self.context.get('image_size'))
         except (AttributeError, IndexError):
             pass
         return None
 
     def get_image_urls(self, obj):
         request = self.context.get('request')
+        size = self.context.get('image_size')
         urls = []
         # Use prefetched images if available
         try:
             images = obj.images.all()
             for img in images:
-                path = reverse('serve_product_image', kwargs={'image_id': img.id})
-                if request:
-                    urls.append(request.build_absolute_uri(path))
-                else:
-                    urls.append(path)
+                urls.append(product_image_url(img.id, request, size))
         except AttributeError:
             pass
         return urls
@@ -140,26 +122,19 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     def get_product_image(self, obj):
         request = self.context.get('request')
-        if not obj.product:
-            return None
-            
-        first_image = obj.product.images.first()
-        if first_image:
-            path = reverse('serve_product_image', kwargs={'image_id': first_image.id})
-            if request:
-                return request.build_absolute_uri(path)
-            return path
+        image_id = order_loaders(self.context).first_image.load(obj.product_id)
+        if image_id:
+            return product_image_url(image_id, request, 'thumb')
         return None
 
     def get_user_review(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated or not obj.product:
+        reviews = order_loaders(self.context).review
+        if reviews is None or not obj.product_id:
             return None
             
-        from .models import Review
         from django.utils import timezone
         
-        review = Review.objects.filter(user=request.user, Product=obj.product).first()
+        review = reviews.load(obj.product_id)
         if review:
             # Check if it's within 5 days for editing
             time_diff = timezone.now() - review.created_at
@@ -186,6 +161,15 @@ class OrderTrackingSerializer(serializers.ModelSerializer):
     timestamp = serializers.DateTimeField(read_only=True)
 
 
+class OrderListSerializer(serializers.ListSerializer):
+    """Primes the batch loaders with the whole page before any order is rendered."""
+
+    def to_representation(self, data):
+        orders = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        order_loaders(self.context).prime_orders(orders)
+        return super().to_representation(orders)
+
+
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     delivery_address = AddressSerializer(read_only=True)
@@ -201,15 +185,15 @@ class OrderSerializer(serializers.ModelSerializer):
                   'subtotal', 'tax_amount', 'shipping_cost', 'total_amount', 
                   'status', 'delivery_address', 'billing_address', 'created_at', 'items', 'tracking_history',
                   'can_be_returned', 'return_data', 'delivered_at']
+        list_serializer_class = OrderListSerializer
 
     def get_can_be_returned(self, obj):
         return obj.can_be_returned()
 
     def get_return_data(self, obj):
-        if hasattr(obj, 'returns') and obj.returns.exists():
-            from .models import OrderReturn
-            # Just take the first one or a summary
-            ret = obj.returns.first()
+        # Just take the latest one as a summary
+        ret = order_loaders(self.context).order_return.load(obj.id)
+        if ret:
             return {
                 "status": ret.status,
                 "reason": ret.reason,
@@ -1,23 +1,73 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.db import models
-from .models import Review
-from vendor.models import Product
+from .models import Order, OrderReturn, Review
+from . import live, ratings, risk
+
+# Order fields the customer risk counters depend on
+RISK_FIELDS = {'status', 'payment_status', 'user'}
+# Order fields shown in the live tracking feed
+LIVE_FIELDS = {'status', 'payment_status'}
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    # Edits need the stored rating to compute the delta
+    instance._stored_rating = None
+    if instance.pk:
+        instance._stored_rating = (
+            Review.objects.filter(pk=instance.pk).values_list('Product_id', 'rating').first()
+        )
+
 
 @receiver(post_save, sender=Review)
-@receiver(post_delete, sender=Review)
-def update_product_rating(sender, instance, **kwargs):
-    product = instance.Product
-    reviews = product.reviews.all()
-
-# Calculate new average rating and total reviews
-    if reviews.exists():
-        average = reviews.aggregate(models.Avg('rating'))['rating__avg']
-        count = reviews.count()
-        product.average_rating = round(average, 1)
-        product.total_reviews = count
+def update_product_rating(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored_rating', None)
+    if created or stored is None:
+        ratings.review_added(instance)
     else:
-        product.average_rating = 0
-        product.total_reviews = 0
+        ratings.review_changed(stored[0], stored[1], instance)
+
+
+@receiver(post_delete, sender=Review)
+def remove_product_rating(sender, instance, **kwargs):
+    ratings.review_removed(instance)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_risk(sender, instance, update_fields=None, **kwargs):
+    instance._stored_risk_state = None
+    if instance.pk and (update_fields is None or not RISK_FIELDS.isdisjoint(update_fields)):
+        instance._stored_risk_state = getattr(instance, '_stored_state', None) or (
+            Order.objects.filter(pk=instance.pk).only('user_id', 'status', 'payment_status').first()
+        )
+
+
+@receiver(post_save, sender=Order)
+def update_order_risk(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and RISK_FIELDS.isdisjoint(update_fields):
+        return
+    stored = None if created else getattr(instance, '_stored_risk_state', None)
+    risk.order_saved(stored, instance)
+
+
+@receiver(post_save, sender=Order)
+def publish_order_state(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and LIVE_FIELDS.isdisjoint(update_fields)):
+        return
+    live.publish(instance.id, 'order', live.order_state(instance))
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_risk(sender, instance, **kwargs):
+    risk.order_deleted(instance)
+
+
+@receiver(post_save, sender=OrderReturn)
+def count_return_request(sender, instance, created, **kwargs):
+    if created:
+        risk.return_requested(instance)
+
 
-    product.save()
\ No newline at end of file
+@receiver(post_delete, sender=OrderReturn)
+def uncount_return_request(sender, instance, **kwargs):
+    risk.return_deleted(instance)
@@ -1,3 +1,347 @@
-from django.test import TestCase
+import base64
+import json
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from finance.models import LedgerEntry
+from superAdmin.instrumentation import assert_max_queries
+
+from user import live
+from user.models import Address, AuthUser, Cart, CartItem, CustomerRiskProfile, Order, OutboxMessage, Review
+from user.loaders import BatchLoader
+from user.risk import rebuild_risk_profiles
+from user.outbox import enqueue, process_due_messages
+from user.pagination import InvalidCursor, keyset_paginate
+from user.ratings import reconcile_product_ratings
+from vendor.models import Product
+from vendor.image_storage import store_product_image
+from vendor.tests import ImageStoreTestCase, make_product, make_upload, make_vendor
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def make_customer(name='customer1'):
+    return AuthUser.objects.create_user(username=name, email=f'{name}@example.com', password='pw123456', role='customer')
+
+
+def make_address(user):
+    return Address.objects.create(
+        user=user, name='Home', phone='9999999999', address_line1='1 Main Road',
+        city='Hyderabad', state='Telangana', pincode='500001',
+    )
+
+
+class CheckoutTestCase(TestCase):
+    """A logged-in customer with an address and two products from different vendors."""
+
+    def setUp(self):
+        self.customer = make_customer()
+        self.address = make_address(self.customer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.phone = make_product(make_vendor('vendor1'), 'Phone', price=100, quantity=5)
+        self.case = make_product(make_vendor('vendor2'), 'Case', price=20, quantity=5, category='fashion')
+
+    def checkout(self, *lines):
+        items = [
+            {'id': product.id, 'name': product.name, 'price': str(product.price), 'quantity': quantity}
+            for product, quantity in lines
+        ]
+        return self.client.post(
+            reverse('process_payment'),
+            {'payment_mode': 'cod', 'address_id': self.address.id, 'items': items},
+            format='json',
+        )
+
+
+# ── Rating aggregates ───────────────────────────────────────
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.product = make_product(make_vendor())
+
+    def review(self, name, rating):
+        return Review.objects.create(user=make_customer(name), Product=self.product, rating=rating, comment='ok')
+
+    def assertAggregates(self, rating_sum, total_reviews, average_rating):
+        product = Product.objects.get(id=self.product.id)
+        self.assertEqual(
+            (product.rating_sum, product.total_reviews, product.average_rating),
+            (rating_sum, total_reviews, Decimal(average_rating)),
+        )
+
+    def test_reviews_update_aggregates_in_place(self):
+        first = self.review('alice', 5)
+        self.review('bob', 2)
+        self.assertAggregates(7, 2, '3.50')
+
+        first.rating = 4
+        first.save()
+        self.assertAggregates(6, 2, '3.00')
+
+        first.delete()
+        self.assertAggregates(2, 1, '2.00')
+
+    def test_stale_full_save_keeps_aggregates(self):
+        stale = Product.objects.get(id=self.product.id)
+        self.review('alice', 4)
+
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertAggregates(4, 1, '4.00')
+        self.assertEqual(Product.objects.get(id=self.product.id).name, 'Renamed')
+
+    def test_reconcile_repairs_drift(self):
+        self.review('alice', 3)
+        Product.objects.filter(id=self.product.id).update(rating_sum=99, total_reviews=7)
+        reconcile_product_ratings()
+        self.assertAggregates(3, 1, '3.00')
+
+
+# ── Keyset pagination ───────────────────────────────────────
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        vendor = make_vendor()
+        self.products = [make_product(vendor, f'Product {i}') for i in range(5)]
+
+    def test_pages_follow_each_other_without_overlap(self):
+        queryset = Product.objects.order_by('-created_at', '-id')
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_paginate(queryset, cursor, 2)
+            seen.extend(rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(queryset))
+
+    def test_wrong_typed_cursor_values_are_invalid(self):
+        queryset = Product.objects.order_by('-created_at', '-id')
+        for values in (['x', 'y'], ['2026-01-01T00:00:00', 'y'], ['2026-01-01T00:00:00', 10 ** 30],
+                       [None, 1], [[1], {}], ['x']):
+            with self.subTest(values=values), self.assertRaises(InvalidCursor):
+                keyset_paginate(queryset, raw_cursor(values), 2)
+
+    def test_product_list_rejects_tampered_cursor(self):
+        url = reverse('user_products_json')
+        response = self.client.get(url, {'cursor': raw_cursor(['x', 'y'])}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(url, {'cursor': ''}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 5)
+
+
+# ── Checkout ────────────────────────────────────────────────
+
+class CheckoutTests(CheckoutTestCase):
+    def test_order_takes_stock_and_records_ledger(self):
+        response = self.checkout((self.phone, 2), (self.case, 1), (self.phone, 1))
+        self.assertEqual(response.status_code, 200, response.content)
+
+        order = Order.objects.get()
+        self.assertEqual(order.payment_status, 'completed')
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(Product.objects.get(id=self.phone.id).quantity, 2)
+        self.assertEqual(Product.objects.get(id=self.case.id).quantity, 4)
+        # One revenue entry per vendor, gross = sum of that vendor's lines
+        self.assertEqual(
+            sorted(LedgerEntry.objects.filter(order=order).values_list('gross_amount', flat=True)),
+            [Decimal('20.00'), Decimal('300.00')],
+        )
+
+    def test_insufficient_stock_rolls_everything_back(self):
+        response = self.checkout((self.case, 1), (self.phone, 4), (self.phone, 2))
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(id=self.phone.id).quantity, 5)
+        self.assertEqual(Product.objects.get(id=self.case.id).quantity, 5)
+
+
+# ── Outbox ──────────────────────────────────────────────────
+
+class OutboxTests(CheckoutTestCase):
+    def test_checkout_queues_side_effects_for_the_worker(self):
+        self.assertEqual(self.checkout((self.phone, 1)).status_code, 200)
+        self.assertEqual(
+            sorted(OutboxMessage.objects.filter(status='pending').values_list('topic', flat=True)),
+            ['auto_assign_order', 'send_email'],
+        )
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(process_due_messages(), (2, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(Order.objects.get().order_number, mail.outbox[0].subject)
+
+    def test_failed_message_is_retried_later(self):
+        message = enqueue('send_email', subject='Hi', message='Body')  # no recipient_list
+        self.assertEqual(process_due_messages(), (0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.available_at, message.created_at)
+        self.assertEqual(process_due_messages(), (0, 0))  # not due yet
+
+
+# ── Risk profiles ───────────────────────────────────────────
+
+class RiskProfileTests(CheckoutTestCase):
+    def profile(self):
+        return CustomerRiskProfile.objects.values(
+            'total_orders', 'cancelled_orders', 'return_requests', 'failed_payments', 'risk_score',
+        ).get(user=self.customer)
+
+    def test_counters_follow_orders_and_cancellations(self):
+        self.checkout((self.phone, 1))
+        self.checkout((self.case, 1))
+        order = Order.objects.get(items__product=self.case)
+        response = self.client.post(reverse('cancel_order', kwargs={'order_id': order.id}))
+        self.assertEqual(response.status_code, 200, response.content)
+
+        expected = {'total_orders': 2, 'cancelled_orders': 1, 'return_requests': 0,
+                    'failed_payments': 0, 'risk_score': 20}
+        self.assertEqual(self.profile(), expected)
+        rebuild_risk_profiles()
+        self.assertEqual(self.profile(), expected)
+
+
+# ── Live tracking ───────────────────────────────────────────
+
+class TrackingStreamTests(TestCase):
+    def setUp(self):
+        self.url = reverse('order_tracking_stream', kwargs={'order_number': 'ORD-1'})
+        self.customer = make_customer()
+        self.order, self.other = [
+            Order.objects.create(
+                user=self.customer, order_number=number, payment_method='cod', status=status,
+                total_amount=100, delivery_address=make_address(self.customer),
+            )
+            for number, status in (('ORD-1', 'delivered'), ('ORD-2', 'confirmed'))
+        ]
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.post(reverse('order_tracking_stream_token', kwargs={'order_number': 'ORD-1'}))
+        self.token = response.json()['token']
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(self.url).status_code, 501)
+
+    async def test_stream_is_served_under_asgi(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)  # past the ASGI check, on to authentication
+
+    async def test_stream_token_opens_only_its_order(self):
+        response = await self.async_client.get(self.url, {'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b'event: snapshot', content)  # a delivered order's stream ends after it
+
+        other = reverse('order_tracking_stream', kwargs={'order_number': 'ORD-2'})
+        self.assertEqual((await self.async_client.get(other, {'token': self.token})).status_code, 401)
+        access = str(AccessToken.for_user(self.customer))  # access JWTs are not accepted in the URL
+        self.assertEqual((await self.async_client.get(self.url, {'token': access})).status_code, 401)
+
+    @override_settings(LIVE_SHARED_CACHE=False)
+    async def test_stream_polls_the_database_without_a_shared_cache(self):
+        events = live.event_stream(self.other.id, lambda: sync_to_async(live.current_state)(self.other.id))
+        with mock.patch.object(live, 'POLL_SECONDS', 0.01):
+            self.assertIn('event: snapshot', await anext(events) + await anext(events))
+            # Changed by another process: nothing was published to this one
+            await Order.objects.filter(id=self.other.id).aupdate(status='delivered')
+            rest = ''.join([message async for message in events])
+        self.assertIn('event: order', rest)
+        self.assertIn('"status": "delivered"', rest)
+
+
+# ── Order history ───────────────────────────────────────────
+
+class OrderHistoryTests(CheckoutTestCase):
+    def order_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('my_orders'), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return len(response.json()), len(queries)
+
+    def test_order_list_queries_do_not_grow_with_orders(self):
+        self.checkout((self.phone, 1), (self.case, 1))
+        Review.objects.create(user=self.customer, Product=self.phone, rating=5, comment='ok')
+        orders, few = self.order_queries()
+        self.assertEqual(orders, 1)
+
+        for _ in range(3):
+            self.checkout((self.phone, 1), (self.case, 1))
+        orders, many = self.order_queries()
+        self.assertEqual((orders, many), (4, few))
+
+    def test_loader_resolves_primed_keys_in_one_batch(self):
+        batches = []
+        loader = BatchLoader(lambda keys: batches.append(set(keys)) or {key: key * 10 for key in keys if key != 3})
+        loader.prime([1, 2, 3, None])
+        self.assertEqual([loader.load(1), loader.load(2), loader.load(3), loader.load(None)], [10, 20, None, None])
+        self.assertEqual(loader.load(4), 40)
+        self.assertEqual(batches, [{1, 2, 3}, {4}])
+
+    def test_summaries_page_by_cursor_and_reject_tampered_ones(self):
+        for product in (self.phone, self.case, self.phone):
+            self.checkout((product, 1))
+        url = reverse('order_summaries')
+
+        first = self.client.get(url, {'page_size': 2}, HTTP_ACCEPT='application/json').json()
+        second = self.client.get(url, {'page_size': 2, 'cursor': first['next']}, HTTP_ACCEPT='application/json').json()
+        self.assertEqual([len(first['results']), len(second['results'])], [2, 1])
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            {r['order_number'] for r in first['results'] + second['results']},
+            set(Order.objects.values_list('order_number', flat=True)),
+        )
+        self.assertEqual(first['results'][0]['item_count'], 1)
+
+        for cursor in (raw_cursor(['x', 'y']), 'not-base64!'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {'cursor': cursor}, HTTP_ACCEPT='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+# ── Query budgets ───────────────────────────────────────────
+
+@override_settings(CATALOG_CACHE_ENABLED=False)
+class QueryBudgetTests(ImageStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        vendors = [make_vendor(f'vendor{i}') for i in range(2, 5)]
+        self.products = [make_product(vendors[i % 3], f'Product {i}') for i in range(12)]
+        for product in self.products[:6]:
+            store_product_image(product, make_upload())
+            Review.objects.create(user=make_customer(f'reviewer{product.id}'), Product=product, rating=4, comment='ok')
+
+    def test_product_list_stays_within_budget(self):
+        with assert_max_queries('user_products_json'):
+            response = self.client.get(reverse('user_products_json'), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), Product.objects.count())
+
+    def test_cart_stays_within_budget(self):
+        customer = make_customer()
+        cart = Cart.objects.create(user=customer)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product) for product in self.products])
+        self.client.force_login(customer)
+        with assert_max_queries('cart'):
+            response = self.client.get(reverse('cart'), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['items']), 12)
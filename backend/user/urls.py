@@ -32,8 +32,12 @@ urlpatterns = [
 
     # User Profile / Orders
     path('my_orders', views.my_orders, name='my_orders'),
+    path('my_orders/summary', views.order_summaries, name='order_summaries'),
+    path('my_orders/<str:order_number>', views.order_detail, name='order_detail'),
     path('cancel-order/<int:order_id>', views.cancel_order, name='cancel_order'),
     path('order_tracking/<str:order_number>', views.order_tracking, name='order_tracking'),
+    path('order_tracking/<str:order_number>/stream', views.order_tracking_stream, name='order_tracking_stream'),
+    path('order_tracking/<str:order_number>/stream_token', views.order_tracking_stream_token, name='order_tracking_stream_token'),
     path('request-return/<int:order_id>', views.request_return_api, name='request_return_api'),
     path('address', views.address_page, name="address_page"),
     path('delete-address/<int:id>', views.delete_address, name="delete_address"),
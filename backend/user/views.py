@@ -17,12 +17,18 @@ import uuid
 from django.db import transaction
 from django.db.models import F, Q
 from vendor.models import Product, ProductImage
+from vendor.renditions import product_image_url
+from vendor.catalog_cache import catalog_cached, bump_catalog_version
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
 from django.core.paginator import Paginator
 from finance.services import FinanceService
-from deliveryAgent.services import auto_assign_order
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from . import live
 
 
 @api_view(['GET', 'POST'])
@@ -277,13 +283,13 @@ def get_wallet(request):
 @api_view(['GET'])
 @authentication_classes([])
 @permission_classes([AllowAny])
+@catalog_cached('home_api')
 def home_api(request):
     PAGE_SIZE = 50
 
-    from django.db.models import Avg
-    # Base query with annotation to avoid N+1 queries for ratings
-    from django.db.models import Avg, Count, Prefetch
+    from django.db.models import Prefetch
     from vendor.models import ProductImage
+    from vendor.catalog_cache import record_search_hits
 
     # Optimized image prefetch that avoids loading large binary blobs for list views
     images_prefetch = Prefetch(
@@ -291,14 +297,11 @@ def home_api(request):
         queryset=ProductImage.objects.defer('image_data')
     )
 
-    # Base query with annotation to avoid N+1 queries for ratings
+    # Ratings come from the stored Product.average_rating / total_reviews columns
     products_qs = Product.objects.filter(
         status__in=['active', 'approved'],
         is_blocked=False
-    ).select_related('vendor').prefetch_related(images_prefetch).annotate(
-        avg_rating=Avg('reviews__rating'),
-        count_reviews=Count('reviews')
-    ).order_by('-id')
+    ).select_related('vendor').prefetch_related(images_prefetch).order_by('-id')
 
     # Optional category filtering  (frontend may send display names like 'Home & Kitchen')
     CATEGORY_MAP = {
@@ -322,26 +325,36 @@ def home_api(request):
             # Exact product-ID lookup
             products_qs = products_qs.filter(id=int(search))
         else:
-            # Name / category / description contains
-            products_qs = products_qs.filter(
-                Q(name__icontains=search) |
-                Q(category__icontains=search) |
-                Q(description__icontains=search)
-            )
-        
-        # Increment search_count for found items (cap to prevent mass updates)
-        try:
-            products_qs.update(search_count=F('search_count') + 1)
-        except Exception:
-            pass
+            # Full-text search on name / brand / category / description, best match first
+            from vendor.catalog_search import search_products
+            products_qs = search_products(products_qs, search)
 
     if request.accepted_renderer.format == 'json':
+        if 'cursor' in request.GET:
+            # Keyset pagination (?cursor= for the first page): no COUNT, no OFFSET
+            from .pagination import keyset_paginate, InvalidCursor
+            try:
+                products, next_cursor = keyset_paginate(products_qs, request.GET['cursor'], PAGE_SIZE)
+            except InvalidCursor as e:
+                return Response({'error': str(e)}, status=400)
+            if search:
+                record_search_hits(request, [p.id for p in products])
+
+            serializer = ProductSerializer(products, many=True, context={'request': request, 'image_size': 'thumb'})
+            data = {'next': next_cursor, 'results': serializer.data}
+            if request.GET.get('with_count') == 'true':
+                data['count'] = products_qs.count()
+            return Response(data)
+
         # Server-side pagination: 50 per page
         page_number = int(request.GET.get('page', 1))
         paginator = Paginator(products_qs, PAGE_SIZE)
         page_obj = paginator.get_page(page_number)
+        if search:
+            # Buffered popularity counting for the products shown (see vendor.trending)
+            record_search_hits(request, [p.id for p in page_obj.object_list])
 
-        serializer = ProductSerializer(page_obj.object_list, many=True, context={'request': request})
+        serializer = ProductSerializer(page_obj.object_list, many=True, context={'request': request, 'image_size': 'thumb'})
         return Response({
             'count': paginator.count,
             'num_pages': paginator.num_pages,
@@ -421,7 +434,7 @@ def add_to_cart(request, product_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def cart_view(request):
-    from django.db.models import Prefetch, Avg, Count
+    from django.db.models import Prefetch
     from vendor.models import ProductImage
     
     # Define images prefetch with defer to avoid binary data transfer
@@ -434,9 +447,7 @@ def cart_view(request):
     cart, _ = Cart.objects.prefetch_related(
         Prefetch(
             'items',
-            queryset=CartItem.objects.select_related('product', 'product__vendor').prefetch_related(images_prefetch).annotate(
-                avg_rating=Avg('product__reviews__rating')
-            )
+            queryset=CartItem.objects.select_related('product', 'product__vendor').prefetch_related(images_prefetch)
         )
     ).get_or_create(user=request.user)
     
@@ -488,7 +499,11 @@ def process_payment(request):
     the entire transaction is rolled back.
     """
     import logging
+    import time
     import traceback as tb
+    from .checkout import lock_products, check_stock, place_order_items, log_lock_hold_time
+    from .outbox import enqueue
+    from superAdmin import metrics
     logger = logging.getLogger(__name__)
 
     payment_mode = request.data.get('payment_mode')
@@ -517,18 +532,45 @@ def process_payment(request):
             status=400
         )
 
+    def _confirmation_email(order):
+        frontend_origin = request.headers.get('Origin') or request.headers.get('Referer', '').rstrip('/')
+        if not frontend_origin or 'localhost:8000' in frontend_origin:
+            frontend_origin = 'http://localhost:5173'
+        from urllib.parse import urlparse
+        parsed = urlparse(frontend_origin)
+        frontend_origin = f"{parsed.scheme}://{parsed.netloc}"
+        tracking_link = f"{frontend_origin}/track-order/{order.order_number}"
+
+        message = (
+            f"Dear {request.user.username},\n\n"
+            f"Your order {order.order_number} has been successfully placed and confirmed!\n"
+            f"Total Amount: ₹{order.total_amount}\n\n"
+            f"Track your order: {tracking_link}\n\n"
+            "Thank you for choosing ShopSphere!\n\nRegards,\nShopSphere Team"
+        )
+        return {
+            'subject': f'Order Confirmed - {order.order_number}',
+            'message': message,
+            'recipient_list': [request.user.email],
+        }
+
     order = None  # will be set inside the atomic block
 
     try:
-        with transaction.atomic():
+        # One daily-metrics update for the order, its payment status and ledger entries
+        with transaction.atomic(), metrics.batched_changes():
 
             # ── CASE 1: Items provided by frontend ──────────────
             if items_from_request:
-                # --- Stock pre-validation BEFORE any DB write ---
+                # --- Lock every product of the order at once (id order avoids deadlocks) ---
+                product_ids = [item_data.get('id') or item_data.get('product_id') for item_data in items_from_request]
+                locked_at = time.perf_counter()
+                products = lock_products(pid for pid in product_ids if str(pid or '').isdigit())
+
                 validated_items = []
                 total_product_amount = Decimal('0.00')
 
-                for item_data in items_from_request:
+                for item_data, product_id in zip(items_from_request, product_ids):
                     try:
                         price = Decimal(str(item_data.get('price', 0)))
                         quantity = int(item_data.get('quantity', 1))
@@ -536,36 +578,21 @@ def process_payment(request):
                         logger.warning(f"Skipping invalid item payload: {item_data}")
                         continue
 
-                    product_id = item_data.get('id') or item_data.get('product_id')
-                    product = None
-                    vendor = None
-
-                    if product_id:
-                        from vendor.models import Product as VProduct
-                        try:
-                            # Lock the row to prevent concurrent overselling
-                            product = VProduct.objects.select_for_update().get(id=product_id)
-                            if product.quantity < quantity:
-                                raise ValueError(
-                                    f"Insufficient stock for '{product.name}'. "
-                                    f"Available: {product.quantity}, Requested: {quantity}"
-                                )
-                            vendor = product.vendor
-                        except VProduct.DoesNotExist:
-                            logger.warning(f"Product {product_id} not found; item will be saved without product link.")
+                    product = products.get(int(product_id)) if str(product_id or '').isdigit() else None
+                    if product_id and not product:
+                        logger.warning(f"Product {product_id} not found; item will be saved without product link.")
 
                     validated_items.append({
                         'product': product,
-                        'vendor': vendor,
                         'name': item_data.get('name') or (product.name if product else 'Unknown'),
                         'price': price,
                         'quantity': quantity,
-                        'subtotal': price * quantity,
                     })
                     total_product_amount += price * quantity
 
                 if not validated_items:
                     return Response({"error": "No valid items found in the request."}, status=400)
+                check_stock(validated_items)
 
                 tax_amount = (total_product_amount * Decimal('0.05')).quantize(Decimal('0.01'))
                 shipping_cost = Decimal('50.00') if total_product_amount > 0 else Decimal('0.00')
@@ -586,22 +613,8 @@ def process_payment(request):
                     status='confirmed'
                 )
 
-                # --- Create OrderItems & decrement stock ---
-                for item in validated_items:
-                    OrderItem.objects.create(
-                        order=order,
-                        product=item['product'],
-                        vendor=item['vendor'],
-                        product_name=item['name'],
-                        quantity=item['quantity'],
-                        product_price=item['price'],
-                        subtotal=item['subtotal'],
-                    )
-                    if item['product']:
-                        from vendor.models import Product as VProduct
-                        VProduct.objects.filter(pk=item['product'].pk).update(
-                            quantity=F('quantity') - item['quantity']
-                        )
+                # --- Validate stock, create OrderItems & decrement stock (batched) ---
+                order_items = place_order_items(order, validated_items)
 
                 # --- Create Payment record ---
                 Payment.objects.create(
@@ -618,8 +631,9 @@ def process_payment(request):
                 order.payment_status = 'completed'
                 order.save(update_fields=['payment_status'])
 
-                # --- Financial ledger ---
-                FinanceService.record_order_financials(order)
+                # --- Financial ledger (commission already snapshotted on the items) ---
+                FinanceService.record_order_financials(order, order_items)
+                log_lock_hold_time(order, locked_at)
 
                 # --- Clear cart (frontend cart items passed directly, clear DB cart too) ---
                 Cart.objects.filter(user=request.user).delete()
@@ -635,17 +649,19 @@ def process_payment(request):
                 if not cart_items:
                     return Response({"error": "Your cart is empty."}, status=400)
 
-                # --- Stock pre-validation BEFORE any DB write ---
-                for item in cart_items:
-                    # Lock each product row
-                    product = (
-                        Product.objects.select_for_update().get(pk=item.product.pk)
-                    )
-                    if product.quantity < item.quantity:
-                        raise ValueError(
-                            f"Insufficient stock for '{product.name}'. "
-                            f"Available: {product.quantity}, Requested: {item.quantity}"
-                        )
+                # --- Lock every product of the cart at once (id order avoids deadlocks) ---
+                locked_at = time.perf_counter()
+                products = lock_products(item.product_id for item in cart_items)
+                cart_lines = [
+                    {
+                        'product': products[item.product_id],
+                        'name': item.product.name,
+                        'price': item.product.price,
+                        'quantity': item.quantity,
+                    }
+                    for item in cart_items
+                ]
+                check_stock(cart_lines)
 
                 total_product_amount = sum(item.get_total() for item in cart_items)
                 tax_amount = (total_product_amount * Decimal('0.05')).quantize(Decimal('0.01'))
@@ -668,20 +684,8 @@ def process_payment(request):
                     status='confirmed'
                 )
 
-                # --- Create OrderItems & decrement stock ---
-                for item in cart_items:
-                    OrderItem.objects.create(
-                        order=order,
-                        product=item.product,
-                        vendor=item.product.vendor,
-                        product_name=item.product.name,
-                        quantity=item.quantity,
-                        product_price=item.product.price,
-                        subtotal=item.get_total(),
-                    )
-                    Product.objects.filter(pk=item.product.pk).update(
-                        quantity=F('quantity') - item.quantity
-                    )
+                # --- Create OrderItems & decrement stock (batched) ---
+                order_items = place_order_items(order, cart_lines)
 
                 # --- Create Payment record ---
                 Payment.objects.create(
@@ -698,17 +702,18 @@ def process_payment(request):
                 order.payment_status = 'completed'
                 order.save(update_fields=['payment_status'])
 
-                # --- Financial ledger ---
-                FinanceService.record_order_financials(order)
+                # --- Financial ledger (commission already snapshotted on the items) ---
+                FinanceService.record_order_financials(order, order_items)
+                log_lock_hold_time(order, locked_at)
 
                 # --- Clear database cart ---
                 cart.items.all().delete()
 
-            # ── Auto-assign delivery (outside critical path — failure is non-fatal) ──
-            try:
-                auto_assign_order(order)
-            except Exception as assign_err:
-                logger.warning(f"Auto-assignment skipped for order {order.id}: {assign_err}")
+            # ── Delivery assignment & confirmation email: recorded in this transaction,
+            #    executed after commit by the outbox worker (user/outbox.py) ──
+            enqueue('auto_assign_order', order_id=order.id)
+            if request.user.email:
+                enqueue('send_email', **_confirmation_email(order))
 
     except ValueError as ve:
         # Stock / validation error — safe, nothing was committed
@@ -724,32 +729,6 @@ def process_payment(request):
             status=500
         )
 
-    # ── Send confirmation email (non-critical) ─────────────
-    try:
-        frontend_origin = request.headers.get('Origin') or request.headers.get('Referer', '').rstrip('/')
-        if not frontend_origin or 'localhost:8000' in frontend_origin:
-            frontend_origin = 'http://localhost:5173'
-        from urllib.parse import urlparse
-        parsed = urlparse(frontend_origin)
-        frontend_origin = f"{parsed.scheme}://{parsed.netloc}"
-        tracking_link = f"{frontend_origin}/track-order/{order.order_number}"
-
-        message = (
-            f"Dear {request.user.username},\n\n"
-            f"Your order {order.order_number} has been successfully placed and confirmed!\n"
-            f"Total Amount: ₹{order.total_amount}\n\n"
-            f"Track your order: {tracking_link}\n\n"
-            "Thank you for choosing ShopSphere!\n\nRegards,\nShopSphere Team"
-        )
-        send_mail(
-            subject=f'Order Confirmed - {order.order_number}',
-            message=message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[request.user.email]
-        )
-    except Exception as mail_err:
-        logger.warning(f"Order confirmation email failed: {mail_err}")
-
     if request.accepted_renderer.format == 'json':
         return Response({
             "success": True,
@@ -768,30 +747,98 @@ def my_orders(request):
     from django.db.models import Prefetch
     from vendor.models import ProductImage
     
+    orders = Order.objects.filter(user=request.user).select_related(
+        'delivery_address', 'billing_address'
+    ).order_by('-created_at')
+    
+    if request.accepted_renderer.format == 'json':
+        # Reviews, first images and returns are batch-loaded per page by the serializer (user/loaders.py)
+        orders = orders.prefetch_related('items', 'tracking_history')
+        serializer = OrderSerializer(orders, many=True, context={'request': request})
+        return Response(serializer.data)
+        
     # Optimized prefetch for OrderItem -> Product -> Images
     images_prefetch = Prefetch(
         'items__product__images',
         queryset=ProductImage.objects.defer('image_data')
     )
-    
-    # Fetch orders with items, products and images efficiently 
-    orders = Order.objects.filter(user=request.user).select_related(
-        'delivery_address', 'billing_address'
-    ).prefetch_related(
+    orders = orders.prefetch_related(
         'items', 
         'items__product', 
         'items__product__vendor',
         images_prefetch,
         'tracking_history'
-    ).order_by('-created_at')
-    
-    if request.accepted_renderer.format == 'json':
-        serializer = OrderSerializer(orders, many=True, context={'request': request})
-        return Response(serializer.data)
-        
+    )
     return render(request, "my_orders.html", {"orders": orders})
 
 
+ORDER_SUMMARY_PAGE_SIZE = 20
+MAX_ORDER_SUMMARY_PAGE_SIZE = 50
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def order_summaries(request):
+    """
+    Slim, cursor-paginated order history: one row per order with its item
+    count and first thumbnail, computed in the page query itself. Follow
+    `next` with ?cursor=; full details come from order_detail.
+    """
+    from django.db.models import Count, OuterRef, Subquery
+    from .pagination import keyset_paginate, InvalidCursor
+
+    try:
+        page_size = min(int(request.GET.get('page_size', ORDER_SUMMARY_PAGE_SIZE)), MAX_ORDER_SUMMARY_PAGE_SIZE)
+    except ValueError:
+        return Response({'error': 'page_size must be a number'}, status=400)
+    if page_size < 1:
+        return Response({'error': 'page_size must be positive'}, status=400)
+
+    first_image = (
+        ProductImage.objects.filter(product__orderitem__order=OuterRef('pk'))
+        .order_by('product__orderitem__id', 'pk').values('id')[:1]
+    )
+    orders = (
+        Order.objects.filter(user=request.user)
+        .only('id', 'order_number', 'status', 'payment_status', 'total_amount', 'created_at', 'delivered_at')
+        .annotate(item_count=Count('items'), first_image_id=Subquery(first_image))
+        .order_by('-created_at', '-id')
+    )
+    try:
+        page, next_cursor = keyset_paginate(orders, request.GET.get('cursor'), page_size)
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=400)
+
+    return Response({
+        'next': next_cursor,
+        'results': [{
+            'order_number': order.order_number,
+            'status': order.status,
+            'payment_status': order.payment_status,
+            'total_amount': str(order.total_amount),
+            'created_at': order.created_at.isoformat(),
+            'item_count': order.item_count,
+            'thumbnail': product_image_url(order.first_image_id, request, 'thumb') if order.first_image_id else None,
+            'can_be_returned': order.can_be_returned(),
+        } for order in page],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def order_detail(request, order_number):
+    """One order with its items, addresses, tracking history, reviews and return (as in my_orders)."""
+    order = (
+        Order.objects.filter(user=request.user, order_number=order_number)
+        .select_related('delivery_address', 'billing_address')
+        .prefetch_related('items', 'tracking_history')
+        .first()
+    )
+    if order is None:
+        return Response({"error": "Order not found"}, status=404)
+    return Response(OrderSerializer(order, context={'request': request}).data)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def cancel_order(request, order_id):
@@ -807,8 +854,10 @@ def cancel_order(request, order_id):
             status=400
         )
 
+    from superAdmin import metrics
+
     try:
-        with transaction.atomic():
+        with transaction.atomic(), metrics.batched_changes():
             # Restore product quantities and cancel items
             for item in order.items.select_related('product').all():
                 if item.product:
@@ -817,6 +866,7 @@ def cancel_order(request, order_id):
                     )
                 item.vendor_status = 'cancelled'
                 item.save(update_fields=['vendor_status'])
+            bump_catalog_version()  # stock changed without Product.save()
             
             # Cancel delivery assignment if exists
             try:
@@ -886,19 +936,7 @@ def order_tracking(request, order_number):
     # 3: Out for Delivery (Assignment: in_transit / attempting_delivery)
     # 4: Delivered (Order: delivered)
     
-    current_idx = 0
-    if order.status == 'pending':
-        current_idx = 0
-    elif order.status == 'confirmed':
-        current_idx = 1
-    elif order.status == 'shipping':
-        current_idx = 2
-    elif order.status == 'out_for_delivery':
-        current_idx = 3
-    elif order.status == 'delivered':
-        current_idx = 4
-    elif order.status == 'cancelled':
-        current_idx = 0 # Fallback
+    current_idx = live.ORDER_STEP_INDEX.get(order.status, 0)  # cancelled etc. fall back to 0
 
     STATUS_STEPS = [
         ('pending',    'Order Placed',     'Your order has been placed successfully.'),
@@ -951,6 +989,70 @@ def order_tracking(request, order_number):
         'delivery_address': delivery_address,
     })
 
+def _stream_user(request, order_number):
+    """
+    The user for a live tracking stream: the `token` query parameter (a
+    stream token from order_tracking_stream_token, since EventSource cannot
+    set headers), a JWT from the Authorization header, or the session user.
+    """
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+    if request.GET.get('token'):
+        user_id = live.stream_token_user_id(request.GET['token'], order_number)
+        return AuthUser.objects.filter(pk=user_id).first() if user_id is not None else None
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+        if authenticated is not None:
+            return authenticated[0]
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    return request.user if request.user.is_authenticated else None
+
+
+def _watchable_order(user, order_number):
+    orders = Order.objects.all() if user.is_staff or user.is_superuser else Order.objects.filter(user=user)
+    return orders.filter(order_number=order_number).first()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def order_tracking_stream_token(request, order_number):
+    """
+    A short-lived token for ?token= on order_tracking_stream, so the access
+    JWT never appears in URLs (and so in access or proxy logs).
+    """
+    if _watchable_order(request.user, order_number) is None:
+        return Response({"error": "Order not found"}, status=404)
+    return Response({'token': live.stream_token(request.user, order_number), 'expires_in': live.STREAM_TOKEN_SECONDS})
+
+
+@require_GET
+async def order_tracking_stream(request, order_number):
+    """Live tracking updates for an order as Server-Sent Events (served through ShopSphere.asgi)."""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would tie up a worker thread for as long as the page stays open
+        return JsonResponse({'error': 'Live tracking is only available when served through ASGI'}, status=501)
+    user = await sync_to_async(_stream_user)(request, order_number)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    if not user.is_active or getattr(user, 'is_blocked', False):
+        return JsonResponse({'error': 'Account disabled'}, status=403)
+
+    order = await sync_to_async(_watchable_order)(user, order_number)
+    if order is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+
+    response = StreamingHttpResponse(
+        live.event_stream(order.id, lambda: sync_to_async(live.current_state)(order.id)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def address_page(request):
@@ -1032,8 +1134,9 @@ def logout_api(request):
 @api_view(['GET', 'POST'])
 @authentication_classes([])
 @permission_classes([AllowAny])
+@catalog_cached('product_detail')
 def product_detail(request, product_id):
-    from django.db.models import Prefetch, Avg, Count
+    from django.db.models import Prefetch
     from vendor.models import ProductImage
 
     # Optimized image prefetch that avoids loading large binary blobs
@@ -1044,10 +1147,7 @@ def product_detail(request, product_id):
 
     # Use prefetch_related and select_related for the single product to avoid N+1
     product = get_object_or_404(
-        Product.objects.select_related('vendor').prefetch_related(images_prefetch).annotate(
-            avg_rating=Avg('reviews__rating'),
-            count_reviews=Count('reviews')
-        ), 
+        Product.objects.select_related('vendor').prefetch_related(images_prefetch),
         id=product_id
     )
     
@@ -1198,14 +1298,16 @@ def reverse_geocode(request):
 @api_view(['GET'])
 @authentication_classes([])
 @permission_classes([AllowAny])
+@catalog_cached('trending')
 def get_trending_products(request):
     """
-    Fetch trending products based on search_count, but strictly filtered by real user reviews.
-    Requirement: Trending products MUST have an average rating > 3.0 calculated from the reviews table.
+    Fetch trending products from the precomputed leaderboard (time-decayed search hits,
+    see vendor.trending), strictly filtered by real user reviews.
+    Requirement: Trending products MUST have an average rating > 3.0 (stored rating aggregates).
     """
-    from vendor.models import Product, ProductImage
-    from django.db.models import Avg, Count, Prefetch
-    from user.models import Review
+    from vendor.models import ProductImage
+    from vendor.trending import trending_products
+    from django.db.models import Prefetch
 
     # Optimized image prefetch
     images_prefetch = Prefetch(
@@ -1213,37 +1315,12 @@ def get_trending_products(request):
         queryset=ProductImage.objects.defer('image_data')
     )
 
-    # Single query approach:
-    # 1. Annotate with real-time average and count from the related 'reviews' set
-    # 2. Filter by the rule: Average > 3.0 AND Count > 0
-    # 3. Order by search_count (trending) then quality metrics
-    trending = (
-        Product.objects
-        .annotate(
-            calculated_avg=Avg('reviews__rating'),
-            total_revs=Count('reviews__id')
-        )
-        .filter(
-            calculated_avg__gt=3.0, # Strictly greater than 3.0
-            total_revs__gt=0,       # Must have at least one review
-            status__in=['active', 'approved'],
-            is_blocked=False
-        )
-        .select_related('vendor')
-        .prefetch_related(images_prefetch)
-        .order_by('-search_count', '-calculated_avg', '-total_revs', '-id')[:12]
-    )
+    trending = trending_products(12).select_related('vendor').prefetch_related(images_prefetch)
 
-    serializer = ProductSerializer(trending, many=True, context={'request': request})
+    serializer = ProductSerializer(trending, many=True, context={'request': request, 'image_size': 'thumb'})
     data = serializer.data
 
-    # Ensure the frontend receives the calculated values in the standard keys
-    # ProductSerializer might default to the model field 'average_rating', 
-    # so we explicitly overwrite it with our live-calculated 'calculated_avg'.
-    for i, item in enumerate(data):
-        prod_obj = trending[i]
-        item['average_rating'] = float(round(prod_obj.calculated_avg or 0.0, 2))
-        item['total_reviews'] = prod_obj.total_revs
+    for item in data:
         item['is_trending'] = True
 
     return Response(data)
@@ -1319,52 +1396,37 @@ def request_return_api(request, order_id):
 @api_view(['GET'])
 @authentication_classes([])
 @permission_classes([AllowAny])
+@catalog_cached('deal_of_the_day')
 def get_deal_of_the_day(request):
     """
     Returns a deterministic subset of products that changes every day.
-    Rotates through all available products.
+    Rotates through all available products; the day's selection is computed
+    once and cached (see vendor.deals), so only those rows are loaded here.
     """
-    from django.db.models import Prefetch, Avg, Count
-    from datetime import date
-
-    # Number of products to show in the deal section
-    PRODUCTS_PER_DAY = 10 
+    from django.db.models import Prefetch
+    from vendor.deals import compute_daily_deal, eligible_products, get_deal_ids
 
-    # 1. Get all eligible products
     images_prefetch = Prefetch(
         'images',
         queryset=ProductImage.objects.defer('image_data')
     )
-    
-    # We order by ID to ensure a stable base list for rotation
-    queryset = Product.objects.filter(
-        status__in=['active', 'approved'],
-        is_blocked=False
-    ).select_related('vendor').prefetch_related(images_prefetch).annotate(
-        avg_rating=Avg('reviews__rating'),
-        count_reviews=Count('reviews')
-    ).order_by('id')
 
-    all_products = list(queryset)
-    total_products = len(all_products)
+    def load(ids):
+        queryset = eligible_products().filter(id__in=ids).select_related('vendor').prefetch_related(images_prefetch)
+        return {product.id: product for product in queryset}
 
-    if total_products == 0:
-        return Response([])
+    deal_ids = get_deal_ids()
+    products = load(deal_ids)
+    if len(products) < len(deal_ids):
+        # A chosen product was blocked or sold out since the selection was cached
+        deal_ids = compute_daily_deal()
+        products = load(deal_ids)
 
-    # 2. Calculate rotation based on days since a reference date
-    reference_date = date(2024, 1, 1)
-    today = date.today()
-    days_passed = (today - reference_date).days
-    
-    start_index = (days_passed * PRODUCTS_PER_DAY) % total_products
-    
-    # 3. Select products with wrap-around
-    deal_products = []
-    for i in range(min(PRODUCTS_PER_DAY, total_products)):
-        idx = (start_index + i) % total_products
-        deal_products.append(all_products[idx])
+    deal_products = [products[pid] for pid in deal_ids if pid in products]
+    if not deal_products:
+        return Response([])
 
-    serializer = ProductSerializer(deal_products, many=True, context={'request': request})
+    serializer = ProductSerializer(deal_products, many=True, context={'request': request, 'image_size': 'thumb'})
     
     # Inject 'is_deal' flag and potential discount display logic
     data = serializer.data
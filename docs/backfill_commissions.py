@@ -10,35 +10,35 @@ django.setup()
 
 from user.models import Order, OrderItem
 from finance.services import FinanceService
-from finance.models import LedgerEntry
 
 def backfill_commissions():
     print("Starting Commission Backfill...")
     
     # 1. Update OrderItems with missing commission
-    items_to_fix = OrderItem.objects.filter(commission_amount=0)
-    print(f"Found {items_to_fix.count()} items with zero commission.")
-    
-    for item in items_to_fix:
-        if not item.product:
-            print(f"Skipping Item {item.id}: No product attached.")
-            continue
-            
-        comm_amount, comm_desc = FinanceService.calculate_commission(
-            item.product_price * item.quantity, 
-            item.product.category
-        )
+    # Rules are resolved from the in-process rule table, so the whole batch
+    # costs one SELECT and one bulk UPDATE instead of queries per item.
+    # Items without a product have no category to resolve a rule for
+    items_to_fix = list(
+        OrderItem.objects.filter(commission_amount=0, product__isnull=False).select_related('product')
+    )
+    print(f"Found {len(items_to_fix)} items with zero commission.")
+
+    commissions = FinanceService.calculate_commissions(
+        (item.product_price * item.quantity, item.product.category) for item in items_to_fix
+    )
+    for item, (comm_amount, comm_desc) in zip(items_to_fix, commissions):
         # Extract percentage from description like "10%"
         try:
             rate = Decimal(comm_desc.split('%')[0]) if '%' in comm_desc else Decimal('0.00')
         except:
             rate = Decimal('0.00')
-            
+
         item.commission_rate = rate
         item.commission_amount = comm_amount
-        item.save()
         print(f"Updated Item {item.id}: {item.product_name} | Commission: {comm_amount} ({comm_desc})")
 
+    OrderItem.objects.bulk_update(items_to_fix, ['commission_rate', 'commission_amount'], batch_size=500)
+
     # 2. Ensure LedgerEntries exist for completed orders
     completed_orders = Order.objects.filter(payment_status='completed')
     print(f"\nVerifying Ledger Entries for {completed_orders.count()} completed orders...")